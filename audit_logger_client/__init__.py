@@ -0,0 +1,18 @@
+"""
+Python client for the Mini Audit Logger API. Events are buffered in memory and sent
+to /api/events/batch in compressed batches over keep-alive connections, by a
+background thread (EventClient) or an asyncio task (AsyncEventClient):
+
+    from audit_logger_client import EventClient
+
+    with EventClient("http://localhost:8000", token) as client:
+        client.log("user.login", {"user": "alice"}, source="web")
+
+Use EventClient.register(base_url, name) to register a new application and keep its
+JWT (client.token) for later runs.
+"""
+from .async_client import AsyncEventClient
+from .client import EventClient
+from .core import BufferFullError, ClientError, RequestError, register_app
+
+__all__ = ["AsyncEventClient", "BufferFullError", "ClientError", "EventClient", "RequestError", "register_app"]
@@ -0,0 +1,208 @@
+import asyncio
+import http.client
+import logging
+from typing import List, Optional
+
+from .core import (
+    BATCH_PATH,
+    DEFAULT_STREAM,
+    Batch,
+    Batcher,
+    BufferFullError,
+    ClientError,
+    RequestError,
+    RetryPolicy,
+    Transport,
+    encode_event,
+    fallback_encoding,
+    register_app,
+    resolve_compression,
+    response_error,
+)
+from .client import ErrorCallback, log_dropped_batch
+
+logger = logging.getLogger("audit_logger_client")
+
+
+class AsyncEventClient:
+    """
+    asyncio counterpart of EventClient, with the same batching, compression, retries
+    and ordering. A flush task on the event loop cuts and sends the batches. The
+    standard library has no asyncio HTTP client, so each request runs on the loop's
+    default executor over the same keep-alive connections; backoff waits do not hold
+    a thread. Close it with `await close()` or `async with`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        batch_size: int = 1000,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        flush_interval: float = 1.0,
+        max_buffered: int = 100000,
+        block_timeout: float = 5.0,
+        compression: Optional[str] = "auto",
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        max_retry_delay: float = 30.0,
+        timeout: float = 30.0,
+        on_error: ErrorCallback = log_dropped_batch
+    ):
+        if max_buffered < batch_size:
+            raise ValueError("max_buffered must be at least batch_size.")
+        self.batcher = Batcher(batch_size, max_batch_bytes, flush_interval)
+        self.transport = Transport(base_url, token, timeout)
+        self.retry_policy = RetryPolicy(max_retries, retry_backoff, max_retry_delay)
+        self.compression = resolve_compression(compression)
+        self.max_buffered = max_buffered
+        self.block_timeout = block_timeout
+        self.on_error = on_error
+        self.sent_events = 0
+        self.dropped_events = 0
+        self.retries = 0
+        self._pending = 0  # Buffered or being sent
+        self._completed = 0  # Sent or dropped
+        self._closed = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def register(cls, base_url: str, name: str, **options) -> "AsyncEventClient":
+        """Register an application and return a client holding its JWT (see `token`)."""
+        token = await asyncio.get_running_loop().run_in_executor(None, register_app, base_url, name, options.get("timeout", 30.0))
+        return cls(base_url, token, **options)
+
+    @property
+    def token(self) -> str:
+        return self.transport.token
+
+    def _start(self) -> asyncio.Condition:
+        # Created on first use, inside the event loop that runs the client
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+        return self._condition
+
+    async def log(self, type: str, data: Optional[dict] = None, source: Optional[str] = None, stream: str = DEFAULT_STREAM) -> None:
+        """Buffer an event for sending; waits while `max_buffered` events are pending."""
+        event = encode_event(type, data, source, stream)
+        condition = self._start()
+        async with condition:
+            if self._closed:
+                raise ClientError("The client is closed.")
+            if self._pending >= self.max_buffered:
+                try:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: self._pending < self.max_buffered or self._closed), self.block_timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise BufferFullError(f"{self._pending} events are already waiting to be sent.")
+                if self._closed:
+                    raise ClientError("The client is closed.")
+            was_empty = not self.batcher.events
+            self.batcher.add(event)
+            self._pending += 1
+            if was_empty or self.batcher.is_full():
+                condition.notify_all()
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send every event logged so far. Returns False if that takes longer than `timeout` seconds."""
+        condition = self._start()
+        async with condition:
+            position = self.batcher.added
+            self.batcher.flush_position = max(self.batcher.flush_position, position)
+            condition.notify_all()
+            try:
+                await asyncio.wait_for(condition.wait_for(lambda: self._completed >= position), timeout)
+            except asyncio.TimeoutError:
+                return False
+            return True
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """Send the buffered events, stop the flush task and close the connections."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+        self.transport.close()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.batcher.events),
+            "pending": self._pending,
+            "sent_events": self.sent_events,
+            "dropped_events": self.dropped_events,
+            "retries": self.retries
+        }
+
+    async def __aenter__(self) -> "AsyncEventClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _run(self) -> None:
+        condition = self._condition
+        while True:
+            async with condition:
+                while not self.batcher.is_due(closing=self._closed):
+                    if self._closed:
+                        return
+                    try:
+                        await asyncio.wait_for(condition.wait(), self.batcher.wait_time())
+                    except asyncio.TimeoutError:
+                        pass
+                events = self.batcher.take()
+            await self._send(events)
+
+    async def _send(self, events: List[bytes]) -> None:
+        # Compressing a large batch takes milliseconds, too long to hold the event loop
+        batch = await asyncio.get_running_loop().run_in_executor(None, Batch, events, self.compression)
+        error = await self._send_batch(batch)
+        async with self._condition:
+            if error is None:
+                self.sent_events += len(events)
+            else:
+                self.dropped_events += len(events)
+            self._pending -= len(events)
+            self._completed += len(events)
+            self._condition.notify_all()
+        if error is not None:
+            try:
+                self.on_error(error, events)
+            except Exception:
+                logger.exception("on_error callback failed")
+
+    async def _send_batch(self, batch: Batch) -> Optional[RequestError]:
+        """Send a batch, retrying as the policy allows; returns the error if it was dropped."""
+        loop = asyncio.get_running_loop()
+        while True:
+            status, headers, body, error = None, {}, b"", None
+            try:
+                status, headers, body = await loop.run_in_executor(
+                    None, self.transport.request, "POST", BATCH_PATH, batch.body, batch.headers()
+                )
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if status is not None and 200 <= status < 300:
+                return None
+            if status == 415 and batch.encoding is not None:
+                # A server without this encoding lists the ones it takes
+                fallback = fallback_encoding(headers)
+                self.compression = fallback if fallback != batch.encoding else None
+                batch.encode(self.compression)
+                continue
+            batch.attempts += 1
+            delay = self.retry_policy.delay(batch.attempts, status, headers)
+            if delay is None:
+                return response_error(status, body, error)
+            logger.warning("Retrying a batch of %s events in %.2fs after %s", len(batch.events), delay, status or error)
+            self.retries += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,227 @@
+import atexit
+import http.client
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .core import (
+    BATCH_PATH,
+    DEFAULT_STREAM,
+    Batch,
+    Batcher,
+    BufferFullError,
+    ClientError,
+    RequestError,
+    RetryPolicy,
+    Transport,
+    encode_event,
+    fallback_encoding,
+    register_app,
+    resolve_compression,
+    response_error,
+)
+
+logger = logging.getLogger("audit_logger_client")
+
+ErrorCallback = Callable[[RequestError, List[bytes]], None]
+
+
+def log_dropped_batch(error: RequestError, events: List[bytes]) -> None:
+    logger.error("Dropped a batch of %s events: %s", len(events), error)
+
+
+class EventClient:
+    """
+    Buffers events in memory and sends them to /api/events/batch in compressed batches
+    over keep-alive connections.
+
+    With `background=True` (the default) log() only encodes and buffers the event; a
+    daemon thread sends a batch when `batch_size` events or `max_batch_bytes` bytes are
+    buffered, or when the oldest has waited `flush_interval` seconds. Without it, log()
+    sends full batches itself and flush() sends the rest. Batches go out one at a time,
+    in the order their events were logged, so each stream's chain keeps that order.
+
+    A failed batch is retried with the same Idempotency-Key, with exponential backoff,
+    so a retry after a lost response is never appended twice. A batch the server
+    rejects, or that runs out of retries, is dropped and passed to `on_error`.
+    When `max_buffered` events are waiting, log() blocks for up to `block_timeout`
+    seconds, then raises BufferFullError. Call close() (or use the client as a context
+    manager) to send what is left; it is also called at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        batch_size: int = 1000,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        flush_interval: float = 1.0,
+        max_buffered: int = 100000,
+        block_timeout: float = 5.0,
+        compression: Optional[str] = "auto",
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        max_retry_delay: float = 30.0,
+        timeout: float = 30.0,
+        background: bool = True,
+        on_error: ErrorCallback = log_dropped_batch
+    ):
+        if max_buffered < batch_size:
+            raise ValueError("max_buffered must be at least batch_size.")
+        self.batcher = Batcher(batch_size, max_batch_bytes, flush_interval)
+        self.transport = Transport(base_url, token, timeout)
+        self.retry_policy = RetryPolicy(max_retries, retry_backoff, max_retry_delay)
+        self.compression = resolve_compression(compression)
+        self.max_buffered = max_buffered
+        self.block_timeout = block_timeout
+        self.on_error = on_error
+        self.sent_events = 0
+        self.dropped_events = 0
+        self.retries = 0
+        self._pending = 0  # Buffered or being sent
+        self._completed = 0  # Sent or dropped
+        self._closed = False
+        self._condition = threading.Condition()
+        # Keeps batches in order when log() and flush() send from several threads
+        self._send_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="audit-logger-client", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def register(cls, base_url: str, name: str, **options) -> "EventClient":
+        """Register an application and return a client holding its JWT (see `token`)."""
+        return cls(base_url, register_app(base_url, name, options.get("timeout", 30.0)), **options)
+
+    @property
+    def token(self) -> str:
+        return self.transport.token
+
+    def log(self, type: str, data: Optional[dict] = None, source: Optional[str] = None, stream: str = DEFAULT_STREAM) -> None:
+        """Buffer an event for sending."""
+        event = encode_event(type, data, source, stream)
+        with self._condition:
+            if self._closed:
+                raise ClientError("The client is closed.")
+            if self._pending >= self.max_buffered:
+                if not self._condition.wait_for(lambda: self._pending < self.max_buffered or self._closed, self.block_timeout):
+                    raise BufferFullError(f"{self._pending} events are already waiting to be sent.")
+                if self._closed:
+                    raise ClientError("The client is closed.")
+            was_empty = not self.batcher.events
+            self.batcher.add(event)
+            self._pending += 1
+            full = self.batcher.is_full()
+            if self._thread is not None:
+                if was_empty or full:
+                    self._condition.notify_all()
+                return
+        if full:
+            self._send_due()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send every event logged so far. Returns False if they were not all sent or dropped
+        within `timeout` seconds (only with a background thread).
+        """
+        if self._thread is None:
+            self._send_due(flush=True)
+            return True
+        with self._condition:
+            position = self.batcher.added
+            self.batcher.flush_position = max(self.batcher.flush_position, position)
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._completed >= position, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Send the buffered events, stop the background thread and close the connections."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        atexit.unregister(self.close)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        else:
+            self._send_due(flush=True)
+        self.transport.close()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "buffered": len(self.batcher.events),
+                "pending": self._pending,
+                "sent_events": self.sent_events,
+                "dropped_events": self.dropped_events,
+                "retries": self.retries
+            }
+
+    def __enter__(self) -> "EventClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self.batcher.is_due(closing=self._closed):
+                    if self._closed:
+                        return
+                    self._condition.wait(self.batcher.wait_time())
+                events = self.batcher.take()
+            self._send(events)
+
+    def _send_due(self, flush: bool = False) -> None:
+        with self._send_lock:
+            while True:
+                with self._condition:
+                    if not (self.batcher.is_full() or (flush and self.batcher.events)):
+                        return
+                    events = self.batcher.take()
+                self._send(events)
+
+    def _send(self, events: List[bytes]) -> None:
+        batch = Batch(events, self.compression)
+        error = self._send_batch(batch)
+        with self._condition:
+            if error is None:
+                self.sent_events += len(events)
+            else:
+                self.dropped_events += len(events)
+            self._pending -= len(events)
+            self._completed += len(events)
+            self._condition.notify_all()
+        if error is not None:
+            try:
+                self.on_error(error, events)
+            except Exception:
+                logger.exception("on_error callback failed")
+
+    def _send_batch(self, batch: Batch) -> Optional[RequestError]:
+        """Send a batch, retrying as the policy allows; returns the error if it was dropped."""
+        while True:
+            status, headers, body, error = None, {}, b"", None
+            try:
+                status, headers, body = self.transport.request("POST", BATCH_PATH, batch.body, batch.headers())
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if status is not None and 200 <= status < 300:
+                return None
+            if status == 415 and batch.encoding is not None:
+                # A server without this encoding lists the ones it takes
+                fallback = fallback_encoding(headers)
+                self.compression = fallback if fallback != batch.encoding else None
+                batch.encode(self.compression)
+                continue
+            batch.attempts += 1
+            delay = self.retry_policy.delay(batch.attempts, status, headers)
+            if delay is None:
+                return response_error(status, body, error)
+            logger.warning("Retrying a batch of %s events in %.2fs after %s", len(batch.events), delay, status or error)
+            self.retries += 1
+            time.sleep(delay)
@@ -0,0 +1,289 @@
+"""
+Pieces shared by EventClient and AsyncEventClient: event encoding, the in-memory
+batcher, request compression, the retry policy and the keep-alive HTTP transport.
+Only the standard library is needed; zstd compression is used when `zstandard` is
+installed.
+"""
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BATCH_PATH = "/api/events/batch"
+REGISTER_PATH = "/api/app/register"
+MAX_BATCH_SIZE = 10000  # MAX_BATCH_SIZE of /api/events/batch
+DEFAULT_STREAM = "default"
+# Smaller bodies are sent uncompressed; compressing them saves nothing
+COMPRESS_MIN_BYTES = 1024
+RETRY_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+
+class ClientError(Exception):
+    """Base class of the client's errors."""
+
+
+class BufferFullError(ClientError):
+    """Raised by log() when the buffer stays full for longer than the block timeout."""
+
+
+class RequestError(ClientError):
+    """A request that failed for good: rejected by the server, or out of retries."""
+
+    def __init__(self, message: str, status: Optional[int] = None, body: bytes = b""):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+def encode_event(type: str, data: Optional[dict] = None, source: Optional[str] = None, stream: str = DEFAULT_STREAM) -> bytes:
+    """One event of a /api/events/batch body, as JSON."""
+    event = {"type": type, "data": data if data is not None else {}, "stream": stream}
+    if source is not None:
+        event["source"] = source
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def resolve_compression(compression: Optional[str]) -> Optional[str]:
+    """'auto' is zstd if `zstandard` is installed, else gzip; None sends bodies as they are."""
+    if compression == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package.")
+    if compression not in (None, "gzip", "zstd"):
+        raise ValueError(f"Unknown compression {compression!r}.")
+    return compression
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        # Level 6 is the usual balance; 9 costs producers far more CPU for a few percent
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+
+class Batch:
+    """
+    A request's worth of encoded events. Its Idempotency-Key is fixed when the batch is
+    cut, so every retry of it is recognised by the server.
+    """
+
+    def __init__(self, events: List[bytes], encoding: Optional[str]):
+        self.events = events
+        self.idempotency_key = uuid.uuid4().hex
+        self.attempts = 0
+        self.body = b""
+        self.encoding = None
+        self.encode(encoding)
+
+    def encode(self, encoding: Optional[str]) -> None:
+        body = b"[" + b",".join(self.events) + b"]"
+        self.encoding = encoding if encoding is not None and len(body) >= COMPRESS_MIN_BYTES else None
+        self.body = compress(body, self.encoding)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json", "Idempotency-Key": self.idempotency_key}
+        if self.encoding is not None:
+            headers["Content-Encoding"] = self.encoding
+        return headers
+
+
+class Batcher:
+    """
+    Buffer of encoded events, cut into batches of at most `batch_size` events and
+    `max_batch_bytes` bytes. A batch is due when one is full, when the oldest buffered
+    event has waited `flush_interval` seconds, or when a flush asks for it. Not thread
+    safe; each client guards it with its own lock.
+    """
+
+    def __init__(self, batch_size: int, max_batch_bytes: int, flush_interval: float):
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}.")
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.events: List[bytes] = []
+        self.size = 0
+        self.oldest: Optional[float] = None
+        # Events ever buffered and ever cut into batches; a flush waits for a position
+        self.added = 0
+        self.taken = 0
+        self.flush_position = 0
+
+    def add(self, event: bytes) -> None:
+        if not self.events:
+            self.oldest = time.monotonic()
+        self.events.append(event)
+        self.size += len(event) + 1
+        self.added += 1
+
+    def is_full(self) -> bool:
+        return len(self.events) >= self.batch_size or self.size >= self.max_batch_bytes
+
+    def is_due(self, closing: bool = False) -> bool:
+        if not self.events:
+            return False
+        return (
+            closing or self.is_full() or self.taken < self.flush_position
+            or time.monotonic() - self.oldest >= self.flush_interval
+        )
+
+    def wait_time(self) -> Optional[float]:
+        """Seconds until the buffered events are due by age, or None when there are none."""
+        if not self.events:
+            return None
+        return max(0.0, self.oldest + self.flush_interval - time.monotonic())
+
+    def take(self) -> List[bytes]:
+        """Cut the next batch off the buffer, oldest events first."""
+        count, size = 0, 0
+        for event in self.events[:self.batch_size]:
+            if count and size + len(event) + 1 > self.max_batch_bytes:
+                break
+            count += 1
+            size += len(event) + 1
+        events, self.events = self.events[:count], self.events[count:]
+        self.size -= size
+        self.taken += count
+        self.oldest = time.monotonic() if self.events else None
+        return events
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, honouring Retry-After, for up to `max_retries` retries."""
+
+    def __init__(self, max_retries: int = 5, backoff: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+
+    def delay(self, attempts: int, status: Optional[int], headers: Dict[str, str]) -> Optional[float]:
+        """
+        Seconds to wait before retrying a request that has failed `attempts` times with
+        `status` (None for a connection error), or None if it must not be retried.
+        """
+        if attempts > self.max_retries or (status is not None and status not in RETRY_STATUSES):
+            return None
+        retry_after = parse_retry_after(headers.get("retry-after"))
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return min(self.max_delay, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header, given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport:
+    """
+    HTTP/1.1 client for one API base URL, keeping up to `max_connections` idle keep-alive
+    connections for reuse. Thread safe: each request takes a connection for itself.
+    """
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 30.0, max_connections: int = 4):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL {base_url!r}.")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_connections:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send one request; returns the status, the headers (lower-cased names) and the
+        whole body. Connection errors are raised as OSError or http.client.HTTPException.
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept", "application/json")
+        if self.token is not None:
+            headers["Authorization"] = f"Bearer {self.token}"
+        connection = self._connection()
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, {name.lower(): value for name, value in response.getheaders()}, content
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def fallback_encoding(headers: Dict[str, str]) -> Optional[str]:
+    """The encoding to retry with after a 415: gzip if the server accepts it, else none."""
+    accepted = [encoding.strip().lower() for encoding in headers.get("accept-encoding", "").split(",")]
+    return "gzip" if "gzip" in accepted else None
+
+
+def response_error(status: Optional[int], body: bytes, error: Optional[BaseException]) -> RequestError:
+    if status is None:
+        return RequestError(f"Request failed: {error}")
+    try:
+        detail = json.loads(body).get("detail", body.decode(errors="replace"))
+    except (ValueError, AttributeError):
+        detail = body.decode(errors="replace")
+    return RequestError(f"Request failed with status {status}: {detail}", status, body)
+
+
+def register_app(base_url: str, name: str, timeout: float = 30.0) -> str:
+    """Register an application through /api/app/register and return its JWT."""
+    transport = Transport(base_url, timeout=timeout)
+    try:
+        status, _, body = transport.request(
+            "POST", REGISTER_PATH, json.dumps({"name": name}).encode(), {"Content-Type": "application/json"}
+        )
+    finally:
+        transport.close()
+    if status != 201:
+        raise response_error(status, body, None)
+    return json.loads(body)["token"]
@@ -0,0 +1,71 @@
+"""
+Compares two benchmark result files written by `python -m benchmarks.run`, matching
+results by scenario and parameters:
+
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 10]
+
+Prints throughput and p50/p95/p99 latency of both runs and the change. Exits with
+status 1 when a result's throughput dropped, or its p95 latency rose, by more than
+`--threshold` percent, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def load_results(path: str) -> Dict[Tuple[str, str], dict]:
+    with open(path) as f:
+        run = json.load(f)
+    return {(result["scenario"], json.dumps(result["params"], sort_keys=True)): result for result in run["results"]}
+
+
+def change(baseline: float, candidate: float) -> Optional[float]:
+    """Relative change in percent, or None without a baseline."""
+    if not baseline:
+        return None
+    return (candidate - baseline) / baseline * 100
+
+
+def format_change(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float) -> List[str]:
+    """Print the comparison table; returns a description of every regression."""
+    baseline, candidate = load_results(baseline_path), load_results(candidate_path)
+    regressions = []
+    print(f"{'scenario':<14} {'params':<52} {'throughput/s':>24} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        throughput = change(before["throughput_per_second"], after["throughput_per_second"])
+        columns = [f"{before['throughput_per_second']:.1f}->{after['throughput_per_second']:.1f} {format_change(throughput)}"]
+        for name in ("p50", "p95", "p99"):
+            latency_before, latency_after = before["latency_ms"][name], after["latency_ms"][name]
+            columns.append(f"{latency_before:.1f}->{latency_after:.1f} {format_change(change(latency_before, latency_after))}")
+        print(f"{key[0]:<14} {key[1]:<52} {columns[0]:>24} {columns[1]:>22} {columns[2]:>22} {columns[3]:>22}")
+
+        p95 = change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        if throughput is not None and throughput < -threshold:
+            regressions.append(f"{key[0]} {key[1]}: throughput {format_change(throughput)}")
+        if p95 is not None and p95 > threshold:
+            regressions.append(f"{key[0]} {key[1]}: p95 latency {format_change(p95)}")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{key[0]} {key[1]}: errors {before['errors']} -> {after['errors']}")
+
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]:<14} {key[1]:<52} only in {'baseline' if key in baseline else 'candidate'}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent.")
+    args = parser.parse_args()
+
+    regressions = compare(args.baseline, args.candidate, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
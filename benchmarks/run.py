@@ -0,0 +1,424 @@
+"""
+Load and benchmark suite for the ingest, read and proof paths. It drives the HTTP API
+only, so it measures what a client sees: routing, auth, validation, the database and
+the response encoding.
+
+By default the API is started as a uvicorn subprocess against DATABASE_URL, after
+applying the migrations; point --url at a running deployment instead to benchmark
+that. Every run registers fresh apps through /api/app/register, so use a dedicated
+database. Run from the repository root:
+
+    python -m benchmarks.run [--chain-lengths 1k,10k,100k,1m,10m] [--concurrency 1,8,32]
+                             [--payload-bytes 128,1024,16384] [--output results.json]
+
+Scenarios:
+  ingest         POST /api/event for every payload size x concurrency
+  seed           POST /api/events/batch, growing one chain to each chain length
+  read_page      GET /api/events?limit=N, the newest page
+  read_walk      GET /api/events following next_cursor, page after page
+  read_filtered  GET /api/events?limit=N&type=..., an indexed filter
+  proof_full     GET /api/events/proof?full=true, every event re-verified
+  proof          GET /api/events/proof, from the last checkpoint
+
+Each result has the request count, errors, throughput and p50/p95/p99 latency, and
+the whole run (configuration, git commit, host) is written as JSON for
+`python -m benchmarks.compare`.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_BATCH_SIZE = 10000  # MAX_BATCH_SIZE of /api/events/batch
+EVENT_TYPES = 4
+COUNT_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_count(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000, '500' -> 500"""
+    value = value.strip().lower()
+    if value and value[-1] in COUNT_SUFFIXES:
+        return int(float(value[:-1]) * COUNT_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def parse_counts(value: str) -> List[int]:
+    return [parse_count(item) for item in value.split(",") if item.strip()]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    """Request count, throughput and latency percentiles (ms) of one measurement."""
+    ordered = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_per_second": round(len(latencies) / seconds, 1) if seconds > 0 else 0.0,
+        "latency_ms": {
+            "mean": to_ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "p50": to_ms(percentile(ordered, 50)),
+            "p95": to_ms(percentile(ordered, 95)),
+            "p99": to_ms(percentile(ordered, 99)),
+            "max": to_ms(ordered[-1]) if ordered else 0.0
+        }
+    }
+
+
+class Client:
+    """
+    Minimal HTTP/1.1 client with one keep-alive connection per thread, so the load
+    generator does not pay a TCP handshake per request.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def request(self, method: str, path: str, body=None, token: Optional[str] = None) -> Tuple[int, bytes, float]:
+        """Returns the status, the whole response body and the latency in seconds."""
+        headers = {"Accept": "application/json"}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = None
+        if body is not None:
+            payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        connection = self._connection()
+        started = time.perf_counter()
+        try:
+            connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        return response.status, data, time.perf_counter() - started
+
+
+def measure(requests: int, concurrency: int, send: Callable[[int], int]) -> dict:
+    """
+    Call `send(i)` for i in range(requests) from `concurrency` threads. `send` returns
+    the HTTP status; statuses of 400 and above and exceptions count as errors, and only
+    successful requests contribute latencies.
+    """
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            try:
+                status = send(i)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status is None or status >= 400:
+                    errors += 1
+                else:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def make_event(run_id: str, sequence: int, payload_bytes: int, stream: str = "default") -> dict:
+    """
+    A unique event whose `data` encodes to about `payload_bytes` bytes of JSON. Events
+    are deterministic for a run id, and unique so duplicate detection never rejects one.
+    """
+    data = {"run": run_id, "seq": sequence, "user": f"user-{sequence % 1000}", "amount": sequence % 997}
+    padding = payload_bytes - len(json.dumps(data)) - len(', "pad": ""')
+    if padding > 0:
+        data["pad"] = "x" * padding
+    return {"type": f"bench.{sequence % EVENT_TYPES}", "source": "benchmark", "stream": stream, "data": data}
+
+
+class Server:
+    """
+    The API under test: the deployment at `url`, or, without one, a uvicorn subprocess
+    on 127.0.0.1:`port` against DATABASE_URL, migrated first and stopped on exit.
+    """
+
+    def __init__(self, url: Optional[str], port: int, workers: int, log_level: str):
+        self.external = url is not None
+        self.url = url or f"http://127.0.0.1:{port}"
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.process = None
+
+    def __enter__(self) -> "Server":
+        if not self.external:
+            env = {**os.environ, "LOG_LEVEL": self.log_level}
+            subprocess.run(
+                [sys.executable, os.path.join("src", "database", "scripts", "migrate.py")],
+                cwd=REPOSITORY_ROOT, env=env, check=True
+            )
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+                 "--workers", str(self.workers), "--log-level", self.log_level.lower(), "--no-access-log"],
+                cwd=REPOSITORY_ROOT, env=env
+            )
+        self.wait_until_healthy()
+        return self
+
+    def wait_until_healthy(self, timeout: float = 60.0) -> None:
+        client = Client(self.url, timeout=5)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if client.request("GET", "/health")[0] == 200:
+                    return
+            except OSError:
+                pass
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError(f"API server exited with status {self.process.returncode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"API server at {self.url} did not become healthy within {timeout:.0f}s")
+            time.sleep(0.25)
+
+    def __exit__(self, *exc_info) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+class Benchmark:
+    def __init__(self, client: Client, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:12]
+        self.results = []
+
+    def record(self, scenario: str, params: dict, summary: dict, **extra) -> None:
+        result = {"scenario": scenario, "params": params, **summary, **extra}
+        self.results.append(result)
+        latency = summary["latency_ms"]
+        print(
+            f"{scenario:<14} {json.dumps(params, sort_keys=True):<52} "
+            f"{summary['throughput_per_second']:>10.1f}/s  p50 {latency['p50']:>9.2f}ms  "
+            f"p95 {latency['p95']:>9.2f}ms  p99 {latency['p99']:>9.2f}ms  errors {summary['errors']}",
+            flush=True
+        )
+
+    def register_app(self, label: str) -> str:
+        status, body, _ = self.client.request("POST", "/api/app/register", {"name": f"bench-{self.run_id}-{label}"})
+        if status != 201:
+            raise RuntimeError(f"App registration failed with {status}: {body[:200]!r}")
+        return json.loads(body)["token"]
+
+    def get(self, path: str, token: str, **params) -> Tuple[int, bytes]:
+        query = urlencode({key: value for key, value in params.items() if value is not None}, doseq=True)
+        status, body, _ = self.client.request("GET", f"{path}?{query}" if query else path, token=token)
+        return status, body
+
+    def run_ingest(self) -> None:
+        for payload_bytes in self.args.payload_bytes:
+            token = self.register_app(f"ingest-{payload_bytes}")
+            sequence = iter(range(sys.maxsize))
+            streams = [f"s{index}" for index in range(self.args.ingest_streams)]
+
+            def send(i: int) -> int:
+                n = next(sequence)
+                body = make_event(self.run_id, n, payload_bytes, streams[n % len(streams)])
+                return self.client.request("POST", "/api/event", body, token=token)[0]
+
+            measure(self.args.warmup, max(self.args.concurrency), send)
+            for concurrency in self.args.concurrency:
+                params = {"payload_bytes": payload_bytes, "concurrency": concurrency, "streams": len(streams)}
+                self.record("ingest", params, measure(self.args.ingest_requests, concurrency, send))
+
+    def seed(self, token: str, start: int, stop: int) -> None:
+        """Append events [start, stop) to the chain with batches of SEED_BATCH_SIZE."""
+        batches = [(offset, min(offset + SEED_BATCH_SIZE, stop)) for offset in range(start, stop, SEED_BATCH_SIZE)]
+
+        def send(i: int) -> int:
+            first, last = batches[i]
+            events = [make_event(self.run_id, n, self.args.seed_payload_bytes) for n in range(first, last)]
+            return self.client.request("POST", "/api/events/batch", events, token=token)[0]
+
+        # Batches for one chain serialise on its head anyway; one request at a time keeps them in order
+        summary = measure(len(batches), 1, send)
+        if summary["errors"]:
+            raise RuntimeError(f"{summary['errors']} seed batches failed")
+        events_per_second = round((stop - start) / summary["seconds"], 1) if summary["seconds"] > 0 else 0.0
+        self.record("seed", {"from": start, "to": stop}, summary, events_per_second=events_per_second)
+
+    def run_chain(self) -> None:
+        token = self.register_app("chain")
+        length = 0
+        for target in sorted(set(self.args.chain_lengths)):
+            self.seed(token, length, target)
+            length = target
+            self.run_reads(token, length)
+            self.run_proofs(token, length)
+
+    def run_reads(self, token: str, length: int) -> None:
+        page_size, requests, concurrency = self.args.page_size, self.args.read_requests, self.args.read_concurrency
+
+        def read_page(i: int) -> int:
+            return self.get("/api/events", token, limit=page_size)[0]
+
+        params = {"chain_length": length, "page_size": page_size, "concurrency": concurrency}
+        self.record("read_page", params, measure(requests, concurrency, read_page))
+
+        cursor = [None]
+
+        def read_next(i: int) -> int:
+            status, body = self.get("/api/events", token, limit=page_size, after=cursor[0])
+            if status == 200:
+                cursor[0] = json.loads(body)["next_cursor"]
+            return status
+
+        # Each page needs the previous page's cursor; stops short at the end of the chain
+        pages = min(requests, math.ceil(length / page_size))
+        self.record("read_walk", {"chain_length": length, "page_size": page_size}, measure(pages, 1, read_next))
+
+        def read_filtered(i: int) -> int:
+            return self.get("/api/events", token, limit=page_size, type=f"bench.{i % EVENT_TYPES}")[0]
+
+        self.record("read_filtered", params, measure(requests, concurrency, read_filtered))
+
+    def run_proofs(self, token: str, length: int) -> None:
+        for scenario, full in (("proof_full", "true"), ("proof", None)):
+            reports = []
+
+            def prove(i: int) -> int:
+                status, body = self.get("/api/events/proof", token, full=full)
+                if status == 200:
+                    reports.append(json.loads(body))
+                return status
+
+            summary = measure(self.args.proof_repeats, 1, prove)
+            rates = [report["events_per_second"] for report in reports]
+            self.record(
+                scenario, {"chain_length": length}, summary,
+                verified_events=reports[-1]["verified_events"] if reports else None,
+                server_events_per_second=round(sum(rates) / len(rates), 1) if rates else None
+            )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Benchmark a running API instead of starting one.")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the API started by the benchmark.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the API started by the benchmark.")
+    parser.add_argument("--server-log-level", default="WARNING", help="LOG_LEVEL of the API started by the benchmark.")
+    parser.add_argument("--scenarios", default="ingest,chain", help="Comma-separated: ingest, chain (seed, reads and proofs).")
+    parser.add_argument("--concurrency", type=parse_counts, default=[1, 8, 32], help="Ingest client concurrencies.")
+    parser.add_argument("--payload-bytes", type=parse_counts, default=[128, 1024, 16384], help="Ingest event data sizes.")
+    parser.add_argument("--ingest-requests", type=parse_count, default=2000, help="Events per ingest measurement.")
+    parser.add_argument("--ingest-streams", type=int, default=1, help="Streams the ingested events are spread over.")
+    parser.add_argument("--warmup", type=parse_count, default=100, help="Unmeasured requests before each payload size.")
+    parser.add_argument("--chain-lengths", type=parse_counts, default=[1_000, 10_000, 100_000], help="e.g. 1k,10k,100k,1m,10m")
+    parser.add_argument("--seed-payload-bytes", type=parse_count, default=256, help="Event data size of seeded chains.")
+    parser.add_argument("--page-size", type=int, default=100, help="limit of the read requests.")
+    parser.add_argument("--read-requests", type=parse_count, default=200, help="Requests per read measurement.")
+    parser.add_argument("--read-concurrency", type=int, default=8, help="Client concurrency of the read measurements.")
+    parser.add_argument("--proof-repeats", type=int, default=3, help="Proofs per proof measurement.")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--output", help="Result file; defaults to benchmarks/results/<time>-<commit>.json.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> str:
+    args = parse_args(argv)
+    scenarios = {scenario.strip() for scenario in args.scenarios.split(",")}
+    commit = git_commit()
+    started_at = datetime.now(timezone.utc)
+
+    with Server(args.url, args.port, args.workers, args.server_log_level) as server:
+        benchmark = Benchmark(Client(server.url, args.timeout), args)
+        if "ingest" in scenarios:
+            benchmark.run_ingest()
+        if "chain" in scenarios:
+            benchmark.run_chain()
+
+    run = {
+        "version": 1,
+        "run_id": benchmark.run_id,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "target": args.url or "local",
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": vars(args),
+        "results": benchmark.results
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'unknown')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {output}", flush=True)
+    return output
+
+
+if __name__ == "__main__":
+    main()
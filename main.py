@@ -1,12 +1,49 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from src.routes import app_routes
 from src.routes import event_routes
+from src.database.db_service import close_pool, pool_stats
+from src.database.async_db_service import close_async_pool, async_pool_stats
+from src.database.replicas import replica_stats
+from src.auth_cache import auth_cache_stats
+from src.ingestion import start_ingestion, stop_ingestion, ingestion_stats
+from src.partitions import start_partition_maintenance, stop_partition_maintenance
+from src.live_tail import live_tail_stats, stop_live_tail
+from src.rate_limit import rate_limit_stats
+from src.compression import DecompressionMiddleware
+from src.logger import logging_stats
+from src.metrics import METRICS_ENABLED, GaugeFunction, MetricsMiddleware, render_metrics
 
-app = FastAPI()
+
+def pool_gauges() -> dict:
+    gauges = {}
+    for pool, stats in (("async", async_pool_stats()), ("sync", pool_stats())):
+        for state in ("size", "idle", "in_use", "waiting"):
+            if state in stats:
+                gauges[(pool, state)] = stats[state]
+    return gauges
+
+
+GaugeFunction("db_pool_connections", "Connections of the database pools by state.", ("pool", "state"), pool_gauges)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_partition_maintenance()
+    await start_ingestion()
+    yield
+    await stop_live_tail()
+    await stop_ingestion()
+    await stop_partition_maintenance()
+    await close_async_pool()
+    close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +53,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Ingest bodies may be sent gzip or zstd compressed
+app.add_middleware(DecompressionMiddleware, paths=("/api/event", "/api/events/batch"))
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(app_routes.router, prefix="/api/app")
 app.include_router(event_routes.router, prefix="/api", tags=["Events"])
 
@@ -28,6 +71,34 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/pool")
+def pool_health():
+    return {"async": async_pool_stats(), "sync": pool_stats(), "replicas": replica_stats()}
+
+@app.get("/health/auth-cache")
+def auth_cache_health():
+    return auth_cache_stats()
+
+@app.get("/health/ingest")
+def ingest_health():
+    return ingestion_stats()
+
+@app.get("/health/logging")
+def logging_health():
+    return logging_stats()
+
+@app.get("/health/tail")
+def tail_health():
+    return live_tail_stats()
+
+@app.get("/health/rate-limit")
+def rate_limit_health():
+    return rate_limit_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 index_dir = "frontend"
 if os.path.exists(index_dir):
     app.mount("/static", StaticFiles(
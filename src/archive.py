@@ -0,0 +1,569 @@
+"""
+Cold storage for old events. The archiver seals the oldest range of each chain into an
+append-only, compressed segment file on local disk, records it in `archive_segments`
+and deletes its events from the events table in the same transaction. Reads open
+segments through mmap and only decompress the blocks they need. Archivers of the same
+chain take turns through an advisory lock, every segment file gets a name of its own,
+and a file that no `archive_segments` row references is only ever removed by
+sweep_segment_files().
+
+Segment file layout:
+
+    MAGIC | block ... | index | footer
+
+Each block is a zlib-compressed JSON list of up to EVENT_ARCHIVE_BLOCK_EVENTS events
+in chain order. The index (also zlib-compressed JSON) holds the segment's chain
+position (first and last event ids, the hash it starts from and ends at) and, per
+block, its offset, length, crc32, event count and id and timestamp range, so readers
+seek by id or time without touching other blocks. The fixed-size footer locates the
+index.
+"""
+import bisect
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.database.db_service import db_scope
+from src.database.db_access_objects.anchor_dao import AnchorDAO
+from src.database.db_access_objects.app_dao import AppDAO
+from src.database.db_access_objects.archive_segment_dao import ArchiveSegmentDAO
+from src.database.db_access_objects.archive_segment_record import ArchiveSegmentRecord
+from src.database.db_access_objects.event_dao import EventDAO
+from src.database.db_access_objects.event_filter import EventFilter
+from src.database.db_access_objects.event_record import EventRecord, DEFAULT_STREAM
+from src.database.db_access_objects.merkle_dao import MerkleDAO
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+EVENT_ARCHIVE_DIR = os.getenv("EVENT_ARCHIVE_DIR", "archive")
+EVENT_ARCHIVE_AFTER_DAYS = int(os.getenv("EVENT_ARCHIVE_AFTER_DAYS", "0"))
+EVENT_ARCHIVE_SEGMENT_EVENTS = int(os.getenv("EVENT_ARCHIVE_SEGMENT_EVENTS", "100000"))
+EVENT_ARCHIVE_BLOCK_EVENTS = int(os.getenv("EVENT_ARCHIVE_BLOCK_EVENTS", "1000"))
+EVENT_ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("EVENT_ARCHIVE_COMPRESSION_LEVEL", "6"))
+EVENT_ARCHIVE_OPEN_SEGMENTS = int(os.getenv("EVENT_ARCHIVE_OPEN_SEGMENTS", "64"))
+EVENT_ARCHIVE_SWEEP_AFTER_SECONDS = int(os.getenv("EVENT_ARCHIVE_SWEEP_AFTER_SECONDS", "86400"))
+
+MAGIC = b"EVTSEG01"
+# index offset, index length, magic
+FOOTER = struct.Struct("<QQ8s")
+SEGMENT_SUFFIX = ".seg"
+TMP_SUFFIX = ".tmp"
+
+# (timestamp, id): the key events are listed by, newest first
+EventKey = Tuple[datetime, int]
+
+
+class ArchiveCorruptionError(Exception):
+    """Raised when a segment file is truncated or a block fails its checksum."""
+
+
+def _event_key(event: EventRecord) -> EventKey:
+    return event.timestamp, event.id
+
+
+@dataclass
+class ArchiveBlock:
+    """Location and id/time range of one compressed block of a segment file."""
+    offset: int
+    length: int
+    crc: int
+    count: int
+    first_id: int
+    last_id: int
+    min_timestamp: datetime
+    max_timestamp: datetime
+
+    def to_index(self) -> list:
+        return [
+            self.offset, self.length, self.crc, self.count, self.first_id, self.last_id,
+            self.min_timestamp.isoformat(), self.max_timestamp.isoformat()
+        ]
+
+    @classmethod
+    def from_index(cls, entry: list):
+        offset, length, crc, count, first_id, last_id, min_timestamp, max_timestamp = entry
+        return cls(
+            offset, length, crc, count, first_id, last_id,
+            datetime.fromisoformat(min_timestamp), datetime.fromisoformat(max_timestamp)
+        )
+
+
+class SegmentWriter:
+    """Writes one segment file: events are added in chain order and flushed a block at a time."""
+
+    def __init__(
+        self,
+        path: str,
+        app_id: int,
+        stream: str,
+        block_events: int = EVENT_ARCHIVE_BLOCK_EVENTS,
+        compression_level: int = EVENT_ARCHIVE_COMPRESSION_LEVEL
+    ):
+        self.path = path
+        self.app_id = app_id
+        self.stream = stream
+        self.block_events = block_events
+        self.compression_level = compression_level
+        self.blocks: List[ArchiveBlock] = []
+        self.first: Optional[EventRecord] = None
+        self.last: Optional[EventRecord] = None
+        self.event_count = 0
+        self._pending: List[EventRecord] = []
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._tmp_path = path + TMP_SUFFIX
+        self.finished = False
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+
+    def add(self, event: EventRecord) -> None:
+        if self.first is None:
+            self.first = event
+        self.last = event
+        self.event_count += 1
+        self._pending.append(event)
+        if len(self._pending) >= self.block_events:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._pending:
+            return
+        rows = [
+            [
+                event.id, event.type, event.source, event.event_data, event.timestamp.isoformat(),
+                event.event_hash, event.prev_event_hash, event.leaf_index
+            ]
+            for event in self._pending
+        ]
+        body = zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), self.compression_level)
+        timestamps = [event.timestamp for event in self._pending]
+        self.blocks.append(ArchiveBlock(
+            offset=self._file.tell(),
+            length=len(body),
+            crc=zlib.crc32(body),
+            count=len(self._pending),
+            first_id=self._pending[0].id,
+            last_id=self._pending[-1].id,
+            min_timestamp=min(timestamps),
+            max_timestamp=max(timestamps)
+        ))
+        self._file.write(body)
+        self._pending = []
+
+    def finish(self) -> ArchiveSegmentRecord:
+        """Write the index and footer, make the file durable under its final name and describe it."""
+        self._flush_block()
+        index = {
+            "app_id": self.app_id,
+            "stream": self.stream,
+            "first_event_id": self.first.id,
+            "last_event_id": self.last.id,
+            "event_count": self.event_count,
+            "prev_event_hash": self.first.prev_event_hash,
+            "last_event_hash": self.last.event_hash,
+            "blocks": [block.to_index() for block in self.blocks]
+        }
+        body = zlib.compress(json.dumps(index, separators=(",", ":")).encode(), self.compression_level)
+        index_offset = self._file.tell()
+        self._file.write(body)
+        self._file.write(FOOTER.pack(index_offset, len(body), MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        self.finished = True
+        dir_fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return ArchiveSegmentRecord(
+            app_id=self.app_id,
+            stream=self.stream,
+            first_event_id=self.first.id,
+            last_event_id=self.last.id,
+            event_count=self.event_count,
+            min_timestamp=min(block.min_timestamp for block in self.blocks),
+            max_timestamp=max(block.max_timestamp for block in self.blocks),
+            prev_event_hash=self.first.prev_event_hash,
+            last_event_hash=self.last.event_hash
+        )
+
+    def abort(self) -> None:
+        """
+        Discard an unfinished file. A finished one stays: its segment row may have been
+        committed even though the commit failed to acknowledge, and if not,
+        sweep_segment_files() removes it later.
+        """
+        if not self._file.closed:
+            self._file.close()
+        if not self.finished and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class ArchiveSegment:
+    """A segment file opened read-only through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._map)
+        if size < len(MAGIC) + FOOTER.size or self._map[:len(MAGIC)] != MAGIC:
+            raise ArchiveCorruptionError(f"{path} is not an archive segment.")
+        index_offset, index_length, magic = FOOTER.unpack_from(self._map, size - FOOTER.size)
+        if magic != MAGIC or index_offset + index_length > size - FOOTER.size:
+            raise ArchiveCorruptionError(f"{path} has a damaged footer.")
+        index = json.loads(zlib.decompress(self._map[index_offset:index_offset + index_length]))
+        self.app_id = index["app_id"]
+        self.stream = index["stream"]
+        self.blocks = [ArchiveBlock.from_index(entry) for entry in index["blocks"]]
+        self._block_last_ids = [block.last_id for block in self.blocks]
+
+    def read_block(self, block: ArchiveBlock) -> List[EventRecord]:
+        body = self._map[block.offset:block.offset + block.length]
+        if zlib.crc32(body) != block.crc:
+            raise ArchiveCorruptionError(f"Block at offset {block.offset} of {self.path} fails its checksum.")
+        return [
+            EventRecord(
+                id=event_id,
+                app_id=self.app_id,
+                type=event_type,
+                source=source,
+                event_data=event_data,
+                timestamp=datetime.fromisoformat(timestamp),
+                event_hash=event_hash,
+                prev_event_hash=prev_event_hash,
+                leaf_index=leaf_index,
+                stream=self.stream
+            )
+            for event_id, event_type, source, event_data, timestamp, event_hash, prev_event_hash, leaf_index
+            in json.loads(zlib.decompress(body))
+        ]
+
+    def iter_events(self, after_id: Optional[int] = None) -> Iterator[EventRecord]:
+        """The segment's events in chain order, starting after an event id."""
+        after_id = after_id or 0
+        for block in self.blocks[bisect.bisect_right(self._block_last_ids, after_id):]:
+            for event in self.read_block(block):
+                if event.id > after_id:
+                    yield event
+
+    def find(self, event_id: int) -> Optional[EventRecord]:
+        position = bisect.bisect_left(self._block_last_ids, event_id)
+        if position == len(self.blocks) or self.blocks[position].first_id > event_id:
+            return None
+        return next((event for event in self.read_block(self.blocks[position]) if event.id == event_id), None)
+
+
+_open_segments: "OrderedDict[str, ArchiveSegment]" = OrderedDict()
+_open_segments_lock = threading.Lock()
+
+
+def segment_path(relative_path: str) -> str:
+    return os.path.join(EVENT_ARCHIVE_DIR, relative_path)
+
+
+def open_segment(relative_path: str) -> ArchiveSegment:
+    """
+    Open a segment through a small LRU of mmaps, so hot segments are not re-opened and
+    their index re-parsed on every read. An evicted mapping is closed once no reader
+    holds it any more.
+    """
+    with _open_segments_lock:
+        segment = _open_segments.get(relative_path)
+        if segment is not None:
+            _open_segments.move_to_end(relative_path)
+            return segment
+    segment = ArchiveSegment(segment_path(relative_path))
+    with _open_segments_lock:
+        _open_segments[relative_path] = segment
+        while len(_open_segments) > EVENT_ARCHIVE_OPEN_SEGMENTS:
+            _open_segments.popitem(last=False)
+    return segment
+
+
+class ArchiveView:
+    """Reads over a set of archive segments of one app, e.g. to merge them into event listings."""
+
+    def __init__(self, segments: List[ArchiveSegmentRecord]):
+        self.segments = segments
+        self._ranges: Dict[str, List[Tuple[int, int]]] = {}
+        for segment in sorted(segments, key=lambda s: s.first_event_id):
+            self._ranges.setdefault(segment.stream, []).append((segment.first_event_id, segment.last_event_id))
+
+    def __bool__(self) -> bool:
+        return bool(self.segments)
+
+    def contains(self, event: EventRecord) -> bool:
+        """Whether an event (e.g. read from the table just before it was archived) lies in a segment."""
+        return self.contains_id(event.stream, event.id)
+
+    def contains_id(self, stream: str, event_id: int) -> bool:
+        ranges = self._ranges.get(stream, [])
+        position = bisect.bisect_right(ranges, (event_id, float("inf"))) - 1
+        return position >= 0 and ranges[position][0] <= event_id <= ranges[position][1]
+
+    def _segments(self, event_filter: Optional[EventFilter]) -> List[ArchiveSegmentRecord]:
+        if not event_filter:
+            return self.segments
+        return [
+            segment for segment in self.segments
+            if (event_filter.stream is None or segment.stream == event_filter.stream)
+            and event_filter.in_time_range(segment.min_timestamp, segment.max_timestamp)
+        ]
+
+    def _select(self, events: List[EventRecord], event_filter: Optional[EventFilter]) -> List[EventRecord]:
+        if not event_filter:
+            return events
+        events = [event for event in events if event_filter.matches(event)]
+        if event_filter.data_path is not None and events:
+            flags = EventDAO().match_data_path([event.event_data for event in events], event_filter.data_path)
+            events = [event for event, matched in zip(events, flags) if matched]
+        return events
+
+    def find_event(self, event_id: int) -> Optional[EventRecord]:
+        for segment in self.segments:
+            if segment.first_event_id <= event_id <= segment.last_event_id:
+                event = open_segment(segment.path).find(event_id)
+                if event is not None:
+                    return event
+        return None
+
+    def read_page(
+        self,
+        limit: int,
+        after: Optional[EventKey] = None,
+        before: Optional[EventKey] = None,
+        event_filter: Optional[EventFilter] = None
+    ) -> Tuple[List[EventRecord], bool]:
+        """
+        The archived counterpart of EventDAO.get_page_by_app_id: one page of events newest
+        first, and whether more exist in that direction. Blocks are visited nearest the
+        cursor first and skipped once they cannot hold a closer event than the page has.
+        """
+        event_filter = event_filter or EventFilter()
+        ascending = before is not None
+        if ascending:
+            matches = lambda key: key > before
+            in_range = lambda lo, hi: hi >= before[0]
+            nearest = lambda lo, hi: lo
+        else:
+            matches = lambda key: after is None or key < after
+            in_range = lambda lo, hi: after is None or lo <= after[0]
+            nearest = lambda lo, hi: hi
+
+        candidates = [
+            (segment, block)
+            for segment in self._segments(event_filter) if in_range(segment.min_timestamp, segment.max_timestamp)
+            for block in open_segment(segment.path).blocks
+            if in_range(block.min_timestamp, block.max_timestamp)
+            and event_filter.in_time_range(block.min_timestamp, block.max_timestamp)
+        ]
+        candidates.sort(key=lambda c: nearest(c[1].min_timestamp, c[1].max_timestamp), reverse=not ascending)
+
+        found: List[EventRecord] = []
+        for segment, block in candidates:
+            if len(found) > limit:
+                bound, worst = nearest(block.min_timestamp, block.max_timestamp), found[-1].timestamp
+                if (bound > worst) if ascending else (bound < worst):
+                    break
+            events = [e for e in open_segment(segment.path).read_block(block) if matches(_event_key(e))]
+            found.extend(self._select(events, event_filter))
+            found.sort(key=_event_key, reverse=not ascending)
+            del found[limit + 1:]
+
+        has_more = len(found) > limit
+        events = found[:limit]
+        if ascending:
+            events.reverse()
+        return events, has_more
+
+    def iter_newest_first(self, chunk_size: int = 1000, event_filter: Optional[EventFilter] = None) -> Iterator[EventRecord]:
+        """Every archived event (matching `event_filter`), newest first, one page of `chunk_size` at a time."""
+        after = None
+        while True:
+            events, has_more = self.read_page(chunk_size, after=after, event_filter=event_filter)
+            yield from events
+            if not has_more:
+                return
+            after = _event_key(events[-1])
+
+    def read_all(self, event_filter: Optional[EventFilter] = None) -> List[EventRecord]:
+        events = [
+            event
+            for segment in self._segments(event_filter)
+            for event in self._select(list(open_segment(segment.path).iter_events()), event_filter)
+        ]
+        events.sort(key=_event_key, reverse=True)
+        return events
+
+
+def merge_page(
+    live: List[EventRecord],
+    live_has_more: bool,
+    archived: List[EventRecord],
+    archived_has_more: bool,
+    limit: int,
+    view: ArchiveView,
+    ascending: bool = False
+) -> Tuple[List[EventRecord], bool]:
+    """Merge a page from the events table with the archived page for the same cursor."""
+    events = [event for event in live if not view.contains(event)] + archived
+    events.sort(key=_event_key, reverse=not ascending)
+    has_more = live_has_more or archived_has_more or len(events) > limit
+    events = events[:limit]
+    if ascending:
+        events.reverse()
+    return events, has_more
+
+
+def iter_chain(
+    app_id: int,
+    stream: str = DEFAULT_STREAM,
+    after_id: Optional[int] = None,
+    chunk_size: int = 1000,
+    event_dao: Optional[EventDAO] = None,
+    segment_dao: Optional[ArchiveSegmentDAO] = None
+) -> Iterator[EventRecord]:
+    """
+    The events of one app stream in chain order, read from its archive segments and then
+    from the events table, so verification runs across both as one chain.
+    """
+    event_dao = event_dao or EventDAO()
+    segment_dao = segment_dao or ArchiveSegmentDAO()
+    live = event_dao.iter_chain_by_app_id(app_id, stream, after_id=after_id, chunk_size=chunk_size)
+    # Opening the table cursor first fixes its snapshot before the segments are listed:
+    # a range sealed in between is then read from both and skipped in the table
+    first_live = next(live, None)
+    last_archived_id = after_id or 0
+    for segment in segment_dao.get_by_chain(app_id, stream, after_id=after_id):
+        yield from open_segment(segment.path).iter_events(after_id)
+        last_archived_id = max(last_archived_id, segment.last_event_id)
+    for event in itertools.chain([first_live] if first_live is not None else [], live):
+        if event.id > last_archived_id:
+            yield event
+
+
+def archive_cutoff(archive_after_days: int, now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(days=archive_after_days)
+
+
+def archive_chain(
+    app_id: int,
+    stream: str,
+    cutoff: datetime,
+    max_events: int = EVENT_ARCHIVE_SEGMENT_EVENTS
+) -> Optional[ArchiveSegmentRecord]:
+    """
+    Seal the chain's oldest unarchived events older than `cutoff`, up to `max_events`, into
+    a new segment. The range stops at the first newer event, so every segment is a
+    contiguous piece of the chain. Returns the sealed segment, or None if nothing is due.
+    """
+    event_dao, segment_dao, anchor_dao = EventDAO(), ArchiveSegmentDAO(), AnchorDAO()
+    writer = None
+    try:
+        with db_scope():
+            segment_dao.lock_chain(app_id, stream)
+            last_segment = segment_dao.get_last(app_id, stream)
+            anchor = anchor_dao.get_by_app_id(app_id, stream)
+            after_id = max(
+                last_segment.last_event_id if last_segment is not None else 0,
+                anchor.event_id if anchor is not None else 0
+            )
+            events = event_dao.iter_chain_by_app_id(app_id, stream, after_id=after_id, chunk_size=EVENT_ARCHIVE_BLOCK_EVENTS)
+            for event in itertools.islice(events, max_events):
+                if event.timestamp >= cutoff:
+                    break
+                if writer is None:
+                    # Event ids are unique across streams, and stream names may not be safe path
+                    # parts. The random suffix keeps a retried range from reusing a file name.
+                    relative_path = os.path.join(str(app_id), f"{event.id:012d}-{uuid.uuid4().hex[:12]}{SEGMENT_SUFFIX}")
+                    writer = SegmentWriter(segment_path(relative_path), app_id, stream)
+                writer.add(event)
+            events.close()
+            if writer is None:
+                return None
+
+            segment = writer.finish()
+            segment.path = relative_path
+            # Read the sealed file back before its events leave the table
+            if sum(1 for _ in ArchiveSegment(writer.path).iter_events()) != segment.event_count:
+                raise ArchiveCorruptionError(f"{writer.path} does not read back completely.")
+            sealed = segment_dao.seal(segment)
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    logger.info(
+        "Archived %s events of app_id=%s, stream=%s (%s..%s) to %s",
+        sealed.event_count, app_id, stream, sealed.first_event_id, sealed.last_event_id, sealed.path
+    )
+    return sealed
+
+
+def archive_events(archive_after_days: int = EVENT_ARCHIVE_AFTER_DAYS, app_ids: Optional[List[int]] = None) -> List[ArchiveSegmentRecord]:
+    """
+    Archive every chain's events older than `archive_after_days` days, one segment per
+    transaction. Chains whose Merkle tree is still being backfilled are skipped, since the
+    backfill reads their events from the table. A value of 0 disables archiving.
+    """
+    if archive_after_days <= 0:
+        logger.info("Event archiving is disabled")
+        return []
+    cutoff = archive_cutoff(archive_after_days)
+    merkle_dao = MerkleDAO()
+    if not app_ids:
+        app_ids = [app.id for app in AppDAO().get_all()]
+
+    sealed = []
+    for app_id in app_ids:
+        for head in merkle_dao.get_heads(app_id):
+            if not head.merkle_ready:
+                logger.info("Skipping archive of app_id=%s, stream=%s until its Merkle tree is ready", app_id, head.stream)
+                continue
+            while (segment := archive_chain(app_id, head.stream, cutoff)) is not None:
+                sealed.append(segment)
+    return sealed
+
+
+def sweep_segment_files(
+    min_age_seconds: int = EVENT_ARCHIVE_SWEEP_AFTER_SECONDS,
+    segment_dao: Optional[ArchiveSegmentDAO] = None
+) -> List[str]:
+    """
+    Delete segment files, finished or not, that no `archive_segments` row references,
+    e.g. left by an archiver whose transaction rolled back. Files younger than
+    `min_age_seconds` may belong to an archiver still running and are kept. Returns the
+    relative paths removed.
+    """
+    segment_dao = segment_dao or ArchiveSegmentDAO()
+    cutoff = time.time() - min_age_seconds
+    # Listed before the directory walk, so a file sealed meanwhile is too young to go
+    referenced = segment_dao.get_paths()
+    removed = []
+    for directory, _, filenames in os.walk(EVENT_ARCHIVE_DIR):
+        for filename in filenames:
+            if not filename.endswith((SEGMENT_SUFFIX, SEGMENT_SUFFIX + TMP_SUFFIX)):
+                continue
+            path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(path, EVENT_ARCHIVE_DIR)
+            if relative_path in referenced or os.path.getmtime(path) > cutoff:
+                continue
+            os.remove(path)
+            removed.append(relative_path)
+            logger.warning("Removed unreferenced archive segment file %s", relative_path)
+    return removed
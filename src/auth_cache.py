@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "30"))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any, Any], bool]) -> None:
+        """Drop every entry for which predicate(key, value) is true."""
+        with self._lock:
+            for key in [k for k, (_, v) in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# app_id -> api_key
+api_key_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+# sha256(token) -> verified JWT payload
+token_cache = TTLCache(AUTH_CACHE_SIZE, TOKEN_CACHE_TTL)
+# app_id -> (rate_limit, rate_burst, max_concurrency) of the app's record
+app_limits_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+
+def invalidate_app(app_id: int) -> None:
+    """Forget the cached key, limits and every verified token of an app (after its record changes)."""
+    api_key_cache.invalidate(app_id)
+    app_limits_cache.invalidate(app_id)
+    token_cache.invalidate_where(lambda _, payload: payload.get("app_id") == app_id)
+
+
+def auth_cache_stats() -> dict:
+    return {"api_keys": api_key_cache.stats(), "tokens": token_cache.stats(), "limits": app_limits_cache.stats()}
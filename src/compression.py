@@ -0,0 +1,147 @@
+"""
+Compressed request bodies. Clients may send the body of an ingest request with
+`Content-Encoding: gzip` or `zstd` (zstd needs the `zstandard` package). The middleware
+decompresses it before the route parses it, up to REQUEST_MAX_BODY_BYTES of
+decompressed data. Other encodings get a 415 that lists the supported ones.
+"""
+import gzip
+import io
+import os
+import zlib
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+REQUEST_MAX_BODY_BYTES = int(os.getenv("REQUEST_MAX_BODY_BYTES", str(256 * 1024 * 1024)))
+
+# Bodies at least this large are decompressed on the threadpool, not on the event loop
+THREADPOOL_MIN_BYTES = 64 * 1024
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+SUPPORTED_ENCODINGS = ("gzip", "zstd") if zstandard is not None else ("gzip",)
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+class BodyTooLargeError(Exception):
+    """Raised when a request body decompresses to more than the allowed size."""
+
+
+def decompress(body: bytes, encoding: str, max_bytes: int = REQUEST_MAX_BODY_BYTES) -> bytes:
+    """
+    Decode a `gzip` (or `x-gzip`) or `zstd` encoded body. Raises BodyTooLargeError past
+    `max_bytes` of output, without decompressing further, and ValueError on corrupt data.
+    """
+    if encoding in ("gzip", "x-gzip"):
+        reader = gzip.GzipFile(fileobj=io.BytesIO(body))
+    elif encoding == "zstd" and zstandard is not None:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body), read_across_frames=True)
+    else:
+        raise ValueError(f"Unsupported content encoding {encoding!r}.")
+    decoded = bytearray()
+    try:
+        with reader:
+            while len(decoded) <= max_bytes:
+                chunk = reader.read(min(READ_CHUNK_BYTES, max_bytes + 1 - len(decoded)))
+                if not chunk:
+                    break
+                decoded += chunk
+    except DECOMPRESSION_ERRORS as e:
+        raise ValueError(f"Invalid {encoding} body: {e}")
+    if len(decoded) > max_bytes:
+        raise BodyTooLargeError(f"Request body is larger than {max_bytes} bytes once decompressed.")
+    return bytes(decoded)
+
+
+class DecompressionMiddleware:
+    """
+    ASGI middleware that decompresses the bodies of requests to `paths` sent with a
+    Content-Encoding, and passes the route the plain body with a matching Content-Length.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_bytes: int = REQUEST_MAX_BODY_BYTES):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        encoding = self._content_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if encoding not in SUPPORTED_ENCODINGS and encoding != "x-gzip":
+            response = PlainTextResponse(
+                f"Unsupported Content-Encoding {encoding!r}.", status_code=415,
+                headers={"Accept-Encoding": ", ".join(SUPPORTED_ENCODINGS)}
+            )
+            await response(scope, receive, send)
+            return
+
+        chunks, received = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if received > self.max_bytes:
+                await PlainTextResponse(f"Request body is larger than {self.max_bytes} bytes.", status_code=413)(scope, receive, send)
+                return
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        try:
+            if len(body) >= THREADPOOL_MIN_BYTES:
+                decoded = await run_in_threadpool(decompress, body, encoding, self.max_bytes)
+            else:
+                decoded = decompress(body, encoding, self.max_bytes)
+        except BodyTooLargeError as e:
+            await PlainTextResponse(str(e), status_code=413)(scope, receive, send)
+            return
+        except ValueError as e:
+            logger.warning("Rejected %s request body for %s: %s", encoding, scope["path"], e)
+            await PlainTextResponse(str(e), status_code=400)(scope, receive, send)
+            return
+        logger.debug("Decompressed %s request body for %s: %s -> %s bytes", encoding, scope["path"], len(body), len(decoded))
+
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(decoded)).encode()))
+        # Updated in place: routing records scope["route"], which the metrics middleware reads
+        scope["headers"] = headers
+        delivered = False
+
+        async def receive_decoded() -> Message:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": decoded, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decoded, send)
+
+    @staticmethod
+    def _content_encoding(scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+                return None if encoding in ("", "identity") else encoding
+        return None
@@ -0,0 +1,263 @@
+import asyncio
+import itertools
+import json
+import re
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+import asyncpg
+
+from .db_service import (
+    DB_URL,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    DB_POOL_HEALTH_CHECK_INTERVAL,
+)
+from .replicas import REPLICA_LAG_SQL, Replica, replica_rotation, replicas
+from src.metrics import DB_CONNECTION_ACQUIRE
+
+_async_pool: Optional[asyncpg.Pool] = None
+_async_pool_lock = asyncio.Lock()
+_replica_pools: Dict[int, asyncpg.Pool] = {}
+
+# Scope shared by every get_async_db() call made while async_db_scope() is active.
+_async_scope: ContextVar = ContextVar("async_db_scope", default=None)
+
+
+def to_asyncpg(sql: str) -> str:
+    """Convert a psycopg2-style query (%s placeholders) to asyncpg's numbered $n style."""
+    counter = itertools.count(1)
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+
+
+async def _init_connection(conn) -> None:
+    # Decode json/jsonb to Python objects, as psycopg2 does for the sync DAOs
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Return the event-loop-wide asyncpg pool, creating it on first use."""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = await asyncpg.create_pool(
+                    DB_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_inactive_connection_lifetime=DB_POOL_HEALTH_CHECK_INTERVAL * 10,
+                    init=_init_connection,
+                )
+    return _async_pool
+
+
+async def _get_replica_pool(replica: Replica) -> asyncpg.Pool:
+    pool = _replica_pools.get(replica.index)
+    if pool is None:
+        async with _async_pool_lock:
+            pool = _replica_pools.get(replica.index)
+            if pool is None:
+                pool = _replica_pools[replica.index] = await asyncpg.create_pool(
+                    replica.dsn,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_inactive_connection_lifetime=DB_POOL_HEALTH_CHECK_INTERVAL * 10,
+                    init=_init_connection,
+                )
+    return pool
+
+
+async def close_async_pool() -> None:
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+    while _replica_pools:
+        _, pool = _replica_pools.popitem()
+        await pool.close()
+
+
+def async_pool_stats() -> dict:
+    if _async_pool is None:
+        return {"initialized": False}
+    size = _async_pool.get_size()
+    idle = _async_pool.get_idle_size()
+    return {
+        "initialized": True,
+        "min_size": _async_pool.get_min_size(),
+        "max_size": _async_pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+    }
+
+
+async def _acquire_from(pool: asyncpg.Pool):
+    try:
+        with DB_CONNECTION_ACQUIRE.time("async"):
+            return await pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Timed out after {DB_POOL_ACQUIRE_TIMEOUT}s waiting for a database connection.")
+
+
+async def _acquire_replica() -> Optional[Tuple[asyncpg.Pool, asyncpg.Connection]]:
+    """A connection to a usable replica, checking its lag when due, or None to read from the primary."""
+    for replica in replica_rotation():
+        check = replica.start_check()
+        if not check and not replica.is_usable():
+            continue
+        try:
+            pool = await _get_replica_pool(replica)
+            conn = await _acquire_from(pool)
+        except (OSError, TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            replica.record_failure(e)
+            continue
+        if check:
+            try:
+                replica.record_lag(await conn.fetchval(REPLICA_LAG_SQL))
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                await pool.release(conn)
+                replica.record_failure(e)
+                continue
+        if replica.is_usable():
+            replica.reads += 1
+            return pool, conn
+        await pool.release(conn)
+    return None
+
+
+async def _replica_for_read() -> Optional[Tuple[asyncpg.Pool, asyncpg.Connection]]:
+    # Once a request's transaction is open on the primary, its reads stay there
+    scope = _async_scope.get()
+    if not replicas or (scope is not None and scope.conn is not None):
+        return None
+    return await _acquire_replica()
+
+
+@asynccontextmanager
+async def _acquire():
+    pool = await get_async_pool()
+    conn = await _acquire_from(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+class _AsyncScope:
+    """One pooled connection and transaction, acquired the first time it is needed."""
+
+    def __init__(self):
+        self.conn = None
+        self._pool = None
+        self._transaction = None
+
+    async def connection(self):
+        if self.conn is None:
+            self._pool = await get_async_pool()
+            conn = await _acquire_from(self._pool)
+            try:
+                self._transaction = conn.transaction()
+                await self._transaction.start()
+            except BaseException:
+                await self._pool.release(conn)
+                raise
+            self.conn = conn
+        return self.conn
+
+    async def close(self, failed: bool) -> None:
+        if self.conn is None:
+            return
+        try:
+            if failed:
+                await self._transaction.rollback()
+            else:
+                await self._transaction.commit()
+        finally:
+            await self._pool.release(self.conn)
+            self.conn = None
+
+
+@asynccontextmanager
+async def get_async_db(independent: bool = False, replica: bool = False):
+    """
+    Yields an asyncpg connection. Inside an async_db_scope() the scoped connection is
+    reused and the scope owns the transaction; otherwise a pooled connection is used
+    inside its own transaction, committed when the block exits. An `independent` block
+    always takes its own connection and transaction, committed even if the scope's is
+    later rolled back. A `replica` block reads in a read-only transaction on a usable
+    replica, if there is one and the scope has not yet used the primary.
+    """
+    if replica:
+        target = await _replica_for_read()
+        if target is not None:
+            pool, conn = target
+            try:
+                async with conn.transaction(readonly=True):
+                    yield conn
+            finally:
+                await pool.release(conn)
+            return
+
+    scope = _async_scope.get()
+    if scope is not None and not independent:
+        yield await scope.connection()
+        return
+
+    async with _acquire() as conn:
+        async with conn.transaction():
+            yield conn
+
+
+async def fetchrow_replicated(sql: str, *args) -> Optional[asyncpg.Record]:
+    """
+    fetchrow on a replica, as get_async_db(replica=True). A row the replica does not
+    have, perhaps written a moment ago, is looked up again on the primary.
+    """
+    target = await _replica_for_read()
+    if target is not None:
+        pool, conn = target
+        try:
+            row = await conn.fetchrow(sql, *args)
+        finally:
+            await pool.release(conn)
+        if row is not None:
+            return row
+    async with get_async_db() as conn:
+        return await conn.fetchrow(sql, *args)
+
+
+@asynccontextmanager
+async def async_db_scope(lazy: bool = False):
+    """
+    Shares one pooled connection and one transaction across every get_async_db() call
+    made inside the block. Nested scopes join the outer one. A lazy scope only takes a
+    connection from the pool when the first get_async_db() call needs it, and yields None.
+    """
+    scope = _async_scope.get()
+    if scope is not None:
+        yield None if lazy else await scope.connection()
+        return
+
+    scope = _AsyncScope()
+    token = _async_scope.set(scope)
+    failed = True
+    try:
+        yield None if lazy else await scope.connection()
+        failed = False
+    finally:
+        _async_scope.reset(token)
+        await scope.close(failed)
+
+
+async def async_request_db():
+    """
+    FastAPI dependency that holds one pooled connection and transaction for the whole
+    request, so the auth lookup and every async DAO call of the route share them. The
+    connection is only checked out if the request actually reaches the database.
+    """
+    async with async_db_scope(lazy=True):
+        yield
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be acquired within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool with a bounded size, an acquire timeout
+    and health checks on connections that have been idle for a while.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used_monotonic)
+        self._size = 0
+        self._closed = False
+
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._discarded_total = 0
+        self._waiting = 0
+
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        logger.info("Opening new pooled database connection.")
+        return psycopg2.connect(self.dsn)
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            logger.warning("Discarding pooled connection that failed its health check.")
+            return False
+
+    def _discard(self, conn) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded_total += 1
+            self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Take a connection from the pool, opening a new one while below max_size."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts_total += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {timeout}s waiting for a database connection."
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._acquired_total += 1
+            return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool, resetting any transaction left open."""
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close all idle connections; connections in use are closed on release."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                conn.close()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "acquired_total": self._acquired_total,
+                "timeouts_total": self._timeouts_total,
+                "discarded_total": self._discarded_total,
+            }
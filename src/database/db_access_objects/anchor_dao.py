@@ -0,0 +1,59 @@
+from typing import List, Optional
+from ..db_service import get_db
+from .anchor_record import AnchorRecord
+from .event_record import DEFAULT_STREAM
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+ANCHOR_COLUMNS = "app_id, stream, event_id, event_hash, event_count, signature, anchored_at"
+
+@instrument_dao
+class AnchorDAO:
+    """Data Access Object for the retention anchors of event chains using plain SQL queries."""
+
+    def __init__(self):
+        self.table_name = "chain_anchors"
+        self.return_columns = ANCHOR_COLUMNS
+
+    def get_by_app_id(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[AnchorRecord]:
+        """Get the anchor of one stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM chain_anchors
+        WHERE app_id = %s AND stream = %s;
+        """
+        logger.debug("Fetching chain anchor for app_id=%s, stream=%s", app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id, stream))
+            result = cur.fetchone()
+
+            return AnchorRecord.from_record(result) if result else None
+
+    def save_many(self, anchors: List[AnchorRecord]) -> None:
+        """Insert or advance the anchors of several chains; an anchor never moves backwards."""
+        if not anchors:
+            return
+        upsert_sql = """
+        INSERT INTO chain_anchors (app_id, stream, event_id, event_hash, event_count, signature, anchored_at)
+        SELECT * FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::varchar[], %s::bigint[], %s::varchar[], %s::timestamptz[])
+        ON CONFLICT (app_id, stream) DO UPDATE
+        SET event_id = EXCLUDED.event_id,
+            event_hash = EXCLUDED.event_hash,
+            event_count = EXCLUDED.event_count,
+            signature = EXCLUDED.signature,
+            anchored_at = EXCLUDED.anchored_at
+        WHERE chain_anchors.event_id < EXCLUDED.event_id;
+        """
+        logger.debug("Saving %s chain anchors", len(anchors))
+        with get_db() as (_, cur):
+            cur.execute(upsert_sql, (
+                [anchor.app_id for anchor in anchors],
+                [anchor.stream for anchor in anchors],
+                [anchor.event_id for anchor in anchors],
+                [anchor.event_hash for anchor in anchors],
+                [anchor.event_count for anchor in anchors],
+                [anchor.signature for anchor in anchors],
+                [anchor.anchored_at for anchor in anchors]
+            ))
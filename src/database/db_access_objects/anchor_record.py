@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from datetime import datetime
+from .event_record import DEFAULT_STREAM
+
+@dataclass
+class AnchorRecord:
+    """Data class representing the last event of a chain removed by retention."""
+    app_id: int = 0
+    stream: str = DEFAULT_STREAM
+    event_id: int = 0
+    event_hash: str = ""
+    event_count: int = 0
+    signature: str = ""
+    anchored_at: datetime = None
+
+    def __post_init__(self):
+        if self.anchored_at is None:
+            self.anchored_at = datetime.now()
+
+    def signing_payload(self) -> dict:
+        """The anchor fields covered by the signature."""
+        return {
+            "app_id": self.app_id,
+            "stream": self.stream,
+            "event_id": self.event_id,
+            "event_hash": self.event_hash,
+            "event_count": self.event_count
+        }
+
+    @classmethod
+    def from_record(cls, row):
+        """Create an AnchorRecord instance from a database row."""
+        return cls(
+            app_id=row[0],
+            stream=row[1],
+            event_id=row[2],
+            event_hash=row[3],
+            event_count=row[4],
+            signature=row[5],
+            anchored_at=row[6]
+        )
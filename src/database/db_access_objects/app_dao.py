@@ -2,54 +2,46 @@
 
 import uuid
 from typing import List, Optional
-from ..db_service import get_db
+from ..db_service import fetchone_replicated, get_db
 from .app_record import AppRecord
 from src.logger import get_logger
+from src.metrics import instrument_dao
+from src.auth_cache import api_key_cache, invalidate_app
 import psycopg2.errors
 
 logger = get_logger(__name__)
 
+@instrument_dao
 class AppDAO:
     """Data Access Object for app operations using plain SQL queries."""
     
     def __init__(self):
         self.table_name = "apps"
-        self.return_columns = "id, name, api_key, created_at"
-    
-    def create_table(self) -> None:
-        """Create the apps table if it doesn't exist."""
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS apps (
-            id SERIAL PRIMARY KEY,
-            name VARCHAR(128) NOT NULL UNIQUE,
-            api_key TEXT NOT NULL,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-        );
-        """
-        logger.info("Creating apps table if not exists.")
-        with get_db() as (_, cur):
-            cur.execute(create_table_sql)
+        self.return_columns = "id, name, api_key, created_at, rate_limit, rate_burst, max_concurrency"
     
     def create(self, app: AppRecord) -> AppRecord:
         """Create a new app record."""
         insert_sql = f"""
-        INSERT INTO apps (name, api_key, created_at)
-        VALUES (%s, %s, %s)
+        INSERT INTO apps (name, api_key, created_at, rate_limit, rate_burst, max_concurrency)
+        VALUES (%s, %s, %s, %s, %s, %s)
         RETURNING {self.return_columns};
         """
-        logger.info(f"Creating app: {app.name}")
+        logger.info("Creating app: %s", app.name)
         try:
             with get_db() as (_, cur):
                 cur.execute(insert_sql, (
                     app.name,
                     app.api_key,
-                    app.created_at
+                    app.created_at,
+                    app.rate_limit,
+                    app.rate_burst,
+                    app.max_concurrency
                 ))
                 result = cur.fetchone()
-                logger.info(f"App created with id={result[0] if result else 'unknown'}")
+                logger.info("App created with id=%s", result[0] if result else 'unknown')
                 return AppRecord.from_record(result)
         except psycopg2.errors.UniqueViolation:
-            logger.error(f"App creation failed: App name '{app.name}' already exists.")
+            logger.error("App creation failed: App name '%s' already exists.", app.name)
             raise ValueError(f"App name '{app.name}' already exists.")
     
     def get_by_id(self, app_id: int) -> Optional[AppRecord]:
@@ -59,12 +51,20 @@ class AppDAO:
         FROM apps
         WHERE id = %s;
         """
-        logger.info(f"Fetching app by id={app_id}")
-        with get_db() as (_, cur):
-            cur.execute(select_sql, (app_id,))
-            result = cur.fetchone()
-            
-            return AppRecord.from_record(result) if result else None
+        logger.debug("Fetching app by id=%s", app_id)
+        result = fetchone_replicated(select_sql, (app_id,))
+        return AppRecord.from_record(result) if result else None
+    
+    def get_api_key(self, app_id: int) -> Optional[str]:
+        """Get an app's API key, served from the in-process cache when possible."""
+        api_key = api_key_cache.get(app_id)
+        if api_key is not None:
+            return api_key
+        app_record = self.get_by_id(app_id)
+        if app_record is None or app_record.api_key is None:
+            return None
+        api_key_cache.set(app_id, app_record.api_key)
+        return app_record.api_key
     
     def get_by_name(self, name: str) -> Optional[AppRecord]:
         """Get an app by its name."""
@@ -73,12 +73,9 @@ class AppDAO:
         FROM apps
         WHERE name = %s;
         """
-        logger.info(f"Fetching app by name={name}")
-        with get_db() as (_, cur):
-            cur.execute(select_sql, (name,))
-            result = cur.fetchone()
-            
-            return AppRecord.from_record(result) if result else None
+        logger.debug("Fetching app by name=%s", name)
+        result = fetchone_replicated(select_sql, (name,))
+        return AppRecord.from_record(result) if result else None
     
     def get_all(self) -> List[AppRecord]:
         """Get all apps."""
@@ -87,8 +84,8 @@ class AppDAO:
         FROM apps
         ORDER BY created_at DESC;
         """
-        logger.info("Fetching all apps")
-        with get_db() as (_, cur):
+        logger.debug("Fetching all apps")
+        with get_db(replica=True) as (_, cur):
             cur.execute(select_sql)
             results = cur.fetchall()
             
@@ -98,22 +95,26 @@ class AppDAO:
         """Update an existing app."""
         update_sql = f"""
         UPDATE apps
-        SET name = %s, api_key = %s
+        SET name = %s, api_key = %s, rate_limit = %s, rate_burst = %s, max_concurrency = %s
         WHERE id = %s
         RETURNING {self.return_columns};
         """
-        logger.info(f"Updating app id={app.id}")
+        logger.info("Updating app id=%s", app.id)
         try:
             with get_db() as (_, cur):
                 cur.execute(update_sql, (
                     app.name,
                     app.api_key,
+                    app.rate_limit,
+                    app.rate_burst,
+                    app.max_concurrency,
                     app.id
                 ))
                 result = cur.fetchone()
-                return AppRecord.from_record(result) if result else None
+            invalidate_app(app.id)
+            return AppRecord.from_record(result) if result else None
         except psycopg2.errors.UniqueViolation:
-            logger.error(f"App update failed: App name '{app.name}' already exists.")
+            logger.error("App update failed: App name '%s' already exists.", app.name)
             raise ValueError(f"App name '{app.name}' already exists.")
     
     def delete(self, app_id: int) -> bool:
@@ -122,7 +123,9 @@ class AppDAO:
         DELETE FROM apps
         WHERE id = %s;
         """
-        logger.info(f"Deleting app id={app_id}")
+        logger.info("Deleting app id=%s", app_id)
         with get_db() as (_, cur):
             cur.execute(delete_sql, (app_id,))
-            return cur.rowcount > 0
\ No newline at end of file
+            deleted = cur.rowcount > 0
+        invalidate_app(app_id)
+        return deleted
\ No newline at end of file
@@ -1,14 +1,20 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 
 @dataclass
 class AppRecord:
-    """Data class representing an app record."""
+    """
+    Data class representing an app record. The ingest limits (events per second, bucket
+    size and requests in flight per worker) are None for the defaults; see src/rate_limit.py.
+    """
     id: Optional[int] = None
     name: str = ""
     api_key: str = ""
     created_at: datetime = None
+    rate_limit: Optional[float] = None
+    rate_burst: Optional[int] = None
+    max_concurrency: Optional[int] = None
     
     def __post_init__(self):
         if self.created_at is None:
@@ -21,5 +27,11 @@ class AppRecord:
             id=row[0],
             name=row[1],
             api_key=row[2],
-            created_at=row[3]
-        ) 
\ No newline at end of file
+            created_at=row[3],
+            rate_limit=row[4] if len(row) > 4 else None,
+            rate_burst=row[5] if len(row) > 5 else None,
+            max_concurrency=row[6] if len(row) > 6 else None
+        ) 
+
+    def ingest_limits(self) -> Tuple[Optional[float], Optional[int], Optional[int]]:
+        return (self.rate_limit, self.rate_burst, self.max_concurrency)
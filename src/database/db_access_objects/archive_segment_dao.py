@@ -0,0 +1,133 @@
+from typing import List, Optional, Set
+from ..db_service import get_db
+from .archive_segment_record import ArchiveSegmentRecord
+from .event_record import DEFAULT_STREAM
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+ARCHIVE_SEGMENT_COLUMNS = (
+    "id, app_id, stream, first_event_id, last_event_id, event_count, min_timestamp, max_timestamp, "
+    "prev_event_hash, last_event_hash, path, created_at"
+)
+
+@instrument_dao
+class ArchiveSegmentDAO:
+    """Data Access Object for the archive segments of event chains using plain SQL queries."""
+
+    def __init__(self):
+        self.table_name = "archive_segments"
+        self.return_columns = ARCHIVE_SEGMENT_COLUMNS
+
+    def lock_chain(self, app_id: int, stream: str = DEFAULT_STREAM) -> None:
+        """
+        Take the archive lock of one app stream until the end of the transaction, so
+        archivers of the same chain run one after another.
+        """
+        lock_sql = "SELECT pg_advisory_xact_lock(%s, hashtext(%s));"
+        logger.debug("Locking archive of app_id=%s, stream=%s", app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(lock_sql, (app_id, stream))
+
+    def get_paths(self) -> Set[str]:
+        """Get the relative paths of every recorded segment file."""
+        select_sql = "SELECT path FROM archive_segments;"
+        logger.debug("Fetching archive segment paths")
+        with get_db() as (_, cur):
+            cur.execute(select_sql)
+            return {row[0] for row in cur.fetchall()}
+
+    def get_last(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[ArchiveSegmentRecord]:
+        """Get the newest archive segment of one stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM archive_segments
+        WHERE app_id = %s AND stream = %s
+        ORDER BY last_event_id DESC
+        LIMIT 1;
+        """
+        logger.debug("Fetching last archive segment for app_id=%s, stream=%s", app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id, stream))
+            result = cur.fetchone()
+
+            return ArchiveSegmentRecord.from_record(result) if result else None
+
+    def get_by_chain(self, app_id: int, stream: str = DEFAULT_STREAM, after_id: Optional[int] = None) -> List[ArchiveSegmentRecord]:
+        """Get the archive segments of one app stream holding events after an event id, in chain order."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM archive_segments
+        WHERE app_id = %s AND stream = %s AND last_event_id > %s
+        ORDER BY first_event_id;
+        """
+        logger.debug("Fetching archive segments for app_id=%s, stream=%s after id=%s", app_id, stream, after_id)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id, stream, after_id if after_id is not None else 0))
+            return [ArchiveSegmentRecord.from_record(row) for row in cur.fetchall()]
+
+    def get_by_app_id(self, app_id: int) -> List[ArchiveSegmentRecord]:
+        """Get the archive segments of every stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM archive_segments
+        WHERE app_id = %s
+        ORDER BY stream, first_event_id;
+        """
+        logger.debug("Fetching archive segments for app_id=%s", app_id)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id,))
+            return [ArchiveSegmentRecord.from_record(row) for row in cur.fetchall()]
+
+    def seal(self, segment: ArchiveSegmentRecord) -> ArchiveSegmentRecord:
+        """
+        Record a written segment file and delete its events from the events table. Raises
+        ValueError, rolling both back, if the table no longer holds every event of the
+        range, e.g. because another archiver sealed it first.
+        """
+        insert_sql = f"""
+        INSERT INTO archive_segments (
+            app_id, stream, first_event_id, last_event_id, event_count, min_timestamp,
+            max_timestamp, prev_event_hash, last_event_hash, path
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING {self.return_columns};
+        """
+        delete_sql = """
+        DELETE FROM events
+        WHERE app_id = %s AND stream = %s AND id BETWEEN %s AND %s
+          AND timestamp BETWEEN %s AND %s;
+        """
+        logger.info(
+            "Sealing archive segment for app_id=%s, stream=%s, events %s..%s",
+            segment.app_id, segment.stream, segment.first_event_id, segment.last_event_id
+        )
+        with get_db() as (_, cur):
+            cur.execute(insert_sql, (
+                segment.app_id,
+                segment.stream,
+                segment.first_event_id,
+                segment.last_event_id,
+                segment.event_count,
+                segment.min_timestamp,
+                segment.max_timestamp,
+                segment.prev_event_hash,
+                segment.last_event_hash,
+                segment.path
+            ))
+            sealed = ArchiveSegmentRecord.from_record(cur.fetchone())
+            cur.execute(delete_sql, (
+                segment.app_id,
+                segment.stream,
+                segment.first_event_id,
+                segment.last_event_id,
+                segment.min_timestamp,
+                segment.max_timestamp
+            ))
+            if cur.rowcount != segment.event_count:
+                raise ValueError(
+                    f"Archive segment for app_id={segment.app_id}, stream={segment.stream} expected "
+                    f"{segment.event_count} events in the table, found {cur.rowcount}."
+                )
+            return sealed
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from .event_record import DEFAULT_STREAM
+
+@dataclass
+class ArchiveSegmentRecord:
+    """Data class representing a sealed range of one stream's chain stored in an archive segment file."""
+    id: Optional[int] = None
+    app_id: int = 0
+    stream: str = DEFAULT_STREAM
+    first_event_id: int = 0
+    last_event_id: int = 0
+    event_count: int = 0
+    min_timestamp: datetime = None
+    max_timestamp: datetime = None
+    prev_event_hash: Optional[str] = None
+    last_event_hash: str = ""
+    path: str = ""
+    created_at: datetime = None
+
+    @classmethod
+    def from_record(cls, row):
+        """Create an ArchiveSegmentRecord instance from a database row."""
+        return cls(
+            id=row[0],
+            app_id=row[1],
+            stream=row[2],
+            first_event_id=row[3],
+            last_event_id=row[4],
+            event_count=row[5],
+            min_timestamp=row[6],
+            max_timestamp=row[7],
+            prev_event_hash=row[8],
+            last_event_hash=row[9],
+            path=row[10],
+            created_at=row[11]
+        )
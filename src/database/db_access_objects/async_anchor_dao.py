@@ -0,0 +1,29 @@
+from typing import Optional
+from ..async_db_service import get_async_db
+from .anchor_record import AnchorRecord
+from .anchor_dao import ANCHOR_COLUMNS
+from .event_record import DEFAULT_STREAM
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncAnchorDAO:
+    """Asynchronous (asyncpg) Data Access Object for chain retention anchors, mirroring AnchorDAO."""
+
+    def __init__(self):
+        self.table_name = "chain_anchors"
+        self.return_columns = ANCHOR_COLUMNS
+
+    async def get_by_app_id(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[AnchorRecord]:
+        """Get the anchor of one stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM chain_anchors
+        WHERE app_id = $1 AND stream = $2;
+        """
+        logger.debug("Fetching chain anchor for app_id=%s, stream=%s", app_id, stream)
+        async with get_async_db() as conn:
+            result = await conn.fetchrow(select_sql, app_id, stream)
+            return AnchorRecord.from_record(result) if result else None
@@ -0,0 +1,126 @@
+from typing import List, Optional, Tuple
+import asyncpg
+from ..async_db_service import fetchrow_replicated, get_async_db
+from .app_record import AppRecord
+from src.logger import get_logger
+from src.metrics import instrument_dao
+from src.auth_cache import api_key_cache, app_limits_cache, invalidate_app
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncAppDAO:
+    """Asynchronous (asyncpg) Data Access Object for app operations, mirroring AppDAO."""
+
+    def __init__(self):
+        self.table_name = "apps"
+        self.return_columns = "id, name, api_key, created_at, rate_limit, rate_burst, max_concurrency"
+
+    async def create(self, app: AppRecord) -> AppRecord:
+        """Create a new app record."""
+        insert_sql = f"""
+        INSERT INTO apps (name, api_key, created_at, rate_limit, rate_burst, max_concurrency)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING {self.return_columns};
+        """
+        logger.info("Creating app: %s", app.name)
+        try:
+            async with get_async_db() as conn:
+                result = await conn.fetchrow(
+                    insert_sql, app.name, app.api_key, app.created_at, app.rate_limit, app.rate_burst, app.max_concurrency
+                )
+                logger.info("App created with id=%s", result[0] if result else 'unknown')
+                return AppRecord.from_record(result)
+        except asyncpg.UniqueViolationError:
+            logger.error("App creation failed: App name '%s' already exists.", app.name)
+            raise ValueError(f"App name '{app.name}' already exists.")
+
+    async def get_by_id(self, app_id: int) -> Optional[AppRecord]:
+        """Get an app by its ID."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM apps
+        WHERE id = $1;
+        """
+        logger.debug("Fetching app by id=%s", app_id)
+        result = await fetchrow_replicated(select_sql, app_id)
+        return AppRecord.from_record(result) if result else None
+
+    async def get_api_key(self, app_id: int) -> Optional[str]:
+        """Get an app's API key, served from the in-process cache when possible."""
+        api_key = api_key_cache.get(app_id)
+        if api_key is not None:
+            return api_key
+        app_record = await self.get_by_id(app_id)
+        if app_record is None or app_record.api_key is None:
+            return None
+        api_key_cache.set(app_id, app_record.api_key)
+        app_limits_cache.set(app_id, app_record.ingest_limits())
+        return app_record.api_key
+
+    async def get_ingest_limits(self, app_id: int) -> Optional[Tuple[Optional[float], Optional[int], Optional[int]]]:
+        """An app's (rate_limit, rate_burst, max_concurrency), served from the in-process cache when possible."""
+        limits = app_limits_cache.get(app_id)
+        if limits is not None:
+            return limits
+        app_record = await self.get_by_id(app_id)
+        if app_record is None:
+            return None
+        limits = app_record.ingest_limits()
+        app_limits_cache.set(app_id, limits)
+        return limits
+
+    async def get_by_name(self, name: str) -> Optional[AppRecord]:
+        """Get an app by its name."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM apps
+        WHERE name = $1;
+        """
+        logger.debug("Fetching app by name=%s", name)
+        result = await fetchrow_replicated(select_sql, name)
+        return AppRecord.from_record(result) if result else None
+
+    async def get_all(self) -> List[AppRecord]:
+        """Get all apps."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM apps
+        ORDER BY created_at DESC;
+        """
+        logger.debug("Fetching all apps")
+        async with get_async_db(replica=True) as conn:
+            results = await conn.fetch(select_sql)
+            return [AppRecord.from_record(row) for row in results]
+
+    async def update(self, app: AppRecord) -> Optional[AppRecord]:
+        """Update an existing app."""
+        update_sql = f"""
+        UPDATE apps
+        SET name = $1, api_key = $2, rate_limit = $3, rate_burst = $4, max_concurrency = $5
+        WHERE id = $6
+        RETURNING {self.return_columns};
+        """
+        logger.info("Updating app id=%s", app.id)
+        try:
+            async with get_async_db() as conn:
+                result = await conn.fetchrow(
+                    update_sql, app.name, app.api_key, app.rate_limit, app.rate_burst, app.max_concurrency, app.id
+                )
+            invalidate_app(app.id)
+            return AppRecord.from_record(result) if result else None
+        except asyncpg.UniqueViolationError:
+            logger.error("App update failed: App name '%s' already exists.", app.name)
+            raise ValueError(f"App name '{app.name}' already exists.")
+
+    async def delete(self, app_id: int) -> bool:
+        """Delete an app by its ID."""
+        delete_sql = """
+        DELETE FROM apps
+        WHERE id = $1;
+        """
+        logger.info("Deleting app id=%s", app_id)
+        async with get_async_db() as conn:
+            status = await conn.execute(delete_sql, app_id)
+        invalidate_app(app_id)
+        return status != "DELETE 0"
@@ -0,0 +1,41 @@
+from typing import List
+from ..async_db_service import get_async_db
+from .archive_segment_record import ArchiveSegmentRecord
+from .archive_segment_dao import ARCHIVE_SEGMENT_COLUMNS
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncArchiveSegmentDAO:
+    """Asynchronous (asyncpg) Data Access Object for archive segments, mirroring ArchiveSegmentDAO."""
+
+    def __init__(self):
+        self.table_name = "archive_segments"
+        self.return_columns = ARCHIVE_SEGMENT_COLUMNS
+
+    async def get_by_app_id(self, app_id: int) -> List[ArchiveSegmentRecord]:
+        """Get the archive segments of every stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM archive_segments
+        WHERE app_id = $1
+        ORDER BY stream, first_event_id;
+        """
+        logger.debug("Fetching archive segments for app_id=%s", app_id)
+        async with get_async_db() as conn:
+            rows = await conn.fetch(select_sql, app_id)
+            return [ArchiveSegmentRecord.from_record(row) for row in rows]
+
+    async def find_by_event_id(self, app_id: int, event_id: int) -> List[ArchiveSegmentRecord]:
+        """Get the archive segments of a given app_id whose id range covers an event id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM archive_segments
+        WHERE app_id = $1 AND first_event_id <= $2 AND last_event_id >= $2;
+        """
+        logger.debug("Fetching archive segments of app_id=%s covering event id=%s", app_id, event_id)
+        async with get_async_db() as conn:
+            rows = await conn.fetch(select_sql, app_id, event_id)
+            return [ArchiveSegmentRecord.from_record(row) for row in rows]
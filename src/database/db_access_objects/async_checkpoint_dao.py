@@ -0,0 +1,56 @@
+from typing import Optional
+from ..async_db_service import get_async_db
+from .checkpoint_record import CheckpointRecord
+from .event_record import DEFAULT_STREAM
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncCheckpointDAO:
+    """Asynchronous (asyncpg) Data Access Object for proof checkpoints, mirroring CheckpointDAO."""
+
+    def __init__(self):
+        self.table_name = "proof_checkpoints"
+        self.return_columns = "app_id, event_id, event_hash, verified_count, signature, verified_at, stream"
+
+    async def get_by_app_id(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[CheckpointRecord]:
+        """Get the checkpoint of one stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM proof_checkpoints
+        WHERE app_id = $1 AND stream = $2;
+        """
+        logger.debug("Fetching proof checkpoint for app_id=%s, stream=%s", app_id, stream)
+        async with get_async_db() as conn:
+            result = await conn.fetchrow(select_sql, app_id, stream)
+            return CheckpointRecord.from_record(result) if result else None
+
+    async def save(self, checkpoint: CheckpointRecord) -> Optional[CheckpointRecord]:
+        """Insert or advance the checkpoint for an app stream; it never moves backwards."""
+        upsert_sql = f"""
+        INSERT INTO proof_checkpoints (app_id, stream, event_id, event_hash, verified_count, signature, verified_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (app_id, stream) DO UPDATE
+        SET event_id = EXCLUDED.event_id,
+            event_hash = EXCLUDED.event_hash,
+            verified_count = EXCLUDED.verified_count,
+            signature = EXCLUDED.signature,
+            verified_at = EXCLUDED.verified_at
+        WHERE proof_checkpoints.event_id <= EXCLUDED.event_id
+        RETURNING {self.return_columns};
+        """
+        logger.debug("Saving proof checkpoint for app_id=%s, stream=%s at event_id=%s", checkpoint.app_id, checkpoint.stream, checkpoint.event_id)
+        async with get_async_db() as conn:
+            result = await conn.fetchrow(
+                upsert_sql,
+                checkpoint.app_id,
+                checkpoint.stream,
+                checkpoint.event_id,
+                checkpoint.event_hash,
+                checkpoint.verified_count,
+                checkpoint.signature,
+                checkpoint.verified_at
+            )
+            return CheckpointRecord.from_record(result) if result else None
@@ -0,0 +1,25 @@
+from ..async_db_service import get_async_db
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncDeadLetterDAO:
+    """Asynchronous (asyncpg) Data Access Object for WAL events the ingestion writer rejected."""
+
+    def __init__(self):
+        self.table_name = "ingest_dead_letters"
+
+    async def add(self, wal_id: str, sequence: int, record: dict, error: str) -> None:
+        """Keep a rejected WAL record; a replay of the same sequence is a no-op."""
+        insert_sql = """
+        INSERT INTO ingest_dead_letters (wal_id, sequence, app_id, stream, event_hash, record, error)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (wal_id, sequence) DO NOTHING;
+        """
+        logger.debug("Dead-lettering WAL record %s of wal_id=%s", sequence, wal_id)
+        async with get_async_db() as conn:
+            await conn.execute(
+                insert_sql, wal_id, sequence, record["app_id"], record["stream"], record["hash"], record, error
+            )
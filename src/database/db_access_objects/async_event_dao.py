@@ -0,0 +1,231 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncpg
+from ..async_db_service import fetchrow_replicated, get_async_db, to_asyncpg
+from .event_record import EventRecord, DEFAULT_STREAM
+from .event_filter import EventFilter
+from .chain_head_record import ChainHeadRecord
+from .event_dao import (
+    EVENT_COLUMNS,
+    LOCK_CHAIN_HEAD_SQL,
+    SEED_CHAIN_HEAD_SQL,
+    APPEND_EVENTS_SQL,
+    SET_UTC_SQL,
+    appended_records,
+    build_append_params,
+    build_json_stream_query,
+    build_page_query,
+    check_single_chain,
+)
+from src.logger import get_logger
+from src.metrics import instrument_dao, CHAIN_HEAD_LOCK_WAIT
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncEventDAO:
+    """Asynchronous (asyncpg) Data Access Object for event operations, mirroring EventDAO."""
+
+    def __init__(self):
+        self.table_name = "events"
+        self.return_columns = EVENT_COLUMNS
+        self.lock_chain_head_sql = to_asyncpg(LOCK_CHAIN_HEAD_SQL)
+        self.seed_chain_head_sql = to_asyncpg(SEED_CHAIN_HEAD_SQL)
+        self.append_events_sql = to_asyncpg(APPEND_EVENTS_SQL)
+
+    async def _lock_chain_head(self, conn, app_id: int, stream: str) -> ChainHeadRecord:
+        """Lock the stream's chain-head row for the rest of the transaction, seeding it on first use."""
+        result = await conn.fetchrow(self.lock_chain_head_sql, app_id, stream)
+        if result is None:
+            logger.debug("Seeding chain head for app_id=%s, stream=%s", app_id, stream)
+            await conn.execute(self.seed_chain_head_sql, app_id, stream, app_id, stream)
+            result = await conn.fetchrow(self.lock_chain_head_sql, app_id, stream)
+        return ChainHeadRecord.from_record(result)
+
+    async def append(self, event: EventRecord) -> EventRecord:
+        """Append an event to its stream's chain; prev_event_hash is set from the chain head."""
+        return (await self.append_many([event]))[0]
+
+    async def append_many(self, events: List[EventRecord]) -> List[EventRecord]:
+        """
+        Append events, in order, to the chain of a single app stream, atomically, under
+        the chain-head row lock. See EventDAO.append_many.
+        """
+        if not events:
+            return []
+        app_id, stream = check_single_chain(events)
+        logger.debug("Appending %s events for app_id=%s, stream=%s", len(events), app_id, stream)
+        try:
+            async with get_async_db() as conn:
+                with CHAIN_HEAD_LOCK_WAIT.time():
+                    head = await self._lock_chain_head(conn, app_id, stream)
+                results = await conn.fetch(self.append_events_sql, *build_append_params(head, events))
+                logger.debug("Appended %s events for app_id=%s, stream=%s", len(results), app_id, stream)
+                return appended_records(results, events)
+        except asyncpg.UniqueViolationError:
+            logger.error("Event append failed: Duplicate event for app_id=%s.", app_id)
+            raise ValueError("Duplicate event detected for this app.")
+
+    async def get_by_id(self, event_id: int) -> Optional[EventRecord]:
+        """Get an event by its ID."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE id = $1;
+        """
+        logger.debug("Fetching event by id=%s", event_id)
+        result = await fetchrow_replicated(select_sql, event_id)
+        return EventRecord.from_record(result) if result else None
+
+    async def get_by_app_id(self, app_id: int, event_filter: Optional[EventFilter] = None) -> List[EventRecord]:
+        """Get all events for a given app_id, optionally only those matching a filter."""
+        filter_sql, filter_params = (event_filter or EventFilter()).sql()
+        select_sql = to_asyncpg(f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = %s {filter_sql}
+        ORDER BY timestamp DESC, id DESC;
+        """)
+        logger.debug("Fetching events for app_id=%s, filter=%s", app_id, event_filter)
+        async with get_async_db(replica=True) as conn:
+            results = await conn.fetch(select_sql, app_id, *filter_params)
+            return [EventRecord.from_record(row) for row in results]
+
+    async def get_page_by_app_id(
+        self,
+        app_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+        event_filter: Optional[EventFilter] = None
+    ) -> Tuple[List[EventRecord], bool]:
+        """One keyset-paginated page of events, newest first. See EventDAO.get_page_by_app_id."""
+        select_sql, params = build_page_query(app_id, limit, after, before, event_filter)
+        logger.debug("Fetching page of events for app_id=%s, limit=%s, after=%s, before=%s, filter=%s", app_id, limit, after, before, event_filter)
+        async with get_async_db(replica=True) as conn:
+            results = await conn.fetch(to_asyncpg(select_sql), *params)
+
+        has_more = len(results) > limit
+        events = [EventRecord.from_record(row) for row in results[:limit]]
+        if before is not None:
+            events.reverse()
+        return events, has_more
+
+    async def is_valid_data_path(self, data_path: str) -> bool:
+        """Whether a string parses as a SQL/JSON path; checked in a savepoint, so a bad path leaves the transaction usable."""
+        async with get_async_db(replica=True) as conn:
+            try:
+                async with conn.transaction():
+                    await conn.fetchval("SELECT $1::text::jsonpath;", data_path)
+                return True
+            except (asyncpg.exceptions.PostgresSyntaxError, asyncpg.exceptions.DataError):
+                return False
+
+    async def _stream(self, select_sql: str, params: tuple, chunk_size: int) -> AsyncIterator[EventRecord]:
+        """Yield rows of a query through a server-side cursor, `chunk_size` rows per fetch."""
+        async with get_async_db(replica=True) as conn:
+            async for row in conn.cursor(select_sql, *params, prefetch=chunk_size):
+                yield EventRecord.from_record(row)
+
+    def iter_by_app_id(self, app_id: int, chunk_size: int = 1000, event_filter: Optional[EventFilter] = None) -> AsyncIterator[EventRecord]:
+        """Stream all events for a given app_id (matching `event_filter`, if given), newest first, in constant memory."""
+        filter_sql, filter_params = (event_filter or EventFilter()).sql()
+        select_sql = to_asyncpg(f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = %s {filter_sql}
+        ORDER BY timestamp DESC, id DESC;
+        """)
+        logger.debug("Streaming events for app_id=%s in chunks of %s, filter=%s", app_id, chunk_size, event_filter)
+        return self._stream(select_sql, (app_id, *filter_params), chunk_size)
+
+    async def _stream_json(self, select_sql: str, params: tuple, chunk_size: int) -> AsyncIterator[Tuple[int, str, datetime, str]]:
+        async with get_async_db(replica=True) as conn:
+            await conn.execute(SET_UTC_SQL)
+            async for row in conn.cursor(select_sql, *params, prefetch=chunk_size):
+                yield tuple(row)
+
+    def iter_json_by_app_id(
+        self, app_id: int, chunk_size: int = 1000, event_filter: Optional[EventFilter] = None
+    ) -> AsyncIterator[Tuple[int, str, datetime, str]]:
+        """
+        Stream all events for a given app_id, like iter_by_app_id, as (id, stream,
+        timestamp, JSON text) rows encoded by PostgreSQL. See build_json_stream_query.
+        """
+        select_sql, params = build_json_stream_query(app_id, event_filter)
+        logger.debug("Streaming events as JSON for app_id=%s in chunks of %s, filter=%s", app_id, chunk_size, event_filter)
+        return self._stream_json(to_asyncpg(select_sql), params, chunk_size)
+
+    def iter_chain_by_app_id(
+        self,
+        app_id: int,
+        stream: str = DEFAULT_STREAM,
+        after_id: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[EventRecord]:
+        """Stream the events of one app stream in chain (append) order through a server-side cursor."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = $1 AND stream = $2 AND id > $3
+        ORDER BY id ASC;
+        """
+        logger.debug("Streaming event chain for app_id=%s, stream=%s after id=%s in chunks of %s", app_id, stream, after_id, chunk_size)
+        return self._stream(select_sql, (app_id, stream, after_id if after_id is not None else 0), chunk_size)
+
+    async def get_chain_range(self, app_id: int, stream: str, first_id: int, last_id: int) -> List[EventRecord]:
+        """The events of one app stream with ids from `first_id` to `last_id`, in chain order."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = $1 AND stream = $2 AND id BETWEEN $3 AND $4
+        ORDER BY id ASC;
+        """
+        logger.debug("Fetching events of app_id=%s, stream=%s with ids %s to %s", app_id, stream, first_id, last_id)
+        # Live tail reads stay on the primary, which has every row a notification names
+        async with get_async_db() as conn:
+            results = await conn.fetch(select_sql, app_id, stream, first_id, last_id)
+            return [EventRecord.from_record(row) for row in results]
+
+    async def get_after_id(
+        self,
+        app_id: int,
+        after_ids: Dict[str, int],
+        default_after_id: int,
+        limit: int,
+        event_filter: Optional[EventFilter] = None
+    ) -> List[EventRecord]:
+        """
+        Up to `limit` events of an app (matching `event_filter`, if given), in id order,
+        that come after a per-stream cursor: in each stream of `after_ids`, those with
+        ids above its entry; in every other stream, those above `default_after_id`. Ids
+        are only in commit order within a stream, so a single id cannot mark a position.
+        """
+        filter_sql, filter_params = (event_filter or EventFilter()).sql()
+        # One index range per stream of the app, each starting at that stream's position
+        select_sql = to_asyncpg(f"""
+        SELECT e.*
+        FROM chain_heads h
+        CROSS JOIN LATERAL (
+            SELECT {self.return_columns}
+            FROM events
+            WHERE events.app_id = h.app_id AND events.stream = h.stream
+              AND events.id > COALESCE(
+                  (SELECT c.after_id FROM unnest(%s::text[], %s::bigint[]) AS c(stream, after_id) WHERE c.stream = h.stream),
+                  %s
+              )
+              {filter_sql}
+            ORDER BY events.id ASC
+            LIMIT %s
+        ) AS e
+        WHERE h.app_id = %s
+        ORDER BY e.id ASC
+        LIMIT %s;
+        """)
+        streams = list(after_ids)
+        logger.debug("Fetching events for app_id=%s after %s (default %s), limit=%s, filter=%s", app_id, after_ids, default_after_id, limit, event_filter)
+        async with get_async_db() as conn:
+            results = await conn.fetch(
+                select_sql, streams, [after_ids[stream] for stream in streams], default_after_id, *filter_params, limit, app_id, limit
+            )
+            return [EventRecord.from_record(row) for row in results]
@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+from typing import Any, Optional
+from ..async_db_service import get_async_db, to_asyncpg
+from .idempotency_key_dao import CLAIM_IDEMPOTENCY_KEY_SQL, COMPLETE_IDEMPOTENCY_KEY_SQL, SELECT_IDEMPOTENCY_KEY_SQL
+from .idempotency_key_record import IdempotencyKeyRecord
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncIdempotencyKeyDAO:
+    """Asynchronous (asyncpg) Data Access Object for the Idempotency-Keys of ingest requests."""
+
+    def __init__(self):
+        self.table_name = "idempotency_keys"
+
+    async def claim(self, app_id: int, idempotency_key: str, request_hash: str, expired_before: datetime) -> Optional[IdempotencyKeyRecord]:
+        """
+        Claim a key for a request in the current transaction. Returns None if it is now
+        this request's, or the record of the request that already used it. Keys first used
+        before `expired_before` are free again.
+        """
+        logger.debug("Claiming idempotency key for app_id=%s", app_id)
+        async with get_async_db() as conn:
+            claimed = await conn.fetchval(to_asyncpg(CLAIM_IDEMPOTENCY_KEY_SQL), app_id, idempotency_key, request_hash, expired_before)
+            if claimed is not None:
+                return None
+            row = await conn.fetchrow(to_asyncpg(SELECT_IDEMPOTENCY_KEY_SQL), app_id, idempotency_key)
+            return IdempotencyKeyRecord.from_record(row)
+
+    async def complete(self, app_id: int, idempotency_key: str, status_code: int, response: Any) -> None:
+        """Store the response of the request holding a claimed key."""
+        async with get_async_db() as conn:
+            await conn.execute(to_asyncpg(COMPLETE_IDEMPOTENCY_KEY_SQL), status_code, json.dumps(response), app_id, idempotency_key)
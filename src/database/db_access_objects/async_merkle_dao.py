@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Tuple
+from ..async_db_service import get_async_db
+from .chain_head_record import ChainHeadRecord
+from .event_record import DEFAULT_STREAM
+from .event_dao import CHAIN_HEAD_COLUMNS
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncMerkleDAO:
+    """Asynchronous (asyncpg) Data Access Object for the per-stream Merkle trees, mirroring MerkleDAO."""
+
+    def __init__(self):
+        self.table_name = "merkle_nodes"
+
+    async def get_head(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[ChainHeadRecord]:
+        """Get the chain head (tree size and frontier) of one app stream without locking it."""
+        select_sql = f"""
+        SELECT {CHAIN_HEAD_COLUMNS}
+        FROM chain_heads
+        WHERE app_id = $1 AND stream = $2;
+        """
+        logger.debug("Fetching chain head for app_id=%s, stream=%s", app_id, stream)
+        async with get_async_db() as conn:
+            result = await conn.fetchrow(select_sql, app_id, stream)
+            return ChainHeadRecord.from_record(result) if result else None
+
+    async def get_heads(self, app_id: int) -> List[ChainHeadRecord]:
+        """Get the chain heads of every stream of a given app_id, ordered by stream."""
+        select_sql = f"""
+        SELECT {CHAIN_HEAD_COLUMNS}
+        FROM chain_heads
+        WHERE app_id = $1
+        ORDER BY stream;
+        """
+        logger.debug("Fetching chain heads for app_id=%s", app_id)
+        async with get_async_db() as conn:
+            results = await conn.fetch(select_sql, app_id)
+            return [ChainHeadRecord.from_record(row) for row in results]
+
+    async def get_nodes(self, app_id: int, stream: str, keys: List[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+        """Get the hashes of the given (level, node_index) nodes of one stream's tree in one query."""
+        select_sql = """
+        SELECT m.level, m.node_index, m.hash
+        FROM merkle_nodes m
+        JOIN unnest($1::smallint[], $2::bigint[]) AS k(level, node_index)
+            ON m.level = k.level AND m.node_index = k.node_index
+        WHERE m.app_id = $3 AND m.stream = $4;
+        """
+        logger.debug("Fetching %s Merkle nodes for app_id=%s, stream=%s", len(keys), app_id, stream)
+        async with get_async_db() as conn:
+            results = await conn.fetch(
+                select_sql, [level for level, _ in keys], [index for _, index in keys], app_id, stream
+            )
+            return {(level, index): h for level, index, h in results}
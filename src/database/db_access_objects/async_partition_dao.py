@@ -0,0 +1,19 @@
+from ..async_db_service import get_async_db, to_asyncpg
+from .partition_dao import ENSURE_PARTITIONS_SQL
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncPartitionDAO:
+    """Asynchronous (asyncpg) Data Access Object for events partitions, mirroring PartitionDAO."""
+
+    def __init__(self):
+        self.table_name = "events"
+
+    async def ensure_partitions(self, months_ahead: int) -> int:
+        """Create the monthly partitions up to `months_ahead` months ahead; returns how many were created."""
+        logger.info("Ensuring event partitions %s months ahead", months_ahead)
+        async with get_async_db() as conn:
+            return await conn.fetchval(to_asyncpg(ENSURE_PARTITIONS_SQL), months_ahead)
@@ -0,0 +1,48 @@
+from typing import Optional
+from ..async_db_service import get_async_db
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncRateBucketDAO:
+    """Asynchronous (asyncpg) Data Access Object for the token buckets shared by all API workers."""
+
+    def __init__(self):
+        self.table_name = "app_rate_buckets"
+
+    async def lease(self, app_id: int, wanted: float, rate: float, burst: float) -> float:
+        """
+        Take up to `wanted` tokens from an app's shared bucket, which refills at `rate`
+        tokens per second up to `burst`. Returns the tokens granted, possibly 0. Runs in
+        its own short transaction, so the row lock is not held for the caller's request.
+        """
+        # The subquery's row lock makes concurrent leases refill from each other's results
+        lease_sql = """
+        UPDATE app_rate_buckets
+        SET tokens = refilled.tokens - LEAST(refilled.tokens, $1),
+            updated_at = refilled.now
+        FROM (
+            SELECT LEAST($3::float8, tokens + $2::float8 * GREATEST(EXTRACT(EPOCH FROM clock_timestamp() - updated_at)::float8, 0)) AS tokens,
+                   clock_timestamp() AS now
+            FROM app_rate_buckets
+            WHERE app_id = $4
+            FOR UPDATE
+        ) AS refilled
+        WHERE app_rate_buckets.app_id = $4
+        RETURNING GREATEST(LEAST(refilled.tokens, $1), 0);
+        """
+        seed_sql = """
+        INSERT INTO app_rate_buckets (app_id, tokens, updated_at)
+        VALUES ($1, $2, clock_timestamp())
+        ON CONFLICT (app_id) DO NOTHING;
+        """
+        logger.debug("Leasing %s rate limit tokens for app_id=%s", wanted, app_id)
+        async with get_async_db(independent=True) as conn:
+            granted: Optional[float] = await conn.fetchval(lease_sql, float(wanted), float(rate), float(burst), app_id)
+            if granted is None:
+                # First lease of the app: its bucket starts full
+                await conn.execute(seed_sql, app_id, float(burst))
+                granted = await conn.fetchval(lease_sql, float(wanted), float(rate), float(burst), app_id)
+            return granted or 0.0
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+from ..async_db_service import get_async_db, to_asyncpg
+from .rollup_dao import build_stats_query
+from .rollup_record import EventRollupRecord
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncRollupDAO:
+    """Asynchronous (asyncpg) Data Access Object for the event count rollups."""
+
+    def __init__(self):
+        self.table_name = "event_rollups"
+
+    async def get_stats(
+        self,
+        app_id: int,
+        bucket: str,
+        since: datetime,
+        until: datetime,
+        group_by: Sequence[str] = ("type", "source"),
+        event_type: Optional[str] = None,
+        source: Optional[str] = None,
+        stream: Optional[str] = None
+    ) -> List[EventRollupRecord]:
+        """Event counts per `bucket` and `group_by` columns in [since, until). See build_stats_query."""
+        select_sql, params = build_stats_query(app_id, bucket, since, until, group_by, event_type, source, stream)
+        logger.debug("Fetching %s event stats for app_id=%s from %s to %s", bucket, app_id, since.isoformat(), until.isoformat())
+        async with get_async_db() as conn:
+            rows = await conn.fetch(to_asyncpg(select_sql), *params)
+            return [EventRollupRecord.from_record(row) for row in rows]
@@ -0,0 +1,37 @@
+from ..async_db_service import get_async_db
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class AsyncWalOffsetDAO:
+    """Asynchronous (asyncpg) Data Access Object for the applied positions of ingestion WALs."""
+
+    def __init__(self):
+        self.table_name = "wal_offsets"
+
+    async def get_applied_sequence(self, wal_id: str) -> int:
+        """Highest sequence of `wal_id` already applied to the events table, or 0."""
+        select_sql = """
+        SELECT applied_sequence
+        FROM wal_offsets
+        WHERE wal_id = $1;
+        """
+        logger.debug("Fetching applied WAL sequence for wal_id=%s", wal_id)
+        async with get_async_db() as conn:
+            result = await conn.fetchval(select_sql, wal_id)
+            return result or 0
+
+    async def advance(self, wal_id: str, applied_sequence: int) -> None:
+        """Record `applied_sequence` for `wal_id`; the offset never moves backwards."""
+        upsert_sql = """
+        INSERT INTO wal_offsets (wal_id, applied_sequence, updated_at)
+        VALUES ($1, $2, NOW())
+        ON CONFLICT (wal_id) DO UPDATE
+        SET applied_sequence = EXCLUDED.applied_sequence,
+            updated_at = EXCLUDED.updated_at
+        WHERE wal_offsets.applied_sequence < EXCLUDED.applied_sequence;
+        """
+        async with get_async_db() as conn:
+            await conn.execute(upsert_sql, wal_id, applied_sequence)
@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+from .event_record import DEFAULT_STREAM
+
+@dataclass
+class ChainHeadRecord:
+    """Data class representing the head of one stream's event chain and Merkle tree."""
+    app_id: int = 0
+    event_id: Optional[int] = None
+    event_hash: Optional[str] = None
+    tree_size: int = 0
+    merkle_frontier: List[str] = field(default_factory=list)
+    merkle_ready: bool = True
+    updated_at: datetime = None
+    stream: str = DEFAULT_STREAM
+
+    @classmethod
+    def from_record(cls, row):
+        """Create a ChainHeadRecord instance from a database row."""
+        return cls(
+            app_id=row[0],
+            event_id=row[1],
+            event_hash=row[2],
+            tree_size=row[3],
+            merkle_frontier=list(row[4] or []),
+            merkle_ready=row[5],
+            updated_at=row[6],
+            stream=row[7]
+        )
@@ -0,0 +1,73 @@
+from typing import Optional
+from ..db_service import get_db
+from .checkpoint_record import CheckpointRecord
+from .event_record import DEFAULT_STREAM
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class CheckpointDAO:
+    """Data Access Object for proof-of-integrity checkpoints using plain SQL queries."""
+
+    def __init__(self):
+        self.table_name = "proof_checkpoints"
+        self.return_columns = "app_id, event_id, event_hash, verified_count, signature, verified_at, stream"
+
+    def get_by_app_id(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[CheckpointRecord]:
+        """Get the checkpoint of one stream of a given app_id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM proof_checkpoints
+        WHERE app_id = %s AND stream = %s;
+        """
+        logger.debug("Fetching proof checkpoint for app_id=%s, stream=%s", app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id, stream))
+            result = cur.fetchone()
+
+            return CheckpointRecord.from_record(result) if result else None
+
+    def save(self, checkpoint: CheckpointRecord) -> Optional[CheckpointRecord]:
+        """
+        Insert or advance the checkpoint for an app stream. A checkpoint never moves
+        backwards, so a slower concurrent verification cannot overwrite a newer one;
+        returns None then.
+        """
+        upsert_sql = f"""
+        INSERT INTO proof_checkpoints (app_id, stream, event_id, event_hash, verified_count, signature, verified_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (app_id, stream) DO UPDATE
+        SET event_id = EXCLUDED.event_id,
+            event_hash = EXCLUDED.event_hash,
+            verified_count = EXCLUDED.verified_count,
+            signature = EXCLUDED.signature,
+            verified_at = EXCLUDED.verified_at
+        WHERE proof_checkpoints.event_id <= EXCLUDED.event_id
+        RETURNING {self.return_columns};
+        """
+        logger.debug("Saving proof checkpoint for app_id=%s, stream=%s at event_id=%s", checkpoint.app_id, checkpoint.stream, checkpoint.event_id)
+        with get_db() as (_, cur):
+            cur.execute(upsert_sql, (
+                checkpoint.app_id,
+                checkpoint.stream,
+                checkpoint.event_id,
+                checkpoint.event_hash,
+                checkpoint.verified_count,
+                checkpoint.signature,
+                checkpoint.verified_at
+            ))
+            result = cur.fetchone()
+            return CheckpointRecord.from_record(result) if result else None
+
+    def delete(self, app_id: int) -> bool:
+        """Delete the checkpoints of every stream of a given app_id."""
+        delete_sql = """
+        DELETE FROM proof_checkpoints
+        WHERE app_id = %s;
+        """
+        logger.info("Deleting proof checkpoint for app_id=%s", app_id)
+        with get_db() as (_, cur):
+            cur.execute(delete_sql, (app_id,))
+            return cur.rowcount > 0
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from datetime import datetime
+from .event_record import DEFAULT_STREAM
+
+@dataclass
+class CheckpointRecord:
+    """Data class representing a proof-of-integrity checkpoint."""
+    app_id: int = 0
+    event_id: int = 0
+    event_hash: str = ""
+    verified_count: int = 0
+    signature: str = ""
+    verified_at: datetime = None
+    stream: str = DEFAULT_STREAM
+
+    def __post_init__(self):
+        if self.verified_at is None:
+            self.verified_at = datetime.now()
+
+    def signing_payload(self) -> dict:
+        """The checkpoint fields covered by the signature."""
+        return {
+            "app_id": self.app_id,
+            "stream": self.stream,
+            "event_id": self.event_id,
+            "event_hash": self.event_hash,
+            "verified_count": self.verified_count
+        }
+
+    @classmethod
+    def from_record(cls, row):
+        """Create a CheckpointRecord instance from a database row."""
+        return cls(
+            app_id=row[0],
+            event_id=row[1],
+            event_hash=row[2],
+            verified_count=row[3],
+            signature=row[4],
+            verified_at=row[5],
+            stream=row[6]
+        )
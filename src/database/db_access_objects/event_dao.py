@@ -1,63 +1,310 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import json
-from ..db_service import get_db
-from .event_record import EventRecord
+import os
+import uuid
+from ..db_service import fetchone_replicated, get_db
+from .event_record import EventRecord, DEFAULT_STREAM
+from .event_filter import EventFilter
+from .chain_head_record import ChainHeadRecord
+from src import merkle
 from src.logger import get_logger
+from src.metrics import instrument_dao, CHAIN_HEAD_LOCK_WAIT
 import psycopg2.errors
 
 logger = get_logger(__name__)
 
+# Payloads whose canonical JSON is at least this long go to the payload store; 0 keeps
+# every payload inline
+EVENT_PAYLOAD_STORE_MIN_BYTES = int(os.getenv("EVENT_PAYLOAD_STORE_MIN_BYTES", "1024"))
+
+# Events whose payload is in the shared payload store (event_data NULL, migration 0018)
+# read it from there; the subquery only runs for those rows. Use in queries on `events`.
+EVENT_DATA_COLUMN = (
+    "COALESCE(event_data, (SELECT p.event_data FROM event_payloads p WHERE p.payload_hash = events.event_hash)) AS event_data"
+)
+EVENT_COLUMNS = f"id, app_id, type, source, {EVENT_DATA_COLUMN}, timestamp, event_hash, prev_event_hash, leaf_index, stream"
+# The columns as stored, for RETURNING clauses
+STORED_EVENT_COLUMNS = "id, app_id, type, source, event_data, timestamp, event_hash, prev_event_hash, leaf_index, stream"
+CHAIN_HEAD_COLUMNS = "app_id, event_id, event_hash, tree_size, merkle_frontier, merkle_ready, updated_at, stream"
+
+# The chain-append statements are shared with AsyncEventDAO, which converts the
+# %s placeholders to asyncpg's $n style.
+LOCK_CHAIN_HEAD_SQL = f"""
+SELECT {CHAIN_HEAD_COLUMNS}
+FROM chain_heads
+WHERE app_id = %s AND stream = %s
+FOR UPDATE;
+"""
+
+SEED_CHAIN_HEAD_SQL = """
+INSERT INTO chain_heads (app_id, stream, event_id, event_hash, merkle_ready)
+SELECT %s::int, %s::varchar, latest.id, latest.event_hash, latest.id IS NULL
+FROM (SELECT 1) AS seed
+LEFT JOIN LATERAL (
+    SELECT id, event_hash
+    FROM events
+    WHERE app_id = %s AND stream = %s
+    ORDER BY id DESC
+    LIMIT 1
+) AS latest ON TRUE
+ON CONFLICT (app_id, stream) DO NOTHING;
+"""
+
+# Adds the rows of an `inserted` CTE to the event_rollups counters. Rows are upserted in
+# key order, so concurrent inserts touching the same counters cannot deadlock.
+ROLLUP_INSERTED_CTE = """rollup AS (
+    INSERT INTO event_rollups (app_id, bucket, bucket_start, type, source, stream, event_count)
+    SELECT i.app_id, b.bucket, date_trunc(b.bucket, i.timestamp, 'UTC'), i.type, COALESCE(i.source, ''), i.stream, count(*)
+    FROM inserted i
+    CROSS JOIN (VALUES ('minute'), ('hour'), ('day')) AS b(bucket)
+    GROUP BY 1, 2, 3, 4, 5, 6
+    ORDER BY 1, 2, 3, 4, 5, 6
+    ON CONFLICT (app_id, bucket, bucket_start, type, source, stream)
+    DO UPDATE SET event_count = event_rollups.event_count + EXCLUDED.event_count
+)"""
+
+APPEND_EVENTS_SQL = f"""
+WITH new_events AS (
+    SELECT *
+    FROM unnest(
+        %s::varchar[], %s::varchar[], %s::text[], %s::boolean[], %s::timestamptz[], %s::varchar[], %s::varchar[], %s::bigint[]
+    ) WITH ORDINALITY AS e(type, source, event_data, stored, timestamp, event_hash, prev_event_hash, leaf_index, ord)
+), payloads AS (
+    -- Payloads kept in the payload store are written once. Every reference locks the
+    -- row, and refreshes referenced_at if it is a day old, so garbage collection of
+    -- payloads unreferenced for longer (see PayloadDAO.prune) never races an append
+    INSERT INTO event_payloads (payload_hash, event_data, size)
+    SELECT DISTINCT ON (event_hash) event_hash, event_data::jsonb, octet_length(event_data)
+    FROM new_events
+    WHERE stored
+    ORDER BY event_hash
+    ON CONFLICT (payload_hash) DO UPDATE
+    SET referenced_at = NOW()
+    WHERE event_payloads.referenced_at < NOW() - INTERVAL '1 day'
+), inserted AS (
+    INSERT INTO events (app_id, stream, type, source, event_data, timestamp, event_hash, prev_event_hash, leaf_index)
+    SELECT %s::int, %s::varchar, e.type, e.source, CASE WHEN e.stored THEN NULL ELSE e.event_data::jsonb END,
+           e.timestamp, e.event_hash, e.prev_event_hash, e.leaf_index
+    FROM new_events e
+    ORDER BY e.ord
+    RETURNING {STORED_EVENT_COLUMNS}
+), dedup AS (
+    -- Duplicate (app_id, event_hash) pairs fail here with a UniqueViolation
+    INSERT INTO event_dedup (app_id, event_hash, timestamp)
+    SELECT app_id, event_hash, timestamp
+    FROM inserted
+), {ROLLUP_INSERTED_CTE}, nodes AS (
+    INSERT INTO merkle_nodes (app_id, stream, level, node_index, hash)
+    SELECT %s::int, %s::varchar, n.level, n.node_index, n.hash
+    FROM unnest(%s::smallint[], %s::bigint[], %s::varchar[]) AS n(level, node_index, hash)
+), head AS (
+    UPDATE chain_heads
+    SET event_id = (SELECT max(id) FROM inserted),
+        event_hash = %s,
+        tree_size = %s,
+        merkle_frontier = %s::varchar[],
+        updated_at = NOW()
+    WHERE app_id = %s AND stream = %s
+)
+SELECT {STORED_EVENT_COLUMNS}
+FROM inserted
+ORDER BY id;
+"""
+
+
+# Sets the session time zone for the rest of the transaction. PostgreSQL renders
+# timestamptz values in JSON in the session time zone; the API renders them in UTC.
+SET_UTC_SQL = "SET LOCAL TIME ZONE 'UTC';"
+
+
+def check_single_chain(events: List[EventRecord]) -> Tuple[int, str]:
+    app_id, stream = events[0].app_id, events[0].stream
+    if any(event.app_id != app_id or event.stream != stream for event in events):
+        raise ValueError("All appended events must belong to the same app and stream.")
+    return app_id, stream
+
+
+def group_by_chain(events: List[EventRecord]) -> Dict[Tuple[int, str], List[EventRecord]]:
+    """
+    Split events into per-(app_id, stream) lists, keeping their order within each chain.
+    Keys come out sorted, so writers that lock several chain heads always do so in the
+    same order and cannot deadlock each other.
+    """
+    chains: Dict[Tuple[int, str], List[EventRecord]] = {}
+    for event in events:
+        chains.setdefault((event.app_id, event.stream), []).append(event)
+    return dict(sorted(chains.items()))
+
+
+def build_page_query(
+    app_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    event_filter: Optional[EventFilter] = None
+) -> Tuple[str, tuple]:
+    """
+    The keyset page query of get_page_by_app_id (%s placeholders) and its parameters. It
+    fetches one row more than `limit` to tell whether another page follows.
+    """
+    if after is not None and before is not None:
+        raise ValueError("Only one of 'after' and 'before' may be given.")
+    # The plain timestamp bound is implied by the row comparison, but lets the
+    # planner prune the time partitions on the far side of the cursor
+    if before is not None:
+        key_filter, order, key = "AND timestamp >= %s AND (timestamp, id) > (%s, %s)", "ASC", (before[0], *before)
+    elif after is not None:
+        key_filter, order, key = "AND timestamp <= %s AND (timestamp, id) < (%s, %s)", "DESC", (after[0], *after)
+    else:
+        key_filter, order, key = "", "DESC", ()
+    filter_sql, filter_params = (event_filter or EventFilter()).sql()
+    select_sql = f"""
+    SELECT {EVENT_COLUMNS}
+    FROM events
+    WHERE app_id = %s {filter_sql} {key_filter}
+    ORDER BY timestamp {order}, id {order}
+    LIMIT %s;
+    """
+    return select_sql, (app_id, *filter_params, *key, limit + 1)
+
+
+def build_json_stream_query(app_id: int, event_filter: Optional[EventFilter] = None) -> Tuple[str, tuple]:
+    """
+    Every event of an app matching `event_filter`, newest first, as (id, stream,
+    timestamp, JSON text) rows. The JSON is the event's API representation, encoded by
+    PostgreSQL, so the rows can be passed through without being decoded. Run after
+    SET_UTC_SQL.
+    """
+    filter_sql, filter_params = (event_filter or EventFilter()).sql()
+    select_sql = f"""
+    SELECT e.id, e.stream, e.timestamp, row_to_json(e)::text
+    FROM (
+        SELECT {EVENT_COLUMNS}
+        FROM events
+        WHERE app_id = %s {filter_sql}
+    ) AS e
+    ORDER BY e.timestamp DESC, e.id DESC;
+    """
+    return select_sql, (app_id, *filter_params)
+
+
+def is_stored_payload(encoded_data: str) -> bool:
+    """Whether a payload, as canonical JSON, is appended to the payload store instead of inline."""
+    # Canonical JSON is ASCII, so its length is its size in bytes
+    return 0 < EVENT_PAYLOAD_STORE_MIN_BYTES <= len(encoded_data)
+
+
+def appended_records(rows: List[Any], events: List[EventRecord]) -> List[EventRecord]:
+    """
+    EventRecords of the rows APPEND_EVENTS_SQL returns for `events`, in the same order.
+    Rows whose payload went to the payload store come back without it, so it is taken
+    from the appended event.
+    """
+    records = []
+    for row, event in zip(rows, events):
+        record = EventRecord.from_record(row)
+        if row[4] is None:
+            record.event_data = event.event_data
+        records.append(record)
+    return records
+
+
+def build_append_params(head: ChainHeadRecord, events: List[EventRecord]) -> tuple:
+    """
+    Link the events onto the locked chain head and add them to the app's Merkle tree,
+    in memory, then return the parameters for APPEND_EVENTS_SQL. Event data is sent as
+    the canonical JSON text the hashes were computed over, the same for both drivers,
+    with whether it goes to the payload store.
+    """
+    prev_event_hash = head.event_hash
+    for event in events:
+        event.prev_event_hash = prev_event_hash
+        prev_event_hash = event.event_hash
+
+    tree_size, frontier, nodes = head.tree_size, head.merkle_frontier, []
+    if head.merkle_ready:
+        for offset, event in enumerate(events):
+            event.leaf_index = head.tree_size + offset
+        frontier, tree_size, nodes = merkle.append_leaves(
+            frontier, tree_size, [merkle.leaf_hash(event.event_hash) for event in events]
+        )
+
+    encoded = [event.encoded_event_data() for event in events]
+    return (
+        [event.type for event in events],
+        [event.source for event in events],
+        encoded,
+        [is_stored_payload(data) for data in encoded],
+        [event.timestamp for event in events],
+        [event.event_hash for event in events],
+        [event.prev_event_hash for event in events],
+        [event.leaf_index for event in events],
+        head.app_id,
+        head.stream,
+        head.app_id,
+        head.stream,
+        [level for level, _, _ in nodes],
+        [index for _, index, _ in nodes],
+        [h for _, _, h in nodes],
+        prev_event_hash,
+        tree_size,
+        frontier,
+        head.app_id,
+        head.stream
+    )
+
+@instrument_dao
 class EventDAO:
     """Data Access Object for event operations using plain SQL queries."""
     
     def __init__(self):
         self.table_name = "events"
-        self.return_columns = "id, app_id, type, source, event_data, timestamp, event_hash, prev_event_hash"
+        self.return_columns = EVENT_COLUMNS
     
-    def create_table(self) -> None:
-        """Create the events table if it doesn't exist."""
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS events (
-            id SERIAL PRIMARY KEY,
-            app_id INT NOT NULL REFERENCES apps(id),
-            type VARCHAR(64) NOT NULL,
-            source VARCHAR(128),
-            event_data JSONB NOT NULL,
-            timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-            event_hash VARCHAR(128) NOT NULL,
-            prev_event_hash VARCHAR(128)
-        );
-        """
-        logger.info("Creating events table if not exists.")
-        with get_db() as (_, cur):
-            cur.execute(create_table_sql)
-    
-    def create(self, event: EventRecord) -> EventRecord:
-        """Create a new event record."""
-        insert_sql = f"""
-        INSERT INTO events (app_id, type, source, event_data, timestamp, event_hash, prev_event_hash)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        RETURNING {self.return_columns};
-        """
-        logger.info(f"Creating event for app_id={event.app_id}, type={event.type}")
+    def _lock_chain_head(self, cur, app_id: int, stream: str) -> ChainHeadRecord:
+        """
+        Lock the stream's chain-head row for the rest of the transaction and return it.
+        The row is seeded from the events table the first time a stream appends; the
+        Merkle tree of a stream that already had events is built by backfill_merkle.py.
+        """
+        cur.execute(LOCK_CHAIN_HEAD_SQL, (app_id, stream))
+        result = cur.fetchone()
+        if result is None:
+            logger.debug("Seeding chain head for app_id=%s, stream=%s", app_id, stream)
+            cur.execute(SEED_CHAIN_HEAD_SQL + LOCK_CHAIN_HEAD_SQL, (app_id, stream, app_id, stream, app_id, stream))
+            result = cur.fetchone()
+        return ChainHeadRecord.from_record(result)
+
+    def append(self, event: EventRecord) -> EventRecord:
+        """Append an event to its stream's chain; prev_event_hash is set from the chain head."""
+        return self.append_many([event])[0]
+
+    def append_many(self, events: List[EventRecord]) -> List[EventRecord]:
+        """
+        Append events, in order, to the chain of a single app stream. The chain head is
+        read under a row lock, the events are linked and added to the stream's Merkle
+        tree in memory, and the events, new tree nodes and head update are written in
+        one statement, all in one transaction, so concurrent writers (in any number of
+        workers) cannot fork the chain. Appends to different streams of an app lock
+        different rows and proceed in parallel.
+        """
+        if not events:
+            return []
+        app_id, stream = check_single_chain(events)
+        logger.debug("Appending %s events for app_id=%s, stream=%s", len(events), app_id, stream)
         try:
             with get_db() as (_, cur):
-                cur.execute(insert_sql, (
-                    event.app_id,
-                    event.type,
-                    event.source,
-                    json.dumps(event.event_data),
-                    event.timestamp,
-                    event.event_hash,
-                    event.prev_event_hash
-                ))
-                result = cur.fetchone()
-                logger.info(f"Event created with id={result[0] if result else 'unknown'}")
-                return EventRecord.from_record(result)
+                with CHAIN_HEAD_LOCK_WAIT.time():
+                    head = self._lock_chain_head(cur, app_id, stream)
+                cur.execute(APPEND_EVENTS_SQL, build_append_params(head, events))
+                results = cur.fetchall()
+                logger.debug("Appended %s events for app_id=%s, stream=%s", len(results), app_id, stream)
+                return appended_records(results, events)
         except psycopg2.errors.UniqueViolation:
-            logger.error(f"Event creation failed: Duplicate event for app_id={event.app_id} and hash={event.event_hash}.")
+            logger.error("Event append failed: Duplicate event for app_id=%s.", app_id)
             raise ValueError("Duplicate event detected for this app.")
-    
+
     def get_by_id(self, event_id: int) -> Optional[EventRecord]:
         """Get an event by its ID."""
         select_sql = f"""
@@ -65,44 +312,141 @@ class EventDAO:
         FROM events
         WHERE id = %s;
         """
-        logger.info(f"Fetching event by id={event_id}")
-        with get_db() as (_, cur):
-            cur.execute(select_sql, (event_id,))
-            result = cur.fetchone()
-            
-            return EventRecord.from_record(result) if result else None
+        logger.debug("Fetching event by id=%s", event_id)
+        result = fetchone_replicated(select_sql, (event_id,))
+        return EventRecord.from_record(result) if result else None
     
-    def get_by_app_id(self, app_id: int) -> List[EventRecord]:
-        """Get all events for a given app_id."""
+    def get_by_app_id(self, app_id: int, event_filter: Optional[EventFilter] = None) -> List[EventRecord]:
+        """Get all events for a given app_id, optionally only those matching a filter."""
+        filter_sql, filter_params = (event_filter or EventFilter()).sql()
         select_sql = f"""
         SELECT {self.return_columns}
         FROM events
-        WHERE app_id = %s
-        ORDER BY timestamp DESC;
+        WHERE app_id = %s {filter_sql}
+        ORDER BY timestamp DESC, id DESC;
         """
-        logger.info(f"Fetching events for app_id={app_id}")
-        with get_db() as (_, cur):
-            cur.execute(select_sql, (app_id,))
+        logger.debug("Fetching events for app_id=%s, filter=%s", app_id, event_filter)
+        with get_db(replica=True) as (_, cur):
+            cur.execute(select_sql, (app_id, *filter_params))
             results = cur.fetchall()
             
             return [EventRecord.from_record(row) for row in results]
     
+    def get_page_by_app_id(
+        self,
+        app_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+        event_filter: Optional[EventFilter] = None
+    ) -> Tuple[List[EventRecord], bool]:
+        """
+        Get one page of events for a given app_id, newest first, using keyset pagination
+        on (timestamp, id). `after` returns events older than the given key and `before`
+        returns events newer than it. Also returns whether more events exist in that direction.
+        Only events matching `event_filter` are returned.
+        """
+        select_sql, params = build_page_query(app_id, limit, after, before, event_filter)
+        logger.debug("Fetching page of events for app_id=%s, limit=%s, after=%s, before=%s, filter=%s", app_id, limit, after, before, event_filter)
+        with get_db(replica=True) as (_, cur):
+            cur.execute(select_sql, params)
+            results = cur.fetchall()
+
+        has_more = len(results) > limit
+        events = [EventRecord.from_record(row) for row in results[:limit]]
+        if before is not None:
+            events.reverse()
+        return events, has_more
+
+    def _stream(self, select_sql: str, params: tuple, chunk_size: int) -> Iterator[EventRecord]:
+        """Yield rows of a query through a server-side (named) cursor, `chunk_size` rows per fetch."""
+        with get_db(replica=True) as (conn, _):
+            with conn.cursor(name=f"events_stream_{uuid.uuid4().hex}") as cur:
+                cur.itersize = chunk_size
+                cur.execute(select_sql, params)
+                for row in cur:
+                    yield EventRecord.from_record(row)
+
+    def iter_by_app_id(self, app_id: int, chunk_size: int = 1000, event_filter: Optional[EventFilter] = None) -> Iterator[EventRecord]:
+        """
+        Stream all events for a given app_id (matching `event_filter`, if given), newest first,
+        through a server-side cursor that fetches `chunk_size` rows at a time, so memory use
+        does not grow with the log.
+        """
+        filter_sql, filter_params = (event_filter or EventFilter()).sql()
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = %s {filter_sql}
+        ORDER BY timestamp DESC, id DESC;
+        """
+        logger.debug("Streaming events for app_id=%s in chunks of %s, filter=%s", app_id, chunk_size, event_filter)
+        return self._stream(select_sql, (app_id, *filter_params), chunk_size)
+
+    def match_data_path(self, event_data: List[Dict[str, Any]], data_path: str) -> List[bool]:
+        """
+        Evaluate a SQL/JSON path predicate against event data that is not in the events
+        table (e.g. archived events), in one round trip. Returns one flag per document.
+        """
+        if not event_data:
+            return []
+        select_sql = """
+        SELECT COALESCE(d::jsonb @@ %s::text::jsonpath, false)
+        FROM unnest(%s::text[]) WITH ORDINALITY AS t(d, i)
+        ORDER BY i;
+        """
+        with get_db(replica=True) as (_, cur):
+            cur.execute(select_sql, (data_path, [json.dumps(data) for data in event_data]))
+            return [row[0] for row in cur.fetchall()]
+
+    def iter_chain_by_app_id(
+        self,
+        app_id: int,
+        stream: str = DEFAULT_STREAM,
+        after_id: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[EventRecord]:
+        """Stream the events of one app stream in chain (append) order through a server-side cursor."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = %s AND stream = %s AND id > %s
+        ORDER BY id ASC;
+        """
+        logger.debug("Streaming event chain for app_id=%s, stream=%s after id=%s in chunks of %s", app_id, stream, after_id, chunk_size)
+        return self._stream(select_sql, (app_id, stream, after_id if after_id is not None else 0), chunk_size)
+
+    def get_chain_by_app_id(self, app_id: int, stream: str = DEFAULT_STREAM, after_id: Optional[int] = None) -> List[EventRecord]:
+        """Get the events of one app stream in chain (append) order, optionally only those after an event id."""
+        select_sql = f"""
+        SELECT {self.return_columns}
+        FROM events
+        WHERE app_id = %s AND stream = %s AND id > %s
+        ORDER BY id ASC;
+        """
+        logger.debug("Fetching event chain for app_id=%s, stream=%s after id=%s", app_id, stream, after_id)
+        with get_db(replica=True) as (_, cur):
+            cur.execute(select_sql, (app_id, stream, after_id if after_id is not None else 0))
+            results = cur.fetchall()
+
+            return [EventRecord.from_record(row) for row in results]
+
     def update(self, event: EventRecord) -> Optional[EventRecord]:
         """Update an existing event."""
         update_sql = f"""
         UPDATE events
         SET app_id = %s, type = %s, source = %s, event_data = %s, timestamp = %s, event_hash = %s, prev_event_hash = %s
         WHERE id = %s
-        RETURNING {self.return_columns};
+        RETURNING {STORED_EVENT_COLUMNS};
         """
-        logger.info(f"Updating event id={event.id}")
+        logger.info("Updating event id=%s", event.id)
         try:
             with get_db() as (_, cur):
                 cur.execute(update_sql, (
                     event.app_id,
                     event.type,
                     event.source,
-                    json.dumps(event.event_data),
+                    event.encoded_event_data(),
                     event.timestamp,
                     event.event_hash,
                     event.prev_event_hash,
@@ -111,7 +455,7 @@ class EventDAO:
                 result = cur.fetchone()
                 return EventRecord.from_record(result) if result else None
         except psycopg2.errors.UniqueViolation:
-            logger.error(f"Event update failed: Duplicate event for app_id={event.app_id} and hash={event.event_hash}.")
+            logger.error("Event update failed: Duplicate event for app_id=%s and hash=%s.", event.app_id, event.event_hash)
             raise ValueError("Duplicate event detected for this app.")
     
     def delete(self, event_id: int) -> bool:
@@ -120,7 +464,7 @@ class EventDAO:
         DELETE FROM events
         WHERE id = %s;
         """
-        logger.info(f"Deleting event id={event_id}")
+        logger.info("Deleting event id=%s", event_id)
         with get_db() as (_, cur):
             cur.execute(delete_sql, (event_id,))
             return cur.rowcount > 0
@@ -135,7 +479,7 @@ class EventDAO:
         LIMIT 1
         {"FOR UPDATE" if for_update else ""};
         """
-        logger.info(f"Fetching latest event for app_id={app_id} with lock={for_update}")
+        logger.debug("Fetching latest event for app_id=%s with lock=%s", app_id, for_update)
         with get_db() as (conn, cur):
             cur.execute(select_sql, (app_id,))
             result = cur.fetchone()
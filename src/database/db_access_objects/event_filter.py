@@ -0,0 +1,100 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import json
+from .event_record import EventRecord
+
+def payload_condition(predicate: str) -> str:
+    """
+    A predicate on event data, for inline payloads and those in the payload store. The
+    matching stored payloads are looked up once, so both sides can use their GIN index.
+    """
+    return (
+        f"(event_data {predicate} OR event_hash = ANY(ARRAY("
+        f"SELECT event_payloads.payload_hash FROM event_payloads WHERE event_payloads.event_data {predicate})))"
+    )
+
+
+@dataclass
+class EventFilter:
+    """
+    Server-side predicates on an app's events, pushed down into the events queries and
+    applied to archived events. `since` is inclusive and `until` exclusive.
+    `data_contains` is a JSONB containment (`@>`) document and `data_path` a SQL/JSON
+    path predicate (`@@`), e.g. `$.amount > 100`.
+    """
+    type: Optional[str] = None
+    source: Optional[str] = None
+    stream: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    data_contains: Optional[Dict[str, Any]] = None
+    data_path: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, f.name) is not None for f in fields(self))
+
+    def sql(self) -> Tuple[str, tuple]:
+        """`AND ...` conditions with %s placeholders, and their parameters."""
+        conditions, params = [], []
+        for column in ("type", "source", "stream"):
+            if getattr(self, column) is not None:
+                conditions.append(f"{column} = %s")
+                params.append(getattr(self, column))
+        if self.since is not None:
+            conditions.append("timestamp >= %s")
+            params.append(self.since)
+        if self.until is not None:
+            conditions.append("timestamp < %s")
+            params.append(self.until)
+        # Passed as text so both drivers send the same parameter, whatever their jsonb codecs
+        if self.data_contains is not None:
+            conditions.append(payload_condition("@> %s::text::jsonb"))
+            params.extend([json.dumps(self.data_contains)] * 2)
+        if self.data_path is not None:
+            conditions.append(payload_condition("@@ %s::text::jsonpath"))
+            params.extend([self.data_path] * 2)
+        return "".join(f" AND {condition}" for condition in conditions), tuple(params)
+
+    def in_time_range(self, min_timestamp: datetime, max_timestamp: datetime) -> bool:
+        """Whether events timestamped within [min_timestamp, max_timestamp] may match."""
+        return (
+            (self.since is None or max_timestamp >= self.since)
+            and (self.until is None or min_timestamp < self.until)
+        )
+
+    def matches(self, event: EventRecord) -> bool:
+        """Every predicate except `data_path`, which only PostgreSQL evaluates."""
+        return (
+            (self.type is None or event.type == self.type)
+            and (self.source is None or event.source == self.source)
+            and (self.stream is None or event.stream == self.stream)
+            and (self.since is None or event.timestamp >= self.since)
+            and (self.until is None or event.timestamp < self.until)
+            and (self.data_contains is None or jsonb_contains(event.event_data, self.data_contains))
+        )
+
+
+def _scalar_equal(value: Any, other: Any) -> bool:
+    # JSON booleans are not numbers, but 1 and 1.0 are the same number
+    if isinstance(value, bool) or isinstance(other, bool):
+        return type(value) is type(other) and value == other
+    if isinstance(value, (int, float)) and isinstance(other, (int, float)):
+        return value == other
+    return type(value) is type(other) and value == other
+
+
+def jsonb_contains(value: Any, contained: Any, top_level: bool = True) -> bool:
+    """Python equivalent of PostgreSQL's jsonb `value @> contained`."""
+    if isinstance(contained, dict):
+        return isinstance(value, dict) and all(
+            key in value and jsonb_contains(value[key], item, False) for key, item in contained.items()
+        )
+    if isinstance(contained, list):
+        return isinstance(value, list) and all(
+            any(jsonb_contains(element, item, False) for element in value) for item in contained
+        )
+    if top_level and isinstance(value, list):
+        # Only a top-level array contains a bare primitive it holds
+        return any(_scalar_equal(element, contained) for element in value)
+    return _scalar_equal(value, contained)
@@ -1,10 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, Dict, Any
+from src.hashing import canonical_json
 
-@dataclass
+# Stream of every event logged without an explicit one, and of all pre-stream events
+DEFAULT_STREAM = "default"
+
+@dataclass(slots=True)
 class EventRecord:
-    """Data class representing an event record."""
+    """
+    Data class representing an event record. `encoded_data` is the canonical JSON of
+    `event_data` when ingest already computed it for the hash; it is written to the
+    database as is and is not part of the API representation.
+    """
     id: Optional[int] = None
     app_id: int = 0
     type: str = ""
@@ -13,7 +21,10 @@ class EventRecord:
     timestamp: datetime = None
     event_hash: str = ""
     prev_event_hash: str = None
-    
+    leaf_index: Optional[int] = None
+    stream: str = DEFAULT_STREAM
+    encoded_data: Optional[str] = field(default=None, repr=False, compare=False)
+
     def __post_init__(self):
         if self.event_data is None:
             self.event_data = {}
@@ -31,5 +42,13 @@ class EventRecord:
             event_data=row[4],
             timestamp=row[5],
             event_hash=row[6],
-            prev_event_hash=row[7] if len(row) > 7 else None
+            prev_event_hash=row[7] if len(row) > 7 else None,
+            leaf_index=row[8] if len(row) > 8 else None,
+            stream=row[9] if len(row) > 9 else DEFAULT_STREAM
         )
+
+    def encoded_event_data(self) -> str:
+        """The canonical JSON of `event_data`, computed only if ingest did not."""
+        if self.encoded_data is None:
+            self.encoded_data = canonical_json(self.event_data)
+        return self.encoded_data
@@ -0,0 +1,50 @@
+from datetime import datetime
+from ..db_service import get_db
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+# Claims a key, or takes over one whose retention has ended. A key that is still in use
+# returns no row; if its request is still in flight, this waits for it to commit or roll back.
+CLAIM_IDEMPOTENCY_KEY_SQL = """
+INSERT INTO idempotency_keys (app_id, idempotency_key, request_hash, created_at)
+VALUES (%s, %s, %s, NOW())
+ON CONFLICT (app_id, idempotency_key) DO UPDATE
+SET request_hash = EXCLUDED.request_hash,
+    status_code = NULL,
+    response = NULL,
+    created_at = EXCLUDED.created_at
+WHERE idempotency_keys.created_at < %s
+RETURNING app_id;
+"""
+
+SELECT_IDEMPOTENCY_KEY_SQL = """
+SELECT app_id, idempotency_key, request_hash, status_code, response, created_at
+FROM idempotency_keys
+WHERE app_id = %s AND idempotency_key = %s;
+"""
+
+COMPLETE_IDEMPOTENCY_KEY_SQL = """
+UPDATE idempotency_keys
+SET status_code = %s, response = %s::text::jsonb
+WHERE app_id = %s AND idempotency_key = %s;
+"""
+
+@instrument_dao
+class IdempotencyKeyDAO:
+    """Data Access Object for the Idempotency-Keys of ingest requests (idempotency_keys) using plain SQL queries."""
+
+    def __init__(self):
+        self.table_name = "idempotency_keys"
+
+    def prune(self, before: datetime) -> int:
+        """Delete the keys first used before a given time; returns how many."""
+        delete_sql = """
+        DELETE FROM idempotency_keys
+        WHERE created_at < %s;
+        """
+        logger.info("Pruning idempotency keys used before %s", before.isoformat())
+        with get_db() as (_, cur):
+            cur.execute(delete_sql, (before,))
+            return cur.rowcount
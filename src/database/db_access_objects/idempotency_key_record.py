@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+@dataclass
+class IdempotencyKeyRecord:
+    """Data class representing a used Idempotency-Key and the response of its request (None until it completes)."""
+    app_id: int = 0
+    idempotency_key: str = ""
+    request_hash: str = ""
+    status_code: Optional[int] = None
+    response: Optional[Any] = None
+    created_at: datetime = None
+
+    @classmethod
+    def from_record(cls, row):
+        """Create an IdempotencyKeyRecord instance from a database row."""
+        return cls(
+            app_id=row[0],
+            idempotency_key=row[1],
+            request_hash=row[2],
+            status_code=row[3],
+            response=row[4],
+            created_at=row[5]
+        )
@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Tuple
+from ..db_service import get_db
+from .chain_head_record import ChainHeadRecord
+from .event_record import DEFAULT_STREAM
+from .event_dao import CHAIN_HEAD_COLUMNS
+from src import merkle
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class MerkleDAO:
+    """Data Access Object for the per-stream Merkle trees stored in merkle_nodes and chain_heads."""
+
+    def __init__(self):
+        self.table_name = "merkle_nodes"
+
+    def get_head(self, app_id: int, stream: str = DEFAULT_STREAM) -> Optional[ChainHeadRecord]:
+        """Get the chain head (tree size and frontier) of one app stream without locking it."""
+        select_sql = f"""
+        SELECT {CHAIN_HEAD_COLUMNS}
+        FROM chain_heads
+        WHERE app_id = %s AND stream = %s;
+        """
+        logger.debug("Fetching chain head for app_id=%s, stream=%s", app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id, stream))
+            result = cur.fetchone()
+
+            return ChainHeadRecord.from_record(result) if result else None
+
+    def get_heads(self, app_id: int) -> List[ChainHeadRecord]:
+        """Get the chain heads of every stream of a given app_id, ordered by stream."""
+        select_sql = f"""
+        SELECT {CHAIN_HEAD_COLUMNS}
+        FROM chain_heads
+        WHERE app_id = %s
+        ORDER BY stream;
+        """
+        logger.debug("Fetching chain heads for app_id=%s", app_id)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, (app_id,))
+            return [ChainHeadRecord.from_record(row) for row in cur.fetchall()]
+
+    def get_nodes(self, app_id: int, stream: str, keys: List[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+        """Get the hashes of the given (level, node_index) nodes of one stream's tree in one query."""
+        select_sql = """
+        SELECT m.level, m.node_index, m.hash
+        FROM merkle_nodes m
+        JOIN unnest(%s::smallint[], %s::bigint[]) AS k(level, node_index)
+            ON m.level = k.level AND m.node_index = k.node_index
+        WHERE m.app_id = %s AND m.stream = %s;
+        """
+        logger.debug("Fetching %s Merkle nodes for app_id=%s, stream=%s", len(keys), app_id, stream)
+        with get_db() as (_, cur):
+            cur.execute(select_sql, ([level for level, _ in keys], [index for _, index in keys], app_id, stream))
+            return {(level, index): h for level, index, h in cur.fetchall()}
+
+    def backfill_chunk(
+        self,
+        app_id: int,
+        stream: str = DEFAULT_STREAM,
+        after_id: Optional[int] = None,
+        chunk_size: int = 10000
+    ) -> Tuple[Optional[int], bool]:
+        """
+        Add up to `chunk_size` not-yet-included events of an app stream to its Merkle
+        tree, in chain order, under the chain-head lock. `after_id` is the last event
+        already in the tree (looked up when not given). Returns the last event id added
+        and whether the tree has caught up with the chain (appends maintain it from then on).
+        """
+        lock_sql = f"""
+        SELECT {CHAIN_HEAD_COLUMNS}
+        FROM chain_heads
+        WHERE app_id = %s AND stream = %s
+        FOR UPDATE;
+        """
+        last_leaf_sql = """
+        SELECT COALESCE(max(id), 0)
+        FROM events
+        WHERE app_id = %s AND stream = %s AND leaf_index IS NOT NULL;
+        """
+        pending_sql = """
+        SELECT id, event_hash
+        FROM events
+        WHERE app_id = %s AND stream = %s AND id > %s
+        ORDER BY id ASC
+        LIMIT %s;
+        """
+        write_sql = """
+        WITH leaves AS (
+            UPDATE events
+            SET leaf_index = l.leaf_index
+            FROM unnest(%s::int[], %s::bigint[]) AS l(id, leaf_index)
+            WHERE events.id = l.id
+        ), nodes AS (
+            INSERT INTO merkle_nodes (app_id, stream, level, node_index, hash)
+            SELECT %s, %s, n.level, n.node_index, n.hash
+            FROM unnest(%s::smallint[], %s::bigint[], %s::varchar[]) AS n(level, node_index, hash)
+        )
+        UPDATE chain_heads
+        SET tree_size = %s, merkle_frontier = %s::varchar[], merkle_ready = %s
+        WHERE app_id = %s AND stream = %s;
+        """
+        with get_db() as (_, cur):
+            cur.execute(lock_sql, (app_id, stream))
+            result = cur.fetchone()
+            if result is None:
+                return after_id, False
+            head = ChainHeadRecord.from_record(result)
+            if head.merkle_ready:
+                return after_id, True
+
+            if after_id is None:
+                cur.execute(last_leaf_sql, (app_id, stream))
+                after_id = cur.fetchone()[0]
+            cur.execute(pending_sql, (app_id, stream, after_id, chunk_size))
+            pending = cur.fetchall()
+            frontier, tree_size, nodes = merkle.append_leaves(
+                head.merkle_frontier, head.tree_size, [merkle.leaf_hash(event_hash) for _, event_hash in pending]
+            )
+            ready = len(pending) < chunk_size
+            cur.execute(write_sql, (
+                [event_id for event_id, _ in pending],
+                list(range(head.tree_size, tree_size)),
+                app_id,
+                stream,
+                [level for level, _, _ in nodes],
+                [index for _, index, _ in nodes],
+                [h for _, _, h in nodes],
+                tree_size,
+                frontier,
+                ready,
+                app_id,
+                stream
+            ))
+            logger.info("Backfilled %s Merkle leaves for app_id=%s, stream=%s, tree_size=%s, ready=%s", len(pending), app_id, stream, tree_size, ready)
+            return (pending[-1][0] if pending else after_id), ready
+
+    def get_unready_chains(self) -> List[Tuple[int, str]]:
+        """Get the (app_id, stream) chains whose Merkle tree has not caught up with the chain."""
+        select_sql = """
+        SELECT app_id, stream
+        FROM chain_heads
+        WHERE NOT merkle_ready
+        ORDER BY app_id, stream;
+        """
+        with get_db() as (_, cur):
+            cur.execute(select_sql)
+            return [(app_id, stream) for app_id, stream in cur.fetchall()]
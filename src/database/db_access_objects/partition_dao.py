@@ -0,0 +1,112 @@
+from typing import List
+from psycopg2 import sql
+from ..db_service import get_db
+from .anchor_record import AnchorRecord
+from .partition_record import EventPartitionRecord
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+ENSURE_PARTITIONS_SQL = "SELECT ensure_event_partitions(%s);"
+
+@instrument_dao
+class PartitionDAO:
+    """Data Access Object for the monthly partitions of the events table (migration 0011)."""
+
+    def __init__(self):
+        self.table_name = "events"
+
+    def ensure_partitions(self, months_ahead: int) -> int:
+        """Create the monthly partitions up to `months_ahead` months ahead; returns how many were created."""
+        logger.info("Ensuring event partitions %s months ahead", months_ahead)
+        with get_db() as (_, cur):
+            cur.execute(ENSURE_PARTITIONS_SQL, (months_ahead,))
+            return cur.fetchone()[0]
+
+    def get_partitions(self) -> List[EventPartitionRecord]:
+        """Get the partitions of the events table, oldest first and the default partition last."""
+        select_sql = """
+        SELECT c.relname,
+               (regexp_match(b.bound, 'FROM \\(''([^'']+)''\\)'))[1]::timestamptz AS lower_bound,
+               (regexp_match(b.bound, 'TO \\(''([^'']+)''\\)'))[1]::timestamptz AS upper_bound,
+               b.bound = 'DEFAULT' AS is_default
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        CROSS JOIN LATERAL (SELECT pg_get_expr(c.relpartbound, c.oid) AS bound) AS b
+        WHERE i.inhparent = 'events'::regclass
+        ORDER BY upper_bound NULLS LAST;
+        """
+        with get_db() as (_, cur):
+            cur.execute(select_sql)
+            return [EventPartitionRecord.from_record(row) for row in cur.fetchall()]
+
+    def get_anchors_for_partition(self, partition: EventPartitionRecord) -> List[AnchorRecord]:
+        """
+        Lock a partition against writes for the rest of the transaction and return, for
+        every chain with events in it, an unsigned anchor at the chain's last event in
+        the partition. `event_count` is that event's position in the chain plus one,
+        counting from the chain's current anchor and including archived events. Chains
+        whose anchor is already past the partition are skipped, so anchors never move
+        backwards.
+        """
+        lock_sql = sql.SQL("LOCK TABLE {} IN SHARE MODE;").format(sql.Identifier(partition.name))
+        select_sql = sql.SQL("""
+        WITH expiring AS (
+            SELECT DISTINCT ON (app_id, stream) app_id, stream, id AS event_id, event_hash
+            FROM {}
+            ORDER BY app_id, stream, id DESC
+        )
+        SELECT x.app_id, x.stream, x.event_id, x.event_hash,
+               COALESCE(a.event_count, 0) + (
+                   SELECT count(*)
+                   FROM events e
+                   WHERE e.app_id = x.app_id AND e.stream = x.stream
+                     AND e.id > COALESCE(a.event_id, 0) AND e.id <= x.event_id
+               ) + (
+                   SELECT COALESCE(sum(s.event_count), 0)
+                   FROM archive_segments s
+                   WHERE s.app_id = x.app_id AND s.stream = x.stream
+                     AND s.first_event_id > COALESCE(a.event_id, 0) AND s.last_event_id <= x.event_id
+               ) AS event_count
+        FROM expiring x
+        LEFT JOIN chain_anchors a ON a.app_id = x.app_id AND a.stream = x.stream
+        WHERE a.event_id IS NULL OR a.event_id < x.event_id
+        ORDER BY x.app_id, x.stream;
+        """).format(sql.Identifier(partition.name))
+        logger.info("Computing chain anchors for partition %s", partition.name)
+        with get_db() as (_, cur):
+            cur.execute(lock_sql)
+            cur.execute(select_sql)
+            return [
+                AnchorRecord(app_id=app_id, stream=stream, event_id=event_id, event_hash=event_hash, event_count=event_count)
+                for app_id, stream, event_id, event_hash, event_count in cur.fetchall()
+            ]
+
+    def expire_partition(self, partition: EventPartitionRecord, drop: bool = False) -> None:
+        """
+        Remove a partition from the events table, together with the duplicate-detection
+        entries of its events. The partition is detached and kept as a standalone table,
+        or dropped when `drop` is set. A detached partition gets its events' payloads
+        back from the payload store first, so it stands on its own.
+        """
+        inline_payloads_sql = sql.SQL("""
+        UPDATE {} e
+        SET event_data = p.event_data
+        FROM event_payloads p
+        WHERE e.event_data IS NULL AND p.payload_hash = e.event_hash;
+        """).format(sql.Identifier(partition.name))
+        purge_sql = """
+        DELETE FROM event_dedup
+        WHERE timestamp < %s AND (%s::timestamptz IS NULL OR timestamp >= %s);
+        """
+        detach_sql = sql.SQL("ALTER TABLE events DETACH PARTITION {};").format(sql.Identifier(partition.name))
+        drop_sql = sql.SQL("DROP TABLE {};").format(sql.Identifier(partition.name))
+        logger.info("Expiring event partition %s (drop=%s)", partition.name, drop)
+        with get_db() as (_, cur):
+            cur.execute(purge_sql, (partition.upper_bound, partition.lower_bound, partition.lower_bound))
+            if not drop:
+                cur.execute(inline_payloads_sql)
+            cur.execute(detach_sql)
+            if drop:
+                cur.execute(drop_sql)
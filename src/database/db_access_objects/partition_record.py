@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+@dataclass
+class EventPartitionRecord:
+    """Data class representing one time-range partition of the events table."""
+    name: str = ""
+    lower_bound: Optional[datetime] = None
+    upper_bound: Optional[datetime] = None
+    is_default: bool = False
+
+    @classmethod
+    def from_record(cls, row):
+        """Create an EventPartitionRecord instance from a database row."""
+        return cls(
+            name=row[0],
+            lower_bound=row[1],
+            upper_bound=row[2],
+            is_default=row[3]
+        )
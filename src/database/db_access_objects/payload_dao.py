@@ -0,0 +1,34 @@
+from datetime import datetime
+from ..db_service import get_db
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+@instrument_dao
+class PayloadDAO:
+    """Data Access Object for the content-addressed event payload store (event_payloads, migration 0018)."""
+
+    def __init__(self):
+        self.table_name = "event_payloads"
+
+    def prune(self, referenced_before: datetime) -> int:
+        """
+        Delete the payloads that no event references any more, e.g. after archiving or
+        retention, and that no append has referenced since `referenced_before`; returns
+        how many. Appends refresh referenced_at once it is a day old, so keep
+        `referenced_before` more than a day back.
+        """
+        delete_sql = """
+        DELETE FROM event_payloads p
+        WHERE p.referenced_at < %s
+          AND NOT EXISTS (
+              SELECT 1
+              FROM events e
+              WHERE e.event_hash = p.payload_hash AND e.event_data IS NULL
+          );
+        """
+        logger.info("Pruning unreferenced event payloads last referenced before %s", referenced_before.isoformat())
+        with get_db() as (_, cur):
+            cur.execute(delete_sql, (referenced_before,))
+            return cur.rowcount
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from ..db_service import get_db
+from .rollup_record import EventRollupRecord
+from src.logger import get_logger
+from src.metrics import instrument_dao
+
+logger = get_logger(__name__)
+
+ROLLUP_GROUP_COLUMNS = ("type", "source", "stream")
+
+def build_stats_query(
+    app_id: int,
+    bucket: str,
+    since: datetime,
+    until: datetime,
+    group_by: Sequence[str] = ("type", "source"),
+    event_type: Optional[str] = None,
+    source: Optional[str] = None,
+    stream: Optional[str] = None
+) -> Tuple[str, tuple]:
+    """
+    The event_rollups query (%s placeholders) for the counts of one bucket size in
+    [since, until), summed per bucket and the `group_by` columns, and its parameters.
+    The bucket containing `since` is included whole.
+    """
+    unknown = set(group_by) - set(ROLLUP_GROUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot group event statistics by {sorted(unknown)}.")
+    selected = ", ".join(column if column in group_by else f"NULL AS {column}" for column in ROLLUP_GROUP_COLUMNS)
+    grouped = "".join(f", {column}" for column in ROLLUP_GROUP_COLUMNS if column in group_by)
+    conditions, params = [], [app_id, bucket, bucket, since, until]
+    for column, value in (("type", event_type), ("source", source), ("stream", stream)):
+        if value is not None:
+            conditions.append(f" AND {column} = %s")
+            params.append(value)
+    select_sql = f"""
+    SELECT bucket_start, {selected}, sum(event_count)::bigint
+    FROM event_rollups
+    WHERE app_id = %s AND bucket = %s
+      AND bucket_start >= date_trunc(%s, %s::timestamptz, 'UTC') AND bucket_start < %s{"".join(conditions)}
+    GROUP BY bucket_start{grouped}
+    ORDER BY bucket_start{grouped};
+    """
+    return select_sql, tuple(params)
+
+
+@instrument_dao
+class RollupDAO:
+    """Data Access Object for the event count rollups (event_rollups) using plain SQL queries."""
+
+    def __init__(self):
+        self.table_name = "event_rollups"
+
+    def get_stats(
+        self,
+        app_id: int,
+        bucket: str,
+        since: datetime,
+        until: datetime,
+        group_by: Sequence[str] = ("type", "source"),
+        event_type: Optional[str] = None,
+        source: Optional[str] = None,
+        stream: Optional[str] = None
+    ) -> List[EventRollupRecord]:
+        """Event counts per `bucket` and `group_by` columns in [since, until). See build_stats_query."""
+        select_sql, params = build_stats_query(app_id, bucket, since, until, group_by, event_type, source, stream)
+        logger.debug("Fetching %s event stats for app_id=%s from %s to %s", bucket, app_id, since.isoformat(), until.isoformat())
+        with get_db() as (_, cur):
+            cur.execute(select_sql, params)
+            return [EventRollupRecord.from_record(row) for row in cur.fetchall()]
+
+    def prune(self, bucket: str, before: datetime) -> int:
+        """Delete the counters of one bucket size that start before a given time; returns how many."""
+        delete_sql = """
+        DELETE FROM event_rollups
+        WHERE bucket = %s AND bucket_start < %s;
+        """
+        logger.info("Pruning %s event rollups before %s", bucket, before.isoformat())
+        with get_db() as (_, cur):
+            cur.execute(delete_sql, (bucket, before))
+            return cur.rowcount
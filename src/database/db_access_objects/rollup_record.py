@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+ROLLUP_BUCKETS = ("minute", "hour", "day")
+
+@dataclass
+class EventRollupRecord:
+    """Data class representing the event count of one time bucket, per the grouped columns (None if not grouped)."""
+    bucket_start: datetime = None
+    type: Optional[str] = None
+    source: Optional[str] = None
+    stream: Optional[str] = None
+    event_count: int = 0
+
+    @classmethod
+    def from_record(cls, row):
+        """Create an EventRollupRecord instance from a database row."""
+        return cls(
+            bucket_start=row[0],
+            type=row[1],
+            # Events without a source are counted under ''
+            source=row[2] or None,
+            stream=row[3],
+            event_count=row[4]
+        )
@@ -1,21 +1,246 @@
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
 import psycopg2
+
 from dotenv import load_dotenv
-from contextlib import contextmanager
+from starlette.concurrency import run_in_threadpool
+
+from .connection_pool import ConnectionPool, PoolTimeoutError
+from .replicas import REPLICA_LAG_SQL, Replica, replica_rotation, replicas
+from src.metrics import DB_CONNECTION_ACQUIRE
 
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_replica_pools: Dict[int, ConnectionPool] = {}
+
+# Connection shared by every get_db() call made while a db_scope() is active.
+_scoped_conn: ContextVar = ContextVar("scoped_db_connection", default=None)
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+                )
+    return _pool
+
+
+def _get_replica_pool(replica: Replica) -> ConnectionPool:
+    pool = _replica_pools.get(replica.index)
+    if pool is None:
+        with _pool_lock:
+            pool = _replica_pools.get(replica.index)
+            if pool is None:
+                pool = _replica_pools[replica.index] = ConnectionPool(
+                    replica.dsn,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+                )
+    return pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        while _replica_pools:
+            _, pool = _replica_pools.popitem()
+            pool.close()
+
+
+def _acquire(pool: ConnectionPool):
+    with DB_CONNECTION_ACQUIRE.time("sync"):
+        return pool.acquire()
+
+
+def _acquire_replica() -> Optional[Tuple[ConnectionPool, object]]:
+    """A connection to a usable replica, checking its lag when due, or None to read from the primary."""
+    for replica in replica_rotation():
+        check = replica.start_check()
+        if not check and not replica.is_usable():
+            continue
+        try:
+            pool = _get_replica_pool(replica)
+            conn = _acquire(pool)
+        except (PoolTimeoutError, psycopg2.Error) as e:
+            replica.record_failure(e)
+            continue
+        if check:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(REPLICA_LAG_SQL)
+                    replica.record_lag(cur.fetchone()[0])
+                # SET TRANSACTION READ ONLY must start the next transaction
+                conn.rollback()
+            except psycopg2.Error as e:
+                pool.release(conn, discard=True)
+                replica.record_failure(e)
+                continue
+        if replica.is_usable():
+            replica.reads += 1
+            return pool, conn
+        pool.release(conn)
+    return None
+
+
+def _replica_for_read() -> Optional[Tuple[ConnectionPool, object]]:
+    # Reads inside a db_scope() stay in its transaction on the primary
+    if not replicas or _scoped_conn.get() is not None:
+        return None
+    return _acquire_replica()
+
+
+def pool_stats() -> dict:
+    if _pool is None:
+        return {"initialized": False}
+    return {"initialized": True, **_pool.stats()}
+
 
 @contextmanager
-def get_db():
-    conn = psycopg2.connect(DB_URL)
+def get_db(replica: bool = False):
+    """
+    Yields a (connection, cursor) pair. Inside a db_scope() the scoped connection is
+    reused and the scope owns the transaction; otherwise a pooled connection is used
+    and committed when the block exits. Outside a scope, a `replica` block reads in a
+    read-only transaction on a usable replica, if there is one.
+    """
+    target = _replica_for_read() if replica else None
+    if target is not None:
+        pool, conn = target
+        cur = conn.cursor()
+        try:
+            cur.execute("SET TRANSACTION READ ONLY;")
+            yield conn, cur
+        finally:
+            cur.close()
+            # Releasing rolls the read-only transaction back
+            pool.release(conn)
+        return
+
+    conn = _scoped_conn.get()
+    if conn is not None:
+        cur = conn.cursor()
+        try:
+            yield conn, cur
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        return
+
+    pool = get_pool()
+    conn = _acquire(pool)
     cur = conn.cursor()
+    broken = False
     try:
         yield conn, cur
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
         raise
     finally:
         cur.close()
-        conn.close()
+        pool.release(conn, discard=broken)
+
+
+def fetchone_replicated(sql: str, params: tuple) -> Optional[tuple]:
+    """
+    fetchone on a replica, as get_db(replica=True). A row the replica does not have,
+    perhaps written a moment ago, is looked up again on the primary.
+    """
+    target = _replica_for_read()
+    if target is not None:
+        pool, conn = target
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                row = cur.fetchone()
+        finally:
+            pool.release(conn)
+        if row is not None:
+            return row
+    with get_db() as (_, cur):
+        cur.execute(sql, params)
+        return cur.fetchone()
+
+
+@contextmanager
+def db_scope():
+    """
+    Shares one pooled connection and one transaction across every get_db() call
+    made inside the block. Nested scopes join the outer one.
+    """
+    if _scoped_conn.get() is not None:
+        yield _scoped_conn.get()
+        return
+
+    pool = get_pool()
+    conn = _acquire(pool)
+    token = _scoped_conn.set(conn)
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
+    finally:
+        _scoped_conn.reset(token)
+        pool.release(conn, discard=broken)
+
+
+async def request_db():
+    """
+    FastAPI dependency that holds one pooled connection for the whole request, so the
+    auth lookup and every DAO call made by the route run on the same connection.
+    """
+    if _scoped_conn.get() is not None:
+        yield _scoped_conn.get()
+        return
+
+    pool = get_pool()
+    conn = await run_in_threadpool(_acquire, pool)
+    token = _scoped_conn.set(conn)
+    broken = False
+    try:
+        yield conn
+        await run_in_threadpool(conn.commit)
+    except Exception:
+        try:
+            await run_in_threadpool(conn.rollback)
+        except Exception:
+            broken = True
+        raise
+    finally:
+        _scoped_conn.reset(token)
+        await run_in_threadpool(pool.release, conn, broken)
@@ -0,0 +1,33 @@
+-- Baseline schema: the tables previously created by db_init.py.
+
+CREATE TABLE IF NOT EXISTS apps (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(128) NOT NULL UNIQUE,
+    api_key TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    id SERIAL PRIMARY KEY,
+    app_id INT NOT NULL REFERENCES apps(id),
+    type VARCHAR(64) NOT NULL,
+    source VARCHAR(128),
+    event_data JSONB NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    event_hash VARCHAR(128) NOT NULL,
+    prev_event_hash VARCHAR(128)
+);
+
+CREATE TABLE IF NOT EXISTS chain_heads (
+    app_id INT PRIMARY KEY REFERENCES apps(id),
+    event_id INT,
+    event_hash VARCHAR(128),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Backfill chain heads for apps that logged events before chain_heads existed
+INSERT INTO chain_heads (app_id, event_id, event_hash)
+SELECT DISTINCT ON (app_id) app_id, id, event_hash
+FROM events
+ORDER BY app_id, timestamp DESC, id DESC
+ON CONFLICT (app_id) DO NOTHING;
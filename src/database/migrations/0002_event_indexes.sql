@@ -0,0 +1,25 @@
+-- migrate: no-transaction
+-- Indexes for the hot event queries, built without blocking writes.
+-- A failed CONCURRENTLY build leaves an INVALID index behind; migrate.py drops and
+-- rebuilds it, and fails the migration if an index ends up invalid.
+
+-- get_by_app_id / get_latest_by_app_id: newest-first listing per app
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_app_id_timestamp_id_idx
+    ON events (app_id, timestamp DESC, id DESC);
+
+-- Proof of integrity: chain walk in append order, hashes served from the index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_app_id_id_idx
+    ON events (app_id, id) INCLUDE (event_hash, prev_event_hash);
+
+-- Lookups by hash across apps
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_event_hash_idx
+    ON events (event_hash);
+
+-- Per-app filtering by event type
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_app_id_type_idx
+    ON events (app_id, type);
+
+-- Duplicate detection relied on by EventDAO (UniqueViolation -> 409).
+-- Fails if the table already holds duplicate (app_id, event_hash) pairs.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS events_app_id_event_hash_key
+    ON events (app_id, event_hash);
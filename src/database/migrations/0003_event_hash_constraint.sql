@@ -0,0 +1,13 @@
+-- Promote the unique index from 0002 to a table constraint (metadata-only change).
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'events_app_id_event_hash_key'
+    ) THEN
+        ALTER TABLE events
+            ADD CONSTRAINT events_app_id_event_hash_key
+            UNIQUE USING INDEX events_app_id_event_hash_key;
+    END IF;
+END
+$$;
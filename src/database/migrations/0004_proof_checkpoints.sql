@@ -0,0 +1,10 @@
+-- Last verified position of each app's chain, so proofs only re-check the delta.
+
+CREATE TABLE IF NOT EXISTS proof_checkpoints (
+    app_id INT PRIMARY KEY REFERENCES apps(id),
+    event_id INT NOT NULL,
+    event_hash VARCHAR(128) NOT NULL,
+    verified_count BIGINT NOT NULL,
+    signature VARCHAR(128) NOT NULL,
+    verified_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,20 @@
+-- Incremental Merkle tree per app, maintained by the chain-append transaction.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS leaf_index BIGINT;
+
+ALTER TABLE chain_heads
+    ADD COLUMN IF NOT EXISTS tree_size BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS merkle_frontier VARCHAR(64)[] NOT NULL DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS merkle_ready BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Apps with no events yet start with an empty, up-to-date tree. Apps that already
+-- have events are caught up by src/database/scripts/backfill_merkle.py.
+UPDATE chain_heads SET merkle_ready = TRUE WHERE event_id IS NULL AND tree_size = 0;
+
+CREATE TABLE IF NOT EXISTS merkle_nodes (
+    app_id INT NOT NULL REFERENCES apps(id),
+    level SMALLINT NOT NULL,
+    node_index BIGINT NOT NULL,
+    hash VARCHAR(64) NOT NULL,
+    PRIMARY KEY (app_id, level, node_index)
+);
@@ -0,0 +1,9 @@
+-- Highest write-ahead-log sequence applied to the events table, per local WAL.
+-- Advanced in the same transaction as the events it covers, so replay never
+-- re-appends an event after a crash.
+
+CREATE TABLE IF NOT EXISTS wal_offsets (
+    wal_id VARCHAR(64) PRIMARY KEY,
+    applied_sequence BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,15 @@
+-- Independent chains (streams) per app. Every existing event, chain head, Merkle
+-- node and checkpoint belongs to its app's 'default' stream. Adding a column with a
+-- constant default is metadata-only; chain_heads and proof_checkpoints hold one row
+-- per app, so re-keying them is cheap. merkle_nodes is re-keyed in 0008/0009.
+
+ALTER TABLE events ADD COLUMN IF NOT EXISTS stream VARCHAR(64) NOT NULL DEFAULT 'default';
+ALTER TABLE chain_heads ADD COLUMN IF NOT EXISTS stream VARCHAR(64) NOT NULL DEFAULT 'default';
+ALTER TABLE merkle_nodes ADD COLUMN IF NOT EXISTS stream VARCHAR(64) NOT NULL DEFAULT 'default';
+ALTER TABLE proof_checkpoints ADD COLUMN IF NOT EXISTS stream VARCHAR(64) NOT NULL DEFAULT 'default';
+
+ALTER TABLE chain_heads DROP CONSTRAINT IF EXISTS chain_heads_pkey;
+ALTER TABLE chain_heads ADD PRIMARY KEY (app_id, stream);
+
+ALTER TABLE proof_checkpoints DROP CONSTRAINT IF EXISTS proof_checkpoints_pkey;
+ALTER TABLE proof_checkpoints ADD PRIMARY KEY (app_id, stream);
@@ -0,0 +1,12 @@
+-- migrate: no-transaction
+-- Per-stream indexes, built without blocking writes.
+-- A failed CONCURRENTLY build leaves an INVALID index behind; migrate.py drops and
+-- rebuilds it, and fails the migration if an index ends up invalid.
+
+-- Proof of integrity: per-stream chain walk in append order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_app_id_stream_id_idx
+    ON events (app_id, stream, id) INCLUDE (event_hash, prev_event_hash);
+
+-- Future primary key of merkle_nodes, promoted in 0009
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS merkle_nodes_stream_pkey
+    ON merkle_nodes (app_id, stream, level, node_index);
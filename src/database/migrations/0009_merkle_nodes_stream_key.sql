@@ -0,0 +1,14 @@
+-- Re-key merkle_nodes by stream using the index built in 0008 (metadata-only change).
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'merkle_nodes_stream_pkey'
+    ) THEN
+        ALTER TABLE merkle_nodes DROP CONSTRAINT IF EXISTS merkle_nodes_pkey;
+        ALTER TABLE merkle_nodes
+            ADD CONSTRAINT merkle_nodes_stream_pkey
+            PRIMARY KEY USING INDEX merkle_nodes_stream_pkey;
+    END IF;
+END
+$$;
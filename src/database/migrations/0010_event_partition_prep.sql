@@ -0,0 +1,68 @@
+-- migrate: no-transaction
+-- Prepares the current events table for 0011, which makes it the first partition of
+-- a range-partitioned events table. The slow work happens here without blocking
+-- writes, so 0011 only changes the catalog while it holds its locks.
+
+-- Unique (id, timestamp) index, built without blocking writes. 0011 turns it into the
+-- table's primary key, which a range-partitioned events table must have (it has to
+-- include the partition key).
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS events_id_timestamp_key
+    ON events (id, timestamp);
+
+-- Unique indexes on a partitioned table must include the partition key, so duplicate
+-- detection (UniqueViolation -> 409) moves to its own table, written by the append.
+CREATE TABLE IF NOT EXISTS event_dedup (
+    app_id INT NOT NULL,
+    event_hash VARCHAR(128) NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (app_id, event_hash)
+);
+-- Retention removes the entries of expired partitions by time range
+CREATE INDEX IF NOT EXISTS event_dedup_timestamp_idx ON event_dedup (timestamp);
+
+-- Until 0011 drops it, a trigger records the events logged meanwhile, while the
+-- batches below copy the existing ones. Creating it waits for inserts in flight, so
+-- every event is either visible to the backfill or recorded by the trigger.
+CREATE OR REPLACE FUNCTION event_dedup_record() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO event_dedup (app_id, event_hash, timestamp)
+    VALUES (NEW.app_id, NEW.event_hash, NEW.timestamp)
+    ON CONFLICT (app_id, event_hash) DO NOTHING;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS event_dedup_record ON events;
+CREATE TRIGGER event_dedup_record
+    AFTER INSERT ON events
+    FOR EACH ROW EXECUTE FUNCTION event_dedup_record();
+
+-- Backfill in batches of 50000 ids, each committed on its own
+-- migrate: gexec
+SELECT format(
+    'INSERT INTO event_dedup (app_id, event_hash, timestamp) '
+    'SELECT app_id, event_hash, timestamp FROM events WHERE id >= %s AND id < %s '
+    'ON CONFLICT (app_id, event_hash) DO NOTHING',
+    batch_start, batch_start + 50000
+)
+FROM generate_series(0, (SELECT coalesce(max(id), 0) FROM events), 50000) AS batch_start;
+
+-- The bound of the events_legacy partition: the end of the month after the current
+-- UTC month (or after the newest event's), so events logged before 0011 runs still
+-- fall below it. Validating the constraint scans the table without blocking writes, and lets the
+-- ATTACH PARTITION in 0011 skip its own scan.
+-- migrate: gexec
+SELECT format(
+    'ALTER TABLE events ADD CONSTRAINT events_legacy_bound CHECK (timestamp < %L) NOT VALID',
+    to_char(
+        date_trunc('month', greatest(now() AT TIME ZONE 'UTC', max(timestamp) AT TIME ZONE 'UTC')) + INTERVAL '2 months',
+        'YYYY-MM-DD HH24:MI:SS'
+    ) || '+00'
+)
+FROM events
+HAVING NOT EXISTS (
+    SELECT 1 FROM pg_constraint
+    WHERE conrelid = 'events'::regclass AND conname = 'events_legacy_bound'
+);
+
+ALTER TABLE events VALIDATE CONSTRAINT events_legacy_bound;
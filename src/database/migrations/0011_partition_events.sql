@@ -0,0 +1,97 @@
+-- Range-partition events by month of `timestamp`.
+--
+-- The existing table becomes the first partition, events_legacy, covering everything
+-- before the bound chosen by 0010, so no rows are copied. 0010 already backfilled
+-- event_dedup and validated a CHECK constraint matching the bound, so attaching the
+-- partition skips its scan and this migration only changes the catalog. New monthly
+-- partitions (events_pYYYYMM, UTC months) are created ahead of time by
+-- ensure_event_partitions(), and events_default catches anything outside them.
+
+-- From here on the append writes event_dedup itself
+DROP TRIGGER IF EXISTS event_dedup_record ON events;
+DROP FUNCTION IF EXISTS event_dedup_record();
+
+ALTER TABLE events RENAME TO events_legacy;
+ALTER INDEX events_app_id_timestamp_id_idx RENAME TO events_legacy_app_id_timestamp_id_idx;
+ALTER INDEX events_app_id_id_idx RENAME TO events_legacy_app_id_id_idx;
+ALTER INDEX events_event_hash_idx RENAME TO events_legacy_event_hash_idx;
+ALTER INDEX events_app_id_type_idx RENAME TO events_legacy_app_id_type_idx;
+ALTER INDEX events_app_id_stream_id_idx RENAME TO events_legacy_app_id_stream_id_idx;
+ALTER TABLE events_legacy DROP CONSTRAINT events_pkey;
+ALTER TABLE events_legacy
+    ADD CONSTRAINT events_legacy_pkey PRIMARY KEY USING INDEX events_id_timestamp_key;
+
+CREATE TABLE events (
+    id INT NOT NULL DEFAULT nextval('events_id_seq'),
+    app_id INT NOT NULL REFERENCES apps(id),
+    type VARCHAR(64) NOT NULL,
+    source VARCHAR(128),
+    event_data JSONB NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    event_hash VARCHAR(128) NOT NULL,
+    prev_event_hash VARCHAR(128),
+    leaf_index BIGINT,
+    stream VARCHAR(64) NOT NULL DEFAULT 'default',
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+ALTER SEQUENCE events_id_seq OWNED BY events.id;
+
+-- Same indexes as before (0002, 0008); events_legacy's copies are attached, not rebuilt
+CREATE INDEX events_app_id_timestamp_id_idx ON events (app_id, timestamp DESC, id DESC);
+CREATE INDEX events_app_id_stream_id_idx ON events (app_id, stream, id) INCLUDE (event_hash, prev_event_hash);
+CREATE INDEX events_event_hash_idx ON events (event_hash);
+CREATE INDEX events_app_id_type_idx ON events (app_id, type);
+
+DO $$
+DECLARE
+    legacy_end TEXT;
+BEGIN
+    SELECT (regexp_match(pg_get_constraintdef(oid), '''([^'']+)'''))[1]
+    INTO legacy_end
+    FROM pg_constraint
+    WHERE conrelid = 'events_legacy'::regclass AND conname = 'events_legacy_bound';
+    IF legacy_end IS NULL THEN
+        RAISE EXCEPTION 'events_legacy_bound not found; migration 0010 must run first';
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE events ATTACH PARTITION events_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        legacy_end
+    );
+END
+$$;
+-- The partition bound enforces it from now on
+ALTER TABLE events_legacy DROP CONSTRAINT events_legacy_bound;
+
+CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT;
+
+-- Creates the monthly partitions that follow the newest existing one, up to
+-- `months_ahead` months past the current UTC month. Safe to call concurrently.
+CREATE OR REPLACE FUNCTION ensure_event_partitions(months_ahead INT) RETURNS INT AS $$
+DECLARE
+    month_start TIMESTAMP;
+    last_month TIMESTAMP := date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => months_ahead);
+    created INT := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(7305013);
+    SELECT max((regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::timestamptz AT TIME ZONE 'UTC')
+    INTO month_start
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'events'::regclass;
+    month_start := coalesce(month_start, date_trunc('month', now() AT TIME ZONE 'UTC'));
+
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+            'events_p' || to_char(month_start, 'YYYYMM'),
+            to_char(month_start, 'YYYY-MM-DD HH24:MI:SS') || '+00',
+            to_char(month_start + INTERVAL '1 month', 'YYYY-MM-DD HH24:MI:SS') || '+00'
+        );
+        month_start := month_start + INTERVAL '1 month';
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_event_partitions(3);
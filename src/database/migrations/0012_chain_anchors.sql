@@ -0,0 +1,13 @@
+-- Signed position of the last event of each chain removed by retention, so the
+-- remaining chain can still be verified from it.
+
+CREATE TABLE IF NOT EXISTS chain_anchors (
+    app_id INT NOT NULL REFERENCES apps(id),
+    stream VARCHAR(64) NOT NULL,
+    event_id INT NOT NULL,
+    event_hash VARCHAR(128) NOT NULL,
+    event_count BIGINT NOT NULL,
+    signature VARCHAR(128) NOT NULL,
+    anchored_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (app_id, stream)
+);
@@ -0,0 +1,22 @@
+-- Sealed ranges of event chains moved out of the events table into compressed
+-- segment files (src/archive.py). Each row records where a chain range lives and
+-- the hashes it starts from and ends at.
+
+CREATE TABLE IF NOT EXISTS archive_segments (
+    id SERIAL PRIMARY KEY,
+    app_id INT NOT NULL REFERENCES apps(id),
+    stream VARCHAR(64) NOT NULL,
+    first_event_id INT NOT NULL,
+    last_event_id INT NOT NULL,
+    event_count INT NOT NULL,
+    min_timestamp TIMESTAMPTZ NOT NULL,
+    max_timestamp TIMESTAMPTZ NOT NULL,
+    prev_event_hash VARCHAR(128),
+    last_event_hash VARCHAR(128) NOT NULL,
+    path TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (app_id, stream, first_event_id)
+);
+
+CREATE INDEX IF NOT EXISTS archive_segments_app_id_last_event_id_idx
+    ON archive_segments (app_id, last_event_id);
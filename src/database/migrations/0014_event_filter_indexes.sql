@@ -0,0 +1,63 @@
+-- migrate: no-transaction
+-- Indexes behind the server-side filters of GET /api/events (EventFilter).
+--
+-- events is partitioned, and PostgreSQL cannot build an index on a partitioned table
+-- CONCURRENTLY. So each index is created ON ONLY the parent (a catalog change, left
+-- invalid), built CONCURRENTLY on every partition without blocking writes, and the
+-- partition indexes are attached, which makes the parent's valid. New partitions
+-- inherit the indexes. A partition that already has an index attached is skipped, so
+-- the migration can be re-run after a failure.
+
+-- type / source filters, read newest first straight from the index: (app_id, type)
+-- is superseded by the ordered version
+CREATE INDEX IF NOT EXISTS events_app_id_type_timestamp_id_idx
+    ON ONLY events (app_id, type, timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS events_app_id_source_timestamp_id_idx
+    ON ONLY events (app_id, source, timestamp DESC, id DESC);
+
+-- data (@>) and data_path (@@) predicates; combined with the app_id indexes through a
+-- BitmapAnd. jsonb_path_ops is smaller and faster than the default opclass and
+-- supports exactly these two operators.
+CREATE INDEX IF NOT EXISTS events_event_data_path_ops_idx
+    ON ONLY events USING GIN (event_data jsonb_path_ops);
+
+-- migrate: gexec
+SELECT format(
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON %I %s',
+    p.relname || x.suffix, p.relname, x.definition
+)
+FROM (VALUES
+    ('events_app_id_type_timestamp_id_idx', '_app_id_type_timestamp_id_idx', '(app_id, type, timestamp DESC, id DESC)'),
+    ('events_app_id_source_timestamp_id_idx', '_app_id_source_timestamp_id_idx', '(app_id, source, timestamp DESC, id DESC)'),
+    ('events_event_data_path_ops_idx', '_event_data_path_ops_idx', 'USING GIN (event_data jsonb_path_ops)')
+) AS x(parent_index, suffix, definition)
+JOIN pg_inherits pi ON pi.inhparent = 'events'::regclass
+JOIN pg_class p ON p.oid = pi.inhrelid
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM pg_inherits ii
+    JOIN pg_index pix ON pix.indexrelid = ii.inhrelid
+    WHERE ii.inhparent = x.parent_index::regclass AND pix.indrelid = p.oid
+)
+ORDER BY p.relname, x.parent_index;
+
+-- migrate: gexec
+SELECT format('ALTER INDEX %I ATTACH PARTITION %I', x.parent_index, p.relname || x.suffix)
+FROM (VALUES
+    ('events_app_id_type_timestamp_id_idx', '_app_id_type_timestamp_id_idx'),
+    ('events_app_id_source_timestamp_id_idx', '_app_id_source_timestamp_id_idx'),
+    ('events_event_data_path_ops_idx', '_event_data_path_ops_idx')
+) AS x(parent_index, suffix)
+JOIN pg_inherits pi ON pi.inhparent = 'events'::regclass
+JOIN pg_class p ON p.oid = pi.inhrelid
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM pg_inherits ii
+    JOIN pg_index pix ON pix.indexrelid = ii.inhrelid
+    WHERE ii.inhparent = x.parent_index::regclass AND pix.indrelid = p.oid
+)
+ORDER BY p.relname, x.parent_index;
+
+-- Dropping a partitioned index is a catalog change on the parent and its partitions
+DROP INDEX IF EXISTS events_app_id_type_idx;
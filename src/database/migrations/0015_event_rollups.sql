@@ -0,0 +1,23 @@
+-- Per-app event counts by type, source and stream in minute, hour and day buckets
+-- (UTC), maintained by every event insert in the same transaction, so statistics are
+-- read from here instead of scanning events.
+
+CREATE TABLE IF NOT EXISTS event_rollups (
+    app_id INT NOT NULL REFERENCES apps(id),
+    bucket VARCHAR(8) NOT NULL CHECK (bucket IN ('minute', 'hour', 'day')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+    type VARCHAR(64) NOT NULL,
+    -- '' stands for events without a source, since key columns cannot be NULL
+    source VARCHAR(128) NOT NULL,
+    stream VARCHAR(64) NOT NULL,
+    event_count BIGINT NOT NULL,
+    PRIMARY KEY (app_id, bucket, bucket_start, type, source, stream)
+);
+
+-- Counts of the events already in the table; archived events are not included
+INSERT INTO event_rollups (app_id, bucket, bucket_start, type, source, stream, event_count)
+SELECT e.app_id, b.bucket, date_trunc(b.bucket, e.timestamp, 'UTC'), e.type, COALESCE(e.source, ''), e.stream, count(*)
+FROM events e
+CROSS JOIN (VALUES ('minute'), ('hour'), ('day')) AS b(bucket)
+GROUP BY 1, 2, 3, 4, 5, 6
+ON CONFLICT (app_id, bucket, bucket_start, type, source, stream) DO NOTHING;
@@ -0,0 +1,23 @@
+-- Announce committed event inserts on the `events_inserted` channel, for the live tail
+-- (src/live_tail.py). One notification per app stream and insert statement carries the
+-- id range of its rows; appends to a stream hold its chain-head lock, so the range
+-- holds only that statement's events. Notifications are delivered on commit.
+
+CREATE OR REPLACE FUNCTION notify_events_inserted() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'events_inserted',
+        json_build_object('app_id', app_id, 'stream', stream, 'first_id', min(id), 'last_id', max(id))::text
+    )
+    FROM new_events
+    GROUP BY app_id, stream;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS events_notify_inserted ON events;
+CREATE TRIGGER events_notify_inserted
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS new_events
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_events_inserted();
@@ -0,0 +1,17 @@
+-- Responses of ingest requests sent with an Idempotency-Key header, so a client that
+-- retries after a lost response gets the original result instead of appending again
+-- or hitting the duplicate-event check. A key is claimed in the request's transaction,
+-- before its events are appended, and rolls back with them if the request fails.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    app_id INT NOT NULL REFERENCES apps(id),
+    idempotency_key VARCHAR(255) NOT NULL,
+    -- SHA-256 of the request the key was first used for
+    request_hash CHAR(64) NOT NULL,
+    status_code SMALLINT,
+    response JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (app_id, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at);
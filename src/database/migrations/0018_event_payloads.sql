@@ -0,0 +1,33 @@
+-- Content-addressed store for large event payloads. An event whose canonical JSON is at
+-- least EVENT_PAYLOAD_STORE_MIN_BYTES long is appended with event_data NULL, and its
+-- payload is kept once in event_payloads under the event's event_hash, which is the
+-- SHA-256 of that JSON. Events of any app with the same payload share the row. Event
+-- reads take a NULL event_data from here, so existing inline rows are left as they are.
+
+CREATE TABLE IF NOT EXISTS event_payloads (
+    payload_hash VARCHAR(128) PRIMARY KEY,
+    event_data JSONB NOT NULL,
+    -- Length of the canonical JSON, in bytes
+    size INT NOT NULL,
+    -- Refreshed (at most daily) by appends that reference the payload, which guards
+    -- it against garbage collection
+    referenced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Compress payloads from about 256 bytes of row instead of the default 2 KB, with lz4,
+-- which is several times faster than pglz, where the server was built with it
+ALTER TABLE event_payloads SET (toast_tuple_target = 256);
+DO $$
+BEGIN
+    ALTER TABLE event_payloads ALTER COLUMN event_data SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported OR invalid_parameter_value THEN
+    RAISE NOTICE 'lz4 is not available, event payloads are compressed with pglz';
+END
+$$;
+
+-- data (@>) and data_path (@@) filters on stored payloads, see EventFilter
+CREATE INDEX IF NOT EXISTS event_payloads_event_data_path_ops_idx
+    ON event_payloads USING GIN (event_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS event_payloads_referenced_at_idx ON event_payloads (referenced_at);
+
+ALTER TABLE events ALTER COLUMN event_data DROP NOT NULL;
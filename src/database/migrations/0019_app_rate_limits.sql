@@ -0,0 +1,21 @@
+-- Per-app admission control on the ingest routes (src/rate_limit.py). NULL takes the
+-- worker-wide default (APP_RATE_LIMIT, APP_RATE_BURST, APP_MAX_CONCURRENCY). 0 lifts
+-- a rate_limit or max_concurrency for the app, and a rate_burst of 0 is one second's
+-- worth of its rate_limit.
+
+ALTER TABLE apps
+    -- Sustained ingest rate, in events per second
+    ADD COLUMN IF NOT EXISTS rate_limit DOUBLE PRECISION CHECK (rate_limit >= 0),
+    -- Events that may be sent at once after an idle period (the bucket size)
+    ADD COLUMN IF NOT EXISTS rate_burst INT CHECK (rate_burst >= 0),
+    -- Ingest requests of the app in flight at once, per API worker
+    ADD COLUMN IF NOT EXISTS max_concurrency INT CHECK (max_concurrency >= 0);
+
+-- Token buckets shared by all API workers with RATE_LIMIT_SHARED=true. Workers lease
+-- tokens from here in small chunks, so it is written a few times per second per app
+-- at most.
+CREATE TABLE IF NOT EXISTS app_rate_buckets (
+    app_id INT PRIMARY KEY REFERENCES apps(id) ON DELETE CASCADE,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
@@ -0,0 +1,19 @@
+-- WAL events the background writer could not append (e.g. duplicates of stored
+-- events). They were acknowledged with 202 already, so they are kept here for
+-- inspection instead of being discarded. Written in the same transaction as the
+-- wal_offsets advance that skips them.
+
+CREATE TABLE IF NOT EXISTS ingest_dead_letters (
+    id BIGSERIAL PRIMARY KEY,
+    wal_id VARCHAR(64) NOT NULL,
+    sequence BIGINT NOT NULL,
+    app_id INT NOT NULL,
+    stream VARCHAR(64) NOT NULL,
+    event_hash VARCHAR(128) NOT NULL,
+    record JSONB NOT NULL,
+    error TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (wal_id, sequence)
+);
+CREATE INDEX IF NOT EXISTS ingest_dead_letters_app_id_created_at_idx
+    ON ingest_dead_letters (app_id, created_at);
@@ -0,0 +1,118 @@
+"""
+Read replicas for the EventDAO and AppDAO query methods, shared by the psycopg2 and
+asyncpg connection services.
+
+A replica serves reads while its replication lag is at most REPLICA_MAX_LAG_SECONDS.
+The lag is measured on a connection taken for a read, at most once every
+REPLICA_HEALTH_CHECK_INTERVAL seconds per replica. A replica that cannot be reached,
+or lags too far behind, is skipped until its next check, and reads fall back to the
+next replica, then to the primary.
+"""
+import itertools
+import os
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+
+# Seconds since the last replayed transaction, or 0 when everything received is replayed
+# (an idle primary sends nothing to replay). A server that is not a standby has no lag.
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END::float8;
+"""
+
+
+class Replica:
+    """A read replica's DSN and last known health; thread safe."""
+
+    def __init__(self, index: int, dsn: str):
+        self.index = index
+        self.dsn = dsn
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+        self.reads = 0
+        self._lock = threading.Lock()
+
+    def is_usable(self) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+    def start_check(self) -> bool:
+        """Whether a health check is due; only the first caller to ask gets True."""
+        now = time.monotonic()
+        with self._lock:
+            if self.checked_at is not None and now - self.checked_at < REPLICA_HEALTH_CHECK_INTERVAL:
+                return False
+            self.checked_at = now
+            return True
+
+    def check_due(self) -> bool:
+        return self.checked_at is None or time.monotonic() - self.checked_at >= REPLICA_HEALTH_CHECK_INTERVAL
+
+    def record_lag(self, lag: Optional[float]) -> None:
+        was_usable = self.is_usable()
+        with self._lock:
+            self.lag = lag
+            self.healthy = True
+            self.last_error = None
+        if was_usable and not self.is_usable():
+            logger.warning("Replica %s lags %s seconds behind; reading from the primary", self.index, lag)
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.healthy = False
+            self.failures += 1
+            self.last_error = str(error)
+            self.checked_at = time.monotonic()
+        logger.warning("Replica %s unavailable; reading from the primary: %s", self.index, error)
+
+    def stats(self) -> dict:
+        parts = urlsplit(self.dsn)
+        return {
+            "index": self.index,
+            "host": parts.hostname,
+            "port": parts.port,
+            "usable": self.is_usable(),
+            "lag_seconds": self.lag,
+            "failures": self.failures,
+            "reads": self.reads,
+            "last_error": self.last_error
+        }
+
+
+replicas: List[Replica] = [Replica(index, dsn) for index, dsn in enumerate(DB_REPLICA_URLS)]
+_rotation = itertools.count()
+
+
+def replica_rotation() -> List[Replica]:
+    """The replicas worth trying for a read, starting from the next one in turn."""
+    if not replicas:
+        return []
+    start = next(_rotation) % len(replicas)
+    ordered = replicas[start:] + replicas[:start]
+    return [replica for replica in ordered if replica.is_usable() or replica.check_due()]
+
+
+def replica_stats() -> dict:
+    return {
+        "configured": len(replicas),
+        "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+        "replicas": [replica.stats() for replica in replicas]
+    }
@@ -0,0 +1,26 @@
+"""
+Applies the event retention policy: every monthly events partition older than
+EVENT_RETENTION_MONTHS is anchored and then detached (or dropped, with
+EVENT_RETENTION_ACTION=drop or --drop), and minute event counters older than
+EVENT_ROLLUP_MINUTE_RETENTION_DAYS, idempotency keys older than IDEMPOTENCY_KEY_TTL
+seconds and stored event payloads that no event references any more are deleted.
+Run from the repository root, e.g. daily:
+
+    python -m src.database.scripts.apply_retention [--drop]
+"""
+import sys
+
+from src.idempotency import prune_idempotency_keys
+from src.partitions import EVENT_RETENTION_ACTION, EVENT_RETENTION_MONTHS, apply_retention, prune_payloads, prune_rollups
+
+
+if __name__ == "__main__":
+    anchors = apply_retention(EVENT_RETENTION_MONTHS, drop="--drop" in sys.argv[1:] or EVENT_RETENTION_ACTION == "drop")
+    pruned = prune_rollups()
+    expired_keys = prune_idempotency_keys()
+    payloads = prune_payloads()
+    print(
+        f"Event retention done, {len(anchors)} chain anchors written, {pruned} minute counters pruned, "
+        f"{expired_keys} idempotency keys pruned, {payloads} event payloads pruned",
+        flush=True
+    )
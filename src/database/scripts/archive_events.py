@@ -0,0 +1,21 @@
+"""
+Moves events older than EVENT_ARCHIVE_AFTER_DAYS days out of the events table into
+compressed archive segment files under EVENT_ARCHIVE_DIR. Run from the repository
+root on a schedule, e.g. nightly:
+
+    python -m src.database.scripts.archive_events [app_id ...]
+
+Afterwards it deletes the segment files older than EVENT_ARCHIVE_SWEEP_AFTER_SECONDS
+that no archive_segments row references.
+"""
+import sys
+
+from src.archive import EVENT_ARCHIVE_AFTER_DAYS, archive_events, sweep_segment_files
+
+
+if __name__ == "__main__":
+    segments = archive_events(EVENT_ARCHIVE_AFTER_DAYS, [int(arg) for arg in sys.argv[1:]])
+    archived = sum(segment.event_count for segment in segments)
+    print(f"Event archiving done, {archived} events sealed into {len(segments)} segments", flush=True)
+    removed = sweep_segment_files()
+    print(f"Removed {len(removed)} unreferenced segment files", flush=True)
@@ -0,0 +1,21 @@
+"""
+Builds the Merkle trees of app streams whose events predate them (migration 0005).
+Run from the repository root: python -m src.database.scripts.backfill_merkle
+"""
+from src.database.db_access_objects.merkle_dao import MerkleDAO
+
+CHUNK_SIZE = 10000
+
+
+def backfill_merkle():
+    merkle_dao = MerkleDAO()
+    for app_id, stream in merkle_dao.get_unready_chains():
+        after_id, ready = None, False
+        while not ready:
+            after_id, ready = merkle_dao.backfill_chunk(app_id, stream, after_id=after_id, chunk_size=CHUNK_SIZE)
+        print(f"Merkle tree ready for app_id={app_id}, stream={stream}", flush=True)
+    print("Merkle backfill done", flush=True)
+
+
+if __name__ == "__main__":
+    backfill_merkle()
@@ -0,0 +1,52 @@
+"""
+Prints the PostgreSQL plans of typical filtered event queries, exactly as
+GET /api/events issues them, to check that they use the filter indexes (migration
+0014) and prune time partitions. Run from the repository root:
+
+    python -m src.database.scripts.explain_event_queries <app_id> [type] [data_json]
+
+The queries are executed (EXPLAIN ANALYZE) inside a transaction that is rolled back.
+"""
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from src.database.db_service import get_pool
+from src.database.db_access_objects.event_dao import build_page_query
+from src.database.db_access_objects.event_filter import EventFilter
+
+
+def typical_filters(event_type: str, data: dict) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "type": EventFilter(type=event_type),
+        "type, last 24h": EventFilter(type=event_type, since=now - timedelta(days=1)),
+        "data containment": EventFilter(data_contains=data),
+        "data containment, last 7 days": EventFilter(data_contains=data, since=now - timedelta(days=7)),
+        "data path": EventFilter(data_path=f"exists($.{next(iter(data), 'id')})")
+    }
+
+
+def explain_event_queries(app_id: int, event_type: str, data: dict, limit: int = 100) -> None:
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        with conn.cursor() as cur:
+            for name, event_filter in typical_filters(event_type, data).items():
+                select_sql, params = build_page_query(app_id, limit, event_filter=event_filter)
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + select_sql, params)
+                print(f"-- {name}: {event_filter}")
+                print("\n".join(row[0] for row in cur.fetchall()), end="\n\n", flush=True)
+    finally:
+        conn.rollback()
+        pool.release(conn)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    explain_event_queries(
+        int(sys.argv[1]),
+        sys.argv[2] if len(sys.argv) > 2 else "user_login",
+        json.loads(sys.argv[3]) if len(sys.argv) > 3 else {"user": "alice"}
+    )
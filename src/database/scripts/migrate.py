@@ -0,0 +1,175 @@
+import os
+import re
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.getenv("DATABASE_URL")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "migrations")
+
+# Serialises concurrent runners (e.g. several containers starting at once)
+MIGRATION_LOCK_ID = 7_305_001
+
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# In a no-transaction migration, a statement preceded by this line is a query whose
+# result cells are statements, each run in turn (like psql's \gexec). That covers
+# per-partition work such as CREATE INDEX CONCURRENTLY on every events partition.
+GEXEC_MARKER = "-- migrate: gexec"
+
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\S+)\s+ON\b",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# An index created ON ONLY a partitioned table stays invalid until an index of every
+# partition is attached to it
+PARENT_INDEX_PATTERN = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\S+)\s+ON\s+ONLY\b",
+    re.IGNORECASE | re.MULTILINE
+)
+
+INDEX_VALID_SQL = """
+SELECT i.indisvalid
+FROM pg_index i
+WHERE i.indexrelid = to_regclass(%s);
+"""
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+
+def load_migrations():
+    """Return (version, name, sql) for every migration file, ordered by version."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers found.")
+    return migrations
+
+
+def split_statements(sql: str):
+    """Split a migration into top-level statements (one per trailing ';' outside a $$ body)."""
+    statements, current = [], []
+    in_dollar_quote = False
+    for line in sql.splitlines():
+        current.append(line)
+        if line.count("$$") % 2:
+            in_dollar_quote = not in_dollar_quote
+        if not in_dollar_quote and line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip()
+            if any(l.strip() and not l.strip().startswith("--") for l in current):
+                statements.append(statement)
+            current = []
+    return statements
+
+
+def index_is_valid(cur, index_name: str):
+    """True or False for an existing index, None if there is no such index."""
+    cur.execute(INDEX_VALID_SQL, (index_name,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def execute_concurrently(cur, statement: str) -> None:
+    """
+    Run a statement in autocommit mode. A failed CREATE INDEX CONCURRENTLY leaves an
+    INVALID index that IF NOT EXISTS would then skip, and that the planner never
+    uses. So a leftover one is dropped and rebuilt, a build that fails is cleaned
+    up, and an index that ends up invalid fails the migration.
+    """
+    match = CONCURRENT_INDEX_PATTERN.search(statement)
+    if match is None:
+        cur.execute(statement)
+        return
+    index_name = match.group(1)
+    if index_is_valid(cur, index_name) is False:
+        print(f"Dropping invalid index {index_name} left by an earlier build", flush=True)
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name};")
+    try:
+        cur.execute(statement)
+    except psycopg2.Error:
+        if index_is_valid(cur, index_name) is False:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name};")
+        raise
+    if index_is_valid(cur, index_name) is False:
+        raise RuntimeError(f"Index {index_name} is invalid after CREATE INDEX CONCURRENTLY.")
+
+
+def apply_migration(conn, version: int, name: str, sql: str) -> None:
+    record_sql = "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);"
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so each
+        # statement is sent on its own in autocommit mode.
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                parent_indexes = []
+                for statement in split_statements(sql):
+                    if any(line.strip() == GEXEC_MARKER for line in statement.splitlines()):
+                        cur.execute(statement)
+                        generated = [cell for row in cur.fetchall() for cell in row if cell]
+                        for generated_statement in generated:
+                            execute_concurrently(cur, generated_statement)
+                        continue
+                    execute_concurrently(cur, statement)
+                    parent_indexes += PARENT_INDEX_PATTERN.findall(statement)
+                for index_name in parent_indexes:
+                    if index_is_valid(cur, index_name) is False:
+                        raise RuntimeError(f"Index {index_name} is invalid: not every partition has its index attached.")
+                cur.execute(record_sql, (version, name))
+        finally:
+            conn.autocommit = False
+    else:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute(record_sql, (version, name))
+        conn.commit()
+
+
+def migrate(target: int = None):
+    conn = psycopg2.connect(DB_URL)
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+    try:
+        cur.execute(CREATE_VERSION_TABLE)
+        conn.commit()
+        cur.execute("SELECT version FROM schema_migrations;")
+        applied = {row[0] for row in cur.fetchall()}
+        conn.commit()
+
+        for version, name, sql in load_migrations():
+            if version in applied or (target is not None and version > target):
+                continue
+            print(f"Applying migration {version:04d}_{name}", flush=True)
+            try:
+                apply_migration(conn, version, name, sql)
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        conn.commit()
+        cur.close()
+        conn.close()
+    print("DB migrations done", flush=True)
+
+
+if __name__ == "__main__":
+    migrate(int(sys.argv[1]) if len(sys.argv) > 1 else None)
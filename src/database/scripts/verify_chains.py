@@ -0,0 +1,46 @@
+"""
+Compliance job: fully re-verifies event chains, recomputing every content hash.
+Run from the repository root:
+
+    python -m src.database.scripts.verify_chains [app_id ...]
+
+Every stream of each app is verified. Progress is written to stderr and one JSON
+report per stream to stdout. Exits with status 1 if any chain is broken.
+"""
+import json
+import sys
+from dataclasses import asdict
+
+from src.database.db_access_objects.app_dao import AppDAO
+from src.database.db_access_objects.merkle_dao import MerkleDAO
+from src.verification import ChainVerifier, VerificationResult
+
+
+def print_progress(result: VerificationResult) -> None:
+    print(
+        f"app_id={result.app_id} stream={result.stream} checked={result.checked_count} "
+        f"breaks={len(result.breaks)} rate={result.events_per_second:.0f} events/s",
+        file=sys.stderr,
+        flush=True
+    )
+
+
+def verify_chains(app_ids=None) -> bool:
+    if not app_ids:
+        app_ids = [app.id for app in AppDAO().get_all()]
+    merkle_dao = MerkleDAO()
+    verifier = ChainVerifier(on_progress=print_progress)
+    all_valid = True
+    for app_id in app_ids:
+        for head in merkle_dao.get_heads(app_id):
+            result = verifier.verify(app_id, head.stream)
+            all_valid = all_valid and result.valid
+            report = result.summary()
+            report["breaks"] = [asdict(chain_break) for chain_break in result.breaks]
+            print(json.dumps(report), flush=True)
+    return all_valid
+
+
+if __name__ == "__main__":
+    valid = verify_chains([int(arg) for arg in sys.argv[1:]])
+    sys.exit(0 if valid else 1)
@@ -0,0 +1,132 @@
+import hashlib
+import itertools
+import json
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+# json.dumps(data, sort_keys=True) builds a new encoder on every call; this is the same
+# encoder, built once
+_canonical_encoder = json.JSONEncoder(sort_keys=True)
+
+# Zeros in one event's data up to which every -0.0 combination is tried on a mismatch
+LEGACY_NEGATIVE_ZERO_LIMIT = 10
+
+
+def _jsonb_number(value: float) -> Any:
+    """A float as PostgreSQL's jsonb gives it back: numeric has no exponent form and no -0."""
+    if value == 0:
+        return 0.0
+    text = repr(value)
+    if "e+" in text:
+        # 1e+16 is stored as the numeric 10000000000000000 and read back as an int
+        return int(Decimal(text))
+    return value
+
+
+def jsonb_normalized(data: Any) -> Any:
+    """`data` with every float replaced by the value it reads back as from a jsonb column."""
+    if isinstance(data, float):
+        return _jsonb_number(data)
+    if isinstance(data, dict):
+        return {key: jsonb_normalized(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [jsonb_normalized(value) for value in data]
+    return data
+
+
+def canonical_json(data: Dict[str, Any]) -> str:
+    """
+    The canonical (sorted-key) JSON encoding of an event's data that its hash is taken
+    over. Ingest computes it once and stores the same text, see hash_canonical_json.
+    Floats are encoded as jsonb stores them, so the data read back for verification
+    encodes to the same text.
+    """
+    encoded = _canonical_encoder.encode(data)
+    # Only exponent and negative-zero floats change in jsonb; most data has neither
+    if "e+" in encoded or "-0.0" in encoded:
+        encoded = _canonical_encoder.encode(jsonb_normalized(data))
+    return encoded
+
+
+def hash_canonical_json(encoded: str) -> str:
+    """SHA-256 of an encoding produced by canonical_json."""
+    # canonical_json escapes every non-ASCII character
+    return hashlib.sha256(encoded.encode("ascii")).hexdigest()
+
+
+def compute_event_hash(data: Dict[str, Any]) -> str:
+    """
+    SHA-256 of the canonical (sorted-key) JSON encoding of an event's data. Every
+    stored event_hash was produced by this function, so verification must use it too.
+    """
+    return hash_canonical_json(canonical_json(data))
+
+
+def _float_variant(data: Any) -> Any:
+    """`data` with every int that a large float turns into in jsonb turned back into that float."""
+    if isinstance(data, int) and not isinstance(data, bool) and abs(data) >= 10 ** 16:
+        as_float = float(data)
+        if int(Decimal(repr(as_float))) == data:
+            return as_float
+        return data
+    if isinstance(data, dict):
+        return {key: _float_variant(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_float_variant(value) for value in data]
+    return data
+
+
+def _zero_paths(data: Any, path: Tuple = ()) -> List[Tuple]:
+    """The key/index paths of every float zero in `data`."""
+    if isinstance(data, float) and data == 0:
+        return [path]
+    if isinstance(data, dict):
+        return [found for key, value in data.items() for found in _zero_paths(value, path + (key,))]
+    if isinstance(data, list):
+        return [found for index, value in enumerate(data) for found in _zero_paths(value, path + (index,))]
+    return []
+
+
+def _with_negative_zeros(data: Any, paths: Set[Tuple], path: Tuple = ()) -> Any:
+    """`data` with the float zeros at `paths` turned back into -0.0."""
+    if path in paths:
+        return -0.0
+    if isinstance(data, dict):
+        return {key: _with_negative_zeros(value, paths, path + (key,)) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_with_negative_zeros(value, paths, path + (index,)) for index, value in enumerate(data)]
+    return data
+
+
+def _legacy_variants(data: Dict[str, Any]) -> Iterator[Any]:
+    """
+    The forms `data` may have had when it was hashed before floats were normalized:
+    large floats in exponent form, and any of its zeros as -0.0, which jsonb returns
+    as 0.0. Every combination of up to LEGACY_NEGATIVE_ZERO_LIMIT zeros is tried;
+    beyond that, only none or all of them.
+    """
+    zeros = _zero_paths(data)
+    if len(zeros) <= LEGACY_NEGATIVE_ZERO_LIMIT:
+        subsets = itertools.chain.from_iterable(itertools.combinations(zeros, n) for n in range(len(zeros) + 1))
+    else:
+        subsets = [(), tuple(zeros)]
+    for subset in subsets:
+        variant = _with_negative_zeros(data, set(subset)) if subset else data
+        if subset:
+            yield variant
+        yield _float_variant(variant)
+
+
+def matches_event_hash(data: Dict[str, Any], event_hash: str) -> bool:
+    """
+    Whether event data read back from the database hashes to `event_hash`. Events
+    ingested before floats were normalized were hashed with large floats in exponent
+    form, e.g. 1e+16, and with -0.0, which jsonb returns as ints and 0.0, so those
+    forms are tried as well.
+    """
+    if compute_event_hash(data) == event_hash:
+        return True
+    return any(
+        hash_canonical_json(_canonical_encoder.encode(variant)) == event_hash
+        for variant in _legacy_variants(data)
+    )
@@ -0,0 +1,38 @@
+"""
+Idempotency-Key support for the ingest routes. A client that sends the same key again,
+e.g. when retrying after a timeout, gets the stored response of the first request
+instead of appending its events twice or being told they are duplicates. Keys are per
+app and are kept for IDEMPOTENCY_KEY_TTL seconds; reusing a key for a different
+request is an error.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from dotenv import load_dotenv
+
+from src.database.db_access_objects.event_record import EventRecord
+from src.database.db_access_objects.idempotency_key_dao import IdempotencyKeyDAO
+
+load_dotenv()
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def request_fingerprint(route: str, events: Iterable[EventRecord]) -> str:
+    """SHA-256 identifying an ingest request by its route and events, which a reused key must match."""
+    request = [route, [[event.stream, event.type, event.source, event.event_hash] for event in events]]
+    return hashlib.sha256(json.dumps(request, separators=(",", ":")).encode()).hexdigest()
+
+
+def idempotency_cutoff() -> datetime:
+    """Keys first used before this instant have expired."""
+    return datetime.now(timezone.utc) - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+
+
+def prune_idempotency_keys() -> int:
+    """Delete expired idempotency keys; returns how many were deleted."""
+    return IdempotencyKeyDAO().prune(idempotency_cutoff())
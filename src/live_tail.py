@@ -0,0 +1,331 @@
+"""
+Live tail of newly logged events, pushed to clients as server-sent events.
+
+Each worker holds one dedicated LISTEN connection on the `events_inserted` channel
+(migration 0016), opened when its first client subscribes. A notification names an
+app stream and the id range of a committed insert. If anyone in this worker watches
+that app, the range is read once, encoded once and fanned out to every matching
+subscriber's bounded buffer. A subscriber that falls a buffer behind is cut off, so a
+slow client never holds up the others. It is told where to resume, and replays what it
+missed from the table when it reconnects with Last-Event-ID.
+
+Event ids are assigned in commit order within a stream but not across an app's
+streams, so the resume position is a TailCursor: the last id delivered per stream.
+"""
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+import asyncpg
+from dotenv import load_dotenv
+
+from src.database.db_service import DB_URL
+from src.database.db_access_objects.async_event_dao import AsyncEventDAO
+from src.database.db_access_objects.event_filter import EventFilter
+from src.logger import get_logger
+from src.serialization import encode_json
+
+logger = get_logger(__name__)
+
+load_dotenv()
+LIVE_TAIL_BUFFER = int(os.getenv("LIVE_TAIL_BUFFER", "1000"))
+LIVE_TAIL_MAX_SUBSCRIBERS = int(os.getenv("LIVE_TAIL_MAX_SUBSCRIBERS", "10000"))
+LIVE_TAIL_MAX_REPLAY = int(os.getenv("LIVE_TAIL_MAX_REPLAY", "10000"))
+LIVE_TAIL_HEARTBEAT = float(os.getenv("LIVE_TAIL_HEARTBEAT", "15"))
+LIVE_TAIL_RETRY_MS = int(os.getenv("LIVE_TAIL_RETRY_MS", "1000"))
+
+NOTIFY_CHANNEL = "events_inserted"
+
+event_dao = AsyncEventDAO()
+
+
+class TailCapacityError(Exception):
+    """Raised when a worker already serves LIVE_TAIL_MAX_SUBSCRIBERS live tails."""
+
+
+class TailCursor:
+    """
+    Position of a live tail: the last event id delivered in each stream, and the id
+    after which streams not listed resume. As an SSE id it reads `auth=100,default=101`,
+    with `*=<id>` for a default other than 0; a plain event id sets only the default.
+    """
+
+    def __init__(self, positions: Optional[Dict[str, int]] = None, default: int = 0):
+        self.positions = dict(positions or {})
+        self.default = default
+
+    @classmethod
+    def parse(cls, value: str) -> "TailCursor":
+        """Raises ValueError for anything that is not a cursor."""
+        value = value.strip()
+        if value.isdigit():
+            return cls(default=int(value))
+        cursor = cls()
+        for part in value.split(","):
+            stream, _, event_id = part.partition("=")
+            if not stream or not event_id.isdigit():
+                raise ValueError(f"Invalid cursor part {part!r}.")
+            if stream == "*":
+                cursor.default = int(event_id)
+            else:
+                cursor.positions[stream] = int(event_id)
+        return cursor
+
+    def after(self, stream: str) -> int:
+        return self.positions.get(stream, self.default)
+
+    def advance(self, stream: str, event_id: int) -> None:
+        self.positions[stream] = event_id
+
+    def encode(self) -> str:
+        parts = [f"{stream}={event_id}" for stream, event_id in sorted(self.positions.items())]
+        if self.default:
+            parts.append(f"*={self.default}")
+        return ",".join(parts)
+
+
+class Subscription:
+    """One client's feed of an app's new events, as (event id, stream, JSON), buffered up to `buffer_size`."""
+
+    def __init__(self, app_id: int, event_filter: EventFilter, buffer_size: int):
+        self.app_id = app_id
+        self.event_filter = event_filter
+        self.closed_reason: Optional[str] = None
+        self._queue: asyncio.Queue = asyncio.Queue(buffer_size)
+
+    def offer(self, event_id: int, stream: str, data: bytes) -> bool:
+        """Buffer an event; a full buffer closes the subscription. Returns whether it was buffered."""
+        if self.closed_reason is not None:
+            return False
+        try:
+            self._queue.put_nowait((event_id, stream, data))
+            return True
+        except asyncio.QueueFull:
+            self.close("overflow")
+            return False
+
+    def close(self, reason: str) -> None:
+        """Stop accepting events; the reader still gets what is buffered, then the reason."""
+        if self.closed_reason is None:
+            self.closed_reason = reason
+            if self._queue.empty():
+                # Wake a reader waiting on the empty buffer
+                self._queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> Optional[Tuple[int, str, bytes]]:
+        """
+        The next buffered event, or None after `timeout` seconds without one or once the
+        subscription is closed and drained (check `closed_reason`).
+        """
+        if self.closed_reason is not None and self._queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventTailHub:
+    """The worker's LISTEN connection and the live-tail subscribers it feeds, by app."""
+
+    def __init__(self, dsn: str = DB_URL, buffer_size: int = LIVE_TAIL_BUFFER, max_subscribers: int = LIVE_TAIL_MAX_SUBSCRIBERS):
+        self.dsn = dsn
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._subscriber_count = 0
+        self._connection: Optional[asyncpg.Connection] = None
+        self._connect_lock = asyncio.Lock()
+        # Latest delivery per app stream; each one waits for the one before it
+        self._deliveries: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.notifications = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.connection_losses = 0
+
+    async def subscribe(self, app_id: int, event_filter: EventFilter) -> Subscription:
+        if self._subscriber_count >= self.max_subscribers:
+            raise TailCapacityError(f"This worker already serves {self.max_subscribers} live tails.")
+        await self._ensure_listening()
+        subscription = Subscription(app_id, event_filter, self.buffer_size)
+        self._subscribers.setdefault(app_id, set()).add(subscription)
+        self._subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.app_id)
+        if subscriptions is not None and subscription in subscriptions:
+            subscriptions.discard(subscription)
+            self._subscriber_count -= 1
+            if not subscriptions:
+                del self._subscribers[subscription.app_id]
+        subscription.close("closed")
+
+    async def release(self, subscription: Subscription) -> None:
+        """unsubscribe, awaitable as a response background task, which also runs when a client disconnects before its stream starts."""
+        self.unsubscribe(subscription)
+
+    async def _ensure_listening(self) -> None:
+        if self._connection is not None:
+            return
+        async with self._connect_lock:
+            if self._connection is not None:
+                return
+            connection = await asyncpg.connect(self.dsn)
+            try:
+                connection.add_termination_listener(self._on_connection_lost)
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notification)
+            except BaseException:
+                await connection.close()
+                raise
+            self._connection = connection
+            logger.info("Live tail listening on channel %s", NOTIFY_CHANNEL)
+
+    def _on_connection_lost(self, connection: asyncpg.Connection) -> None:
+        if connection is not self._connection:
+            return
+        self._connection = None
+        self.connection_losses += 1
+        logger.warning("Live tail LISTEN connection lost; %s subscribers will resume", self._subscriber_count)
+        # Notifications sent while nobody listened are gone; reconnecting clients replay from their cursors
+        self._close_all("reconnect")
+
+    def _on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        try:
+            notification = json.loads(payload)
+            app_id, stream = notification["app_id"], notification["stream"]
+            first_id, last_id = notification["first_id"], notification["last_id"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed %s notification: %s", NOTIFY_CHANNEL, payload)
+            return
+        if app_id not in self._subscribers:
+            return
+        key = (app_id, stream)
+        task = asyncio.create_task(self._deliver(key, first_id, last_id, self._deliveries.get(key)))
+        self._deliveries[key] = task
+        task.add_done_callback(lambda done: self._deliveries.pop(key) if self._deliveries.get(key) is done else None)
+
+    async def _deliver(self, key: Tuple[int, str], first_id: int, last_id: int, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # Keeps each stream's events in chain order
+            await asyncio.wait([previous])
+        app_id, stream = key
+        if not self._subscribers.get(app_id):
+            return
+        try:
+            events = await event_dao.get_chain_range(app_id, stream, first_id, last_id)
+        except Exception as e:
+            logger.error("Live tail read failed for app_id=%s, stream=%s: %s", app_id, stream, e)
+            for subscription in list(self._subscribers.get(app_id, ())):
+                subscription.close("error")
+            return
+
+        encoded = {}
+        for subscription in list(self._subscribers.get(app_id, ())):
+            for event in events:
+                if not subscription.event_filter.matches(event):
+                    continue
+                if subscription.closed_reason is not None:
+                    break
+                if event.id not in encoded:
+                    encoded[event.id] = encode_json(event)
+                if not subscription.offer(event.id, event.stream, encoded[event.id]):
+                    self.overflows += 1
+                    break
+                self.delivered += 1
+
+    def _close_all(self, reason: str) -> None:
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close(reason)
+
+    async def stop(self) -> None:
+        self._close_all("shutdown")
+        for task in list(self._deliveries.values()):
+            task.cancel()
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._connection is not None,
+            "subscribers": self._subscriber_count,
+            "apps": len(self._subscribers),
+            "notifications": self.notifications,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "connection_losses": self.connection_losses
+        }
+
+
+def _sse(event: str, data: bytes, event_id: Optional[str] = None) -> bytes:
+    message = b"id: %s\n" % event_id.encode() if event_id is not None else b""
+    return message + b"event: %s\ndata: %s\n\n" % (event.encode(), data)
+
+
+async def stream_tail(
+    hub: EventTailHub, subscription: Subscription, cursor: TailCursor
+) -> AsyncIterator[bytes]:
+    """
+    The server-sent event stream of a subscription. Events after `cursor` that are
+    already in the table are replayed first, up to LIVE_TAIL_MAX_REPLAY per connection;
+    when more are left, or the subscription is cut off, a `resume` event is sent and the
+    stream ends, and the client reconnects with Last-Event-ID to continue. Every
+    event's SSE id is the cursor just past it.
+    """
+    try:
+        yield b"retry: %d\n\n" % LIVE_TAIL_RETRY_MS
+        # Also covers events committed between reading the cursor and subscribing
+        events = await event_dao.get_after_id(
+            subscription.app_id, cursor.positions, cursor.default, LIVE_TAIL_MAX_REPLAY + 1, subscription.event_filter
+        )
+        for event in events[:LIVE_TAIL_MAX_REPLAY]:
+            cursor.advance(event.stream, event.id)
+            yield _sse("event", encode_json(event), cursor.encode())
+        if len(events) > LIVE_TAIL_MAX_REPLAY:
+            yield _sse("resume", encode_json({"reason": "replay", "after": cursor.encode()}))
+            return
+
+        while True:
+            item = await subscription.get(LIVE_TAIL_HEARTBEAT)
+            if item is None:
+                if subscription.closed_reason is not None:
+                    yield _sse("resume", encode_json({"reason": subscription.closed_reason, "after": cursor.encode()}))
+                    return
+                # Keeps proxies from timing out an idle stream
+                yield b": keepalive\n\n"
+                continue
+            event_id, stream, data = item
+            if event_id <= cursor.after(stream):
+                # Already replayed
+                continue
+            cursor.advance(stream, event_id)
+            yield _sse("event", data, cursor.encode())
+    finally:
+        hub.unsubscribe(subscription)
+
+
+_hub: Optional[EventTailHub] = None
+
+
+def get_tail_hub() -> EventTailHub:
+    global _hub
+    if _hub is None:
+        _hub = EventTailHub()
+    return _hub
+
+
+async def stop_live_tail() -> None:
+    global _hub
+    if _hub is not None:
+        await _hub.stop()
+        _hub = None
+
+
+def live_tail_stats() -> dict:
+    if _hub is None:
+        return {"listening": False, "subscribers": 0}
+    return _hub.stats()
@@ -1,17 +1,130 @@
+"""
+Non-blocking logging. A log call only builds a record and puts it on a bounded queue;
+a background listener thread formats the record and writes it to stdout. Messages use
+lazy %-style arguments, so they are only formatted for records that are written.
+
+Configured from the environment:
+  LOG_LEVEL        root level (default INFO)
+  LOG_LEVELS       per-logger levels, e.g. "src.database=WARNING,src.routes=DEBUG"
+  LOG_FORMAT       "text" (default) or "json", one structured object per line
+  LOG_SAMPLE_RATE  fraction of DEBUG records kept (default 1.0)
+  LOG_QUEUE_SIZE   records buffered for the writer thread; further records are
+                   dropped and counted rather than blocking the caller (default 10000)
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes every record above DEBUG and a `rate` fraction of DEBUG records."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener unformatted, and drops them instead of waiting when
+    the queue is full. The queue is in-process, so records need not be made picklable.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> dict:
+    """'a=DEBUG,b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+_output = logging.StreamHandler(sys.stdout)
+_output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+_sampler = SamplingFilter(LOG_SAMPLE_RATE)
+_handler = NonBlockingQueueHandler(_queue)
+_handler.addFilter(_sampler)
+
+logging.basicConfig(level=LOG_LEVEL, handlers=[_handler])
+for logger_name, level in parse_levels(LOG_LEVELS).items():
+    logging.getLogger(logger_name).setLevel(level)
+
+_listener = logging.handlers.QueueListener(_queue, _output, respect_handler_level=True)
+_listener.start()
+# Drain what is still queued before the interpreter exits
+atexit.register(_listener.stop)
+
+
+def logging_stats() -> dict:
+    """Queue depth and how many records were dropped for a full queue or by sampling."""
+    return {
+        "queued": _queue.qsize(),
+        "queue_size": LOG_QUEUE_SIZE,
+        "dropped_queue_full": _handler.dropped,
+        "dropped_sampled": _sampler.dropped,
+        "sample_rate": LOG_SAMPLE_RATE
+    }
 
-# Configure root logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 
 def get_logger(name: str = None) -> logging.Logger:
     """
     Returns a logger with the specified name. If no name is provided, returns the root logger.
     """
-    return logging.getLogger(name) 
\ No newline at end of file
+    return logging.getLogger(name)
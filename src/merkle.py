@@ -0,0 +1,216 @@
+"""
+Incremental Merkle tree over an app's events, following RFC 6962 / RFC 9162.
+
+Leaves are the events' content hashes in append order. Every perfect subtree is
+stored as a node keyed by (level, index), where level 0 holds the leaves and the
+node (level, index) covers leaves [index * 2**level, (index + 1) * 2**level).
+Any tree head, inclusion proof or consistency proof can then be assembled from
+O(log n) stored nodes. Hashes are passed around as hex strings.
+"""
+import hashlib
+from typing import Callable, Dict, Iterable, List, Tuple
+
+NodeKey = Tuple[int, int]
+NodeGetter = Callable[[int, int], str]
+
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+def leaf_hash(event_hash: str) -> str:
+    return hashlib.sha256(b"\x00" + event_hash.encode()).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _largest_power_of_two_below(n: int) -> int:
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def append_leaves(
+    frontier: List[str], tree_size: int, leaves: Iterable[str]
+) -> Tuple[List[str], int, List[Tuple[int, int, str]]]:
+    """
+    Append leaf hashes to a tree described by its frontier (the roots of its perfect
+    subtrees, largest first). Returns the new frontier, the new size and every node
+    (level, index, hash) completed along the way, leaves included.
+    """
+    frontier = list(frontier)
+    completed = []
+    for leaf in leaves:
+        h, level, index, size = leaf, 0, tree_size, tree_size
+        completed.append((0, index, h))
+        while size & 1:
+            h = node_hash(frontier.pop(), h)
+            level += 1
+            index >>= 1
+            size >>= 1
+            completed.append((level, index, h))
+        frontier.append(h)
+        tree_size += 1
+    return frontier, tree_size, completed
+
+
+def root_from_frontier(frontier: List[str]) -> str:
+    if not frontier:
+        return EMPTY_ROOT
+    root = frontier[-1]
+    for h in reversed(frontier[:-1]):
+        root = node_hash(h, root)
+    return root
+
+
+def combined_root(stream_trees: Dict[str, Tuple[int, str]]) -> str:
+    """
+    One root over several independent streams, given each stream's (tree_size, root):
+    the MTH of one leaf per stream, leaf_hash("<stream>:<tree_size>:<root>"), in
+    stream-name order. Each tree root commits to its stream's whole history.
+    """
+    leaves = [
+        leaf_hash(f"{stream}:{tree_size}:{root}") for stream, (tree_size, root) in sorted(stream_trees.items())
+    ]
+    frontier, _, _ = append_leaves([], 0, leaves)
+    return root_from_frontier(frontier)
+
+
+def _subtree_hash(lo: int, hi: int, get_node: NodeGetter) -> str:
+    """MTH of leaves [lo, hi); power-of-two ranges reached by the RFC split are always aligned."""
+    n = hi - lo
+    if n & (n - 1) == 0:
+        level = n.bit_length() - 1
+        return get_node(level, lo >> level)
+    k = _largest_power_of_two_below(n)
+    return node_hash(_subtree_hash(lo, lo + k, get_node), _subtree_hash(lo + k, hi, get_node))
+
+
+def _inclusion_path(index: int, lo: int, hi: int, get_node: NodeGetter) -> List[str]:
+    n = hi - lo
+    if n == 1:
+        return []
+    k = _largest_power_of_two_below(n)
+    if index < k:
+        return _inclusion_path(index, lo, lo + k, get_node) + [_subtree_hash(lo + k, hi, get_node)]
+    return _inclusion_path(index - k, lo + k, hi, get_node) + [_subtree_hash(lo, lo + k, get_node)]
+
+
+def _consistency_path(m: int, lo: int, hi: int, complete: bool, get_node: NodeGetter) -> List[str]:
+    n = hi - lo
+    if m == n:
+        return [] if complete else [_subtree_hash(lo, hi, get_node)]
+    k = _largest_power_of_two_below(n)
+    if m <= k:
+        return _consistency_path(m, lo, lo + k, complete, get_node) + [_subtree_hash(lo + k, hi, get_node)]
+    return _consistency_path(m - k, lo + k, hi, False, get_node) + [_subtree_hash(lo, lo + k, get_node)]
+
+
+def required_nodes(computation: Callable[[NodeGetter], object]) -> List[NodeKey]:
+    """The stored nodes a computation reads, so they can be fetched in a single batch."""
+    needed = set()
+
+    def record(level: int, index: int) -> str:
+        needed.add((level, index))
+        return EMPTY_ROOT
+
+    computation(record)
+    return sorted(needed)
+
+
+def evaluate(computation: Callable[[NodeGetter], object], nodes: Dict[NodeKey, str]):
+    """Run a computation against nodes fetched for its required_nodes()."""
+    def get(level: int, index: int) -> str:
+        if (level, index) not in nodes:
+            raise LookupError(f"Merkle node ({level}, {index}) missing from storage.")
+        return nodes[(level, index)]
+
+    return computation(get)
+
+
+def root_computation(tree_size: int) -> Callable[[NodeGetter], str]:
+    if tree_size == 0:
+        return lambda get: EMPTY_ROOT
+    return lambda get: _subtree_hash(0, tree_size, get)
+
+
+def inclusion_computation(index: int, tree_size: int) -> Callable[[NodeGetter], List[str]]:
+    if not 0 <= index < tree_size:
+        raise ValueError("Leaf index is outside the tree.")
+    return lambda get: _inclusion_path(index, 0, tree_size, get)
+
+
+def consistency_computation(first: int, second: int) -> Callable[[NodeGetter], List[str]]:
+    if not 0 < first <= second:
+        raise ValueError("Tree sizes must satisfy 0 < first <= second.")
+    if first == second:
+        return lambda get: []
+    return lambda get: _consistency_path(first, 0, second, True, get)
+
+
+def _with_nodes(computation, fetch_nodes: Callable[[List[NodeKey]], Dict[NodeKey, str]]):
+    needed = required_nodes(computation)
+    return evaluate(computation, fetch_nodes(needed) if needed else {})
+
+
+def tree_root(tree_size: int, fetch_nodes) -> str:
+    return _with_nodes(root_computation(tree_size), fetch_nodes)
+
+
+def inclusion_proof(index: int, tree_size: int, fetch_nodes) -> List[str]:
+    return _with_nodes(inclusion_computation(index, tree_size), fetch_nodes)
+
+
+def consistency_proof(first: int, second: int, fetch_nodes) -> List[str]:
+    return _with_nodes(consistency_computation(first, second), fetch_nodes)
+
+
+def verify_inclusion(leaf: str, index: int, tree_size: int, path: List[str], root: str) -> bool:
+    """RFC 9162 section 2.1.3.2."""
+    if not 0 <= index < tree_size:
+        return False
+    fn, sn, r = index, tree_size - 1, leaf
+    for p in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            if not fn & 1:
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
+
+
+def verify_consistency(first: int, second: int, first_root: str, second_root: str, proof: List[str]) -> bool:
+    """RFC 9162 section 2.1.4.2."""
+    if not 0 < first <= second:
+        return False
+    if first == second:
+        return not proof and first_root == second_root
+    if not proof:
+        return False
+    if first & (first - 1) == 0:
+        proof = [first_root] + list(proof)
+    fn, sn = first - 1, second - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+    fr = sr = proof[0]
+    for c in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = node_hash(c, fr)
+            sr = node_hash(c, sr)
+            if not fn & 1:
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            sr = node_hash(sr, c)
+        fn >>= 1
+        sn >>= 1
+    return fr == first_root and sr == second_root and sn == 0
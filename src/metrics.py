@@ -0,0 +1,292 @@
+"""
+In-process metrics, served in the Prometheus text format at GET /metrics.
+
+Recording a sample is a dict lookup and a bucket increment under a lock, so the
+instrumentation stays on in production; it is disabled with METRICS_ENABLED=false.
+Metrics are kept per process: with several uvicorn workers, each one serves its own.
+"""
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROOF_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+CHAIN_LENGTH_BOUNDS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_metrics: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative `le` buckets, with their sum and count, per label combination."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (the last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self, label_values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self.header()
+        bucket_names = self.label_names + ("le",)
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(bucket_names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class GaugeFunction(_Metric):
+    """Values read when the metrics are scraped, from `read()` -> {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], read: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, label_names)
+        self.read = read
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in self.read().items()
+        ]
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+DAO_CALL_DURATION = Histogram(
+    "dao_call_duration_seconds", "Duration of DAO method calls, each one or a few queries.", ("dao", "method")
+)
+DAO_CALL_ERRORS = Counter("dao_call_errors_total", "DAO method calls that raised.", ("dao", "method"))
+DB_CONNECTION_ACQUIRE = Histogram(
+    "db_connection_acquire_seconds", "Time spent waiting for a pooled database connection.", ("pool",)
+)
+CHAIN_HEAD_LOCK_WAIT = Histogram(
+    "chain_head_lock_wait_seconds", "Time an append waited for its stream's chain-head row lock."
+)
+PROOF_VERIFICATION_DURATION = Histogram(
+    "proof_verification_seconds",
+    "Duration of verifying one stream's chain, by verification mode and chain length bucket.",
+    ("mode", "chain_length_le"),
+    buckets=PROOF_BUCKETS
+)
+PROOF_VERIFIED_EVENTS = Counter("proof_verified_events_total", "Events re-hashed by chain verification.", ("mode",))
+INGEST_REJECTED = Counter(
+    "ingest_rejected_total", "Ingest requests refused by per-app admission control, by reason.", ("reason",)
+)
+
+
+def chain_length_bucket(chain_length: int) -> str:
+    """The smallest of CHAIN_LENGTH_BOUNDS at or above `chain_length`, or '+Inf'."""
+    index = bisect.bisect_left(CHAIN_LENGTH_BOUNDS, chain_length)
+    return str(CHAIN_LENGTH_BOUNDS[index]) if index < len(CHAIN_LENGTH_BOUNDS) else "+Inf"
+
+
+def observe_proof(mode: str, chain_length: int, checked_count: int, elapsed_seconds: float) -> None:
+    PROOF_VERIFICATION_DURATION.observe(elapsed_seconds, mode, chain_length_bucket(chain_length))
+    PROOF_VERIFIED_EVENTS.inc(mode, amount=checked_count)
+
+
+def _timed_method(dao: str, name: str, method: Callable) -> Callable:
+    def record(started: float, failed: bool) -> None:
+        DAO_CALL_DURATION.observe(time.perf_counter() - started, dao, name)
+        if failed:
+            DAO_CALL_ERRORS.inc(dao, name)
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed_coroutine(*args, **kwargs):
+            started, failed = time.perf_counter(), True
+            try:
+                result = await method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                record(started, failed)
+        return timed_coroutine
+
+    async def timed_async_iterator(iterator, started):
+        failed = True
+        try:
+            async for item in iterator:
+                yield item
+            failed = False
+        finally:
+            record(started, failed)
+
+    def timed_iterator(iterator, started):
+        failed = True
+        try:
+            yield from iterator
+            failed = False
+        finally:
+            record(started, failed)
+
+    @functools.wraps(method)
+    def timed_function(*args, **kwargs):
+        started, failed = time.perf_counter(), True
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+        finally:
+            if failed:
+                record(started, failed)
+        # Streaming reads run until their iterator is exhausted or closed
+        if inspect.isasyncgen(result):
+            return timed_async_iterator(result, started)
+        if inspect.isgenerator(result):
+            return timed_iterator(result, started)
+        record(started, False)
+        return result
+    return timed_function
+
+
+def instrument_dao(cls: type) -> type:
+    """
+    Class decorator timing every public method of a DAO into dao_call_duration_seconds,
+    labelled with the class and method name. Methods returning a generator are timed
+    until it is exhausted or closed.
+    """
+    if not METRICS_ENABLED:
+        return cls
+    for name, method in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(method):
+            setattr(cls, name, _timed_method(cls.__name__, name, method))
+    return cls
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each HTTP request's latency, until its response is fully
+    sent, under its route template (e.g. /api/events/proof), so path parameters and
+    unknown paths do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], route, str(status))
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
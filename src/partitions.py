@@ -0,0 +1,129 @@
+"""
+Time partitioning of the events table (migration 0011) and its retention policy.
+
+Monthly partitions are created ahead of time, at startup and then periodically, by
+a background task in each API worker. Retention is destructive and runs as a
+scheduled job (src/database/scripts/apply_retention.py): before a partition leaves
+the events table, every chain with events in it gets a signed anchor at its last
+removed event, from which proofs verify the remaining chain.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from src.database.db_service import db_scope
+from src.database.db_access_objects.anchor_dao import AnchorDAO
+from src.database.db_access_objects.anchor_record import AnchorRecord
+from src.database.db_access_objects.app_dao import AppDAO
+from src.database.db_access_objects.async_partition_dao import AsyncPartitionDAO
+from src.database.db_access_objects.partition_dao import PartitionDAO
+from src.database.db_access_objects.partition_record import EventPartitionRecord
+from src.database.db_access_objects.payload_dao import PayloadDAO
+from src.database.db_access_objects.rollup_dao import RollupDAO
+from src.signing import signing_key_for, sign_payload
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+EVENT_PARTITION_PREMAKE_MONTHS = int(os.getenv("EVENT_PARTITION_PREMAKE_MONTHS", "3"))
+EVENT_PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("EVENT_PARTITION_MAINTENANCE_INTERVAL", "21600"))
+EVENT_RETENTION_MONTHS = int(os.getenv("EVENT_RETENTION_MONTHS", "0"))
+EVENT_RETENTION_ACTION = os.getenv("EVENT_RETENTION_ACTION", "detach")
+EVENT_ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv("EVENT_ROLLUP_MINUTE_RETENTION_DAYS", "30"))
+EVENT_PAYLOAD_PRUNE_AFTER_DAYS = int(os.getenv("EVENT_PAYLOAD_PRUNE_AFTER_DAYS", "7"))
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def retention_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    """
+    Partitions ending at or before this instant have expired: the start of the current
+    UTC month, `retention_months` months back. At least `retention_months` full months
+    of events are always kept.
+    """
+    now = now or datetime.now(timezone.utc)
+    months = now.year * 12 + (now.month - 1) - retention_months
+    return datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def expired_partitions(partitions: List[EventPartitionRecord], cutoff: datetime) -> List[EventPartitionRecord]:
+    return [
+        partition for partition in partitions
+        if not partition.is_default and partition.upper_bound is not None and partition.upper_bound <= cutoff
+    ]
+
+
+def apply_retention(retention_months: int = EVENT_RETENTION_MONTHS, drop: bool = EVENT_RETENTION_ACTION == "drop") -> List[AnchorRecord]:
+    """
+    Anchor and remove every expired partition, oldest first, each in its own
+    transaction. Returns the anchors written. A retention of 0 months keeps everything.
+    """
+    if retention_months <= 0:
+        logger.info("Event retention is disabled")
+        return []
+    partition_dao, anchor_dao, app_dao = PartitionDAO(), AnchorDAO(), AppDAO()
+    partition_dao.ensure_partitions(EVENT_PARTITION_PREMAKE_MONTHS)
+
+    written = []
+    signing_keys = {}
+    for partition in expired_partitions(partition_dao.get_partitions(), retention_cutoff(retention_months)):
+        with db_scope():
+            anchors = partition_dao.get_anchors_for_partition(partition)
+            for anchor in anchors:
+                if anchor.app_id not in signing_keys:
+                    signing_keys[anchor.app_id] = signing_key_for(app_dao.get_api_key(anchor.app_id))
+                anchor.signature = sign_payload(anchor.signing_payload(), signing_keys[anchor.app_id])
+            anchor_dao.save_many(anchors)
+            partition_dao.expire_partition(partition, drop=drop)
+        logger.info("Expired event partition %s with %s chain anchors", partition.name, len(anchors))
+        written.extend(anchors)
+    return written
+
+
+def prune_rollups(minute_retention_days: int = EVENT_ROLLUP_MINUTE_RETENTION_DAYS) -> int:
+    """
+    Delete minute-bucket event counters older than `minute_retention_days` days; hour and
+    day counters are kept. Returns how many were deleted. A value of 0 keeps everything.
+    """
+    if minute_retention_days <= 0:
+        return 0
+    return RollupDAO().prune("minute", datetime.now(timezone.utc) - timedelta(days=minute_retention_days))
+
+
+def prune_payloads(prune_after_days: int = EVENT_PAYLOAD_PRUNE_AFTER_DAYS) -> int:
+    """
+    Delete stored event payloads that no event references and no append has referenced
+    for `prune_after_days` days (at least 2). Returns how many were deleted.
+    """
+    return PayloadDAO().prune(datetime.now(timezone.utc) - timedelta(days=max(2, prune_after_days)))
+
+
+async def _maintain_partitions() -> None:
+    partition_dao = AsyncPartitionDAO()
+    while True:
+        try:
+            await partition_dao.ensure_partitions(EVENT_PARTITION_PREMAKE_MONTHS)
+        except Exception as e:
+            logger.error("Event partition maintenance failed: %s", e)
+        await asyncio.sleep(EVENT_PARTITION_MAINTENANCE_INTERVAL)
+
+
+def start_partition_maintenance() -> None:
+    global _maintenance_task
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintain_partitions())
+
+
+async def stop_partition_maintenance() -> None:
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
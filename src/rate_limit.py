@@ -0,0 +1,212 @@
+"""
+Per-app admission control on the ingest routes, checked right after authentication.
+
+Each app has a token bucket holding up to `rate_burst` events and refilling at
+`rate_limit` events per second, and a cap of `max_concurrency` ingest requests in
+flight per worker. Both come from the app's record, cached with its API key, or else
+from APP_RATE_LIMIT, APP_RATE_BURST and APP_MAX_CONCURRENCY. A request is admitted
+when its app has a slot free and either enough tokens for its events or, for a batch
+larger than the burst, a full bucket; the bucket may then go into debt, so the
+sustained rate still holds. Refused requests get 429 with a Retry-After header.
+
+By default every worker keeps its own buckets, so a deployment of N workers admits up
+to N times the limit. With RATE_LIMIT_SHARED=true the buckets live in the
+`app_rate_buckets` table (migration 0019) and workers lease tokens from them in
+chunks of RATE_LIMIT_LEASE_SECONDS of rate, one short transaction per lease. If a
+lease fails the request is admitted, so the limiter never turns a database hiccup
+into rejected writes.
+"""
+import asyncio
+import math
+import os
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+
+from src.database.db_access_objects.async_app_dao import AsyncAppDAO
+from src.database.db_access_objects.async_rate_bucket_dao import AsyncRateBucketDAO
+from src.logger import get_logger
+from src.metrics import INGEST_REJECTED
+from src.security import get_current_app
+
+logger = get_logger(__name__)
+
+load_dotenv()
+APP_RATE_LIMIT = float(os.getenv("APP_RATE_LIMIT", "0"))
+APP_RATE_BURST = int(os.getenv("APP_RATE_BURST", "0"))
+APP_MAX_CONCURRENCY = int(os.getenv("APP_MAX_CONCURRENCY", "0"))
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "0.1"))
+
+app_dao = AsyncAppDAO()
+rate_bucket_dao = AsyncRateBucketDAO()
+
+
+class TokenBucket:
+    """
+    Tokens refilling at `rate` per second up to `burst`. Without a rate it never
+    refills, and only holds what is deposited (tokens leased from a shared bucket).
+    """
+
+    def __init__(self, rate: float, burst: float, refill: bool = True):
+        self.rate = rate
+        self.burst = burst
+        self.refill = refill
+        self.tokens = burst if refill else 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.refill:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def shortfall(self, cost: float) -> float:
+        """Tokens missing before `cost` can be taken; a cost above the burst needs a full bucket."""
+        self._refill()
+        return max(0.0, min(cost, self.burst) - self.tokens)
+
+    def take(self, cost: float) -> None:
+        self.tokens -= cost
+
+    def deposit(self, tokens: float) -> None:
+        self.tokens += tokens
+
+
+class _AppState:
+    """An app's limits, bucket and requests in flight in this worker."""
+
+    def __init__(self):
+        self.limits = None
+        self.bucket: Optional[TokenBucket] = None
+        self.max_concurrency = 0
+        self.in_flight = 0
+        self.lease_lock = asyncio.Lock()
+
+    def configure(self, rate_limit: Optional[float], rate_burst: Optional[int], max_concurrency: Optional[int], shared: bool) -> None:
+        limits = (rate_limit, rate_burst, max_concurrency)
+        if limits == self.limits:
+            return
+        self.limits = limits
+        rate = APP_RATE_LIMIT if rate_limit is None else rate_limit
+        burst = APP_RATE_BURST if rate_burst is None else rate_burst
+        self.bucket = TokenBucket(rate, burst or max(rate, 1.0), refill=not shared) if rate > 0 else None
+        self.max_concurrency = APP_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+
+
+class IngestPermit:
+    """An admitted ingest request's concurrency slot, and the rate limit its events are charged to."""
+
+    def __init__(self, limiter: "RateLimiter", app_id: int, state: _AppState):
+        self.limiter = limiter
+        self.app_id = app_id
+        self.state = state
+        self.released = False
+
+    async def charge(self, events: int) -> None:
+        """Take `events` tokens from the app's bucket, or raise 429 if they are not there yet."""
+        await self.limiter.charge(self.app_id, self.state, events)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.state.in_flight -= 1
+
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class RateLimiter:
+    """The worker's per-app buckets and concurrency counters."""
+
+    def __init__(self, shared: bool = RATE_LIMIT_SHARED, lease_seconds: float = RATE_LIMIT_LEASE_SECONDS):
+        self.shared = shared
+        self.lease_seconds = lease_seconds
+        self._apps: Dict[int, _AppState] = {}
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_concurrency = 0
+        self.leases = 0
+        self.lease_errors = 0
+
+    async def admit(self, app_id: int) -> IngestPermit:
+        """Take a concurrency slot for a request of the app, or raise 429."""
+        limits = await app_dao.get_ingest_limits(app_id)
+        state = self._apps.get(app_id)
+        if state is None:
+            state = self._apps[app_id] = _AppState()
+        state.configure(*(limits or (None, None, None)), shared=self.shared)
+        if state.max_concurrency and state.in_flight >= state.max_concurrency:
+            self.rejected_concurrency += 1
+            INGEST_REJECTED.inc("concurrency")
+            logger.warning("Ingest request of app_id=%s refused: %s requests in flight", app_id, state.in_flight)
+            raise _too_many_requests(f"Too many concurrent ingest requests; at most {state.max_concurrency} at a time.", 1)
+        state.in_flight += 1
+        self.admitted += 1
+        return IngestPermit(self, app_id, state)
+
+    async def charge(self, app_id: int, state: _AppState, events: int) -> None:
+        bucket = state.bucket
+        if bucket is None:
+            return
+        shortfall = bucket.shortfall(events)
+        if shortfall > 0 and self.shared:
+            async with state.lease_lock:
+                # A concurrent request may have leased enough meanwhile
+                shortfall = bucket.shortfall(events)
+                if shortfall > 0:
+                    wanted = min(bucket.burst, max(shortfall, bucket.rate * self.lease_seconds))
+                    try:
+                        bucket.deposit(await rate_bucket_dao.lease(app_id, wanted, bucket.rate, bucket.burst))
+                        self.leases += 1
+                    except Exception as e:
+                        self.lease_errors += 1
+                        logger.warning("Rate limit lease failed for app_id=%s, admitting the request: %s", app_id, e)
+                        return
+                    shortfall = bucket.shortfall(events)
+        if shortfall > 0:
+            self.rejected_rate += 1
+            INGEST_REJECTED.inc("rate")
+            logger.warning("Ingest of %s events by app_id=%s refused by its rate limit", events, app_id)
+            raise _too_many_requests(f"Rate limit of {bucket.rate:g} events per second exceeded.", shortfall / bucket.rate)
+        bucket.take(events)
+
+    def stats(self) -> dict:
+        return {
+            "shared": self.shared,
+            "apps": len(self._apps),
+            "in_flight": sum(state.in_flight for state in self._apps.values()),
+            "admitted": self.admitted,
+            "rejected_rate": self.rejected_rate,
+            "rejected_concurrency": self.rejected_concurrency,
+            "leases": self.leases,
+            "lease_errors": self.lease_errors
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
+
+
+async def admit_ingest(current_app: dict = Depends(get_current_app)) -> AsyncIterator[IngestPermit]:
+    """FastAPI dependency holding an ingest request's concurrency slot until it finishes."""
+    permit = await get_rate_limiter().admit(current_app.get("app_id"))
+    try:
+        yield permit
+    finally:
+        permit.release()
+
+
+def rate_limit_stats() -> dict:
+    if _limiter is None:
+        return {"shared": RATE_LIMIT_SHARED, "apps": 0}
+    return _limiter.stats()
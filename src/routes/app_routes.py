@@ -1,16 +1,17 @@
-from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import jwt
 import uuid
 from datetime import datetime 
 
-from src.database.db_access_objects.app_dao import AppDAO
+from src.database.async_db_service import async_request_db
+from src.database.db_access_objects.async_app_dao import AsyncAppDAO
 from src.database.db_access_objects.app_record import AppRecord
 from src.logger import get_logger
 
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(async_request_db)])
 
 logger = get_logger(__name__)
 
@@ -18,20 +19,20 @@ class AppRegistrationRequest(BaseModel):
     name: str
 
 @router.post("/register")
-def register_app(request: AppRegistrationRequest):
+async def register_app(request: AppRegistrationRequest):
     """
     Registers a new application and returns a JWT for it.
     """
     try:
-        logger.info(f"Registering new app: {request.name}")
-        app_dao = AppDAO()
+        logger.info("Registering new app: %s", request.name)
+        app_dao = AsyncAppDAO()
         new_app_record = AppRecord(
             name=request.name,
             api_key=str(uuid.uuid4()),
             created_at=datetime.now()
         )
         
-        new_app = app_dao.create(new_app_record)
+        new_app = await app_dao.create(new_app_record)
         app_id = new_app.id
         api_key = new_app.api_key
 
@@ -41,7 +42,7 @@ def register_app(request: AppRegistrationRequest):
         }
 
         token = jwt.encode(payload, api_key, algorithm="HS256")
-        logger.info(f"App registered successfully: app_id={app_id}")
+        logger.info("App registered successfully: app_id=%s", app_id)
 
         return JSONResponse(
             status_code=201,
@@ -52,9 +53,9 @@ def register_app(request: AppRegistrationRequest):
             }
         )
     except ValueError as ve:
-        logger.error(f"App registration failed: {ve}")
+        logger.error("App registration failed: %s", ve)
         raise HTTPException(status_code=409, detail=str(ve))
     except Exception as e:
-        logger.error(f"App registration failed: {e}")
+        logger.error("App registration failed: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1,42 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional
-import hashlib
+from typing import Dict, Any, AsyncIterator, List, Literal, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from dataclasses import asdict
+import base64
+import asyncpg
 import json
 
 from src.security import get_current_app
-from src.database.db_access_objects.event_dao import EventDAO
-from src.database.db_access_objects.event_record import EventRecord
+from src.database.async_db_service import async_request_db
+from src.database.db_access_objects.async_event_dao import AsyncEventDAO
+from src.database.db_access_objects.event_record import EventRecord, DEFAULT_STREAM
+from src.database.db_access_objects.event_filter import EventFilter
+from src.database.db_access_objects.event_dao import group_by_chain
+from src.database.db_access_objects.async_app_dao import AsyncAppDAO
+from src.database.db_access_objects.async_checkpoint_dao import AsyncCheckpointDAO
+from src.database.db_access_objects.checkpoint_record import CheckpointRecord
+from src.database.db_access_objects.chain_head_record import ChainHeadRecord
+from src.database.db_access_objects.async_merkle_dao import AsyncMerkleDAO
+from src.database.db_access_objects.async_anchor_dao import AsyncAnchorDAO
+from src.database.db_access_objects.async_archive_segment_dao import AsyncArchiveSegmentDAO
+from src.database.db_access_objects.async_rollup_dao import AsyncRollupDAO
+from src.database.db_access_objects.async_idempotency_key_dao import AsyncIdempotencyKeyDAO
+from src.signing import signing_key_for, sign_payload, verify_payload
+from src import archive, merkle
+from src.hashing import canonical_json, hash_canonical_json
+from src.serialization import FastJSONResponse, encode_json
+from src.verification import ANCHOR_BREAK, ChainBreak, ChainVerifier, VerificationResult
+from src.ingestion import IngestQueueFullError, get_ingestion_queue
+from src.idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, idempotency_cutoff, request_fingerprint
+from src.rate_limit import IngestPermit, admit_ingest
+from src import live_tail
 from src.logger import get_logger
+from src.metrics import observe_proof
 
-router = APIRouter()
-event_dao = EventDAO()
+router = APIRouter(dependencies=[Depends(async_request_db)])
+event_dao = AsyncEventDAO()
+app_dao = AsyncAppDAO()
+checkpoint_dao = AsyncCheckpointDAO()
+merkle_dao = AsyncMerkleDAO()
+anchor_dao = AsyncAnchorDAO()
+archive_segment_dao = AsyncArchiveSegmentDAO()
+rollup_dao = AsyncRollupDAO()
+idempotency_key_dao = AsyncIdempotencyKeyDAO()
+# Chain verification is CPU-bound, so it runs on the threadpool with the sync DAOs
+chain_verifier = ChainVerifier()
 logger = get_logger(__name__)
 
+STREAM_NAME_PATTERN = r"^[A-Za-z0-9_.:-]{1,64}$"
+
 class EventPayload(BaseModel):
     type: str = Field(..., min_length=1, max_length=64, description="The type of the event.")
     source: Optional[str] = Field(None, max_length=128, description="The source or origin of the event.")
     data: Dict[str, Any] = Field(default_factory=dict, description="The main JSON data payload of the event.")
+    stream: str = Field(
+        DEFAULT_STREAM,
+        pattern=STREAM_NAME_PATTERN,
+        description="The app's independent chain the event is appended to."
+    )
+
+MAX_BATCH_SIZE = 10000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+STATS_BUCKET_LENGTHS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_STATS_BUCKETS = {"minute": 60, "hour": 24, "day": 30}
+MAX_STATS_BUCKETS = 10000
+
+
+async def replay_idempotent_request(app_id: int, idempotency_key: str, fingerprint: str) -> Optional[JSONResponse]:
+    """
+    Claim an Idempotency-Key for this request, in its transaction. Returns None if the
+    request should run, or the stored response of the request that already used the key.
+    """
+    stored = await idempotency_key_dao.claim(app_id, idempotency_key, fingerprint, idempotency_cutoff())
+    if stored is None:
+        return None
+    if stored.request_hash != fingerprint:
+        logger.error("Idempotency key reused for a different request by app_id=%s", app_id)
+        raise HTTPException(status_code=422, detail="This Idempotency-Key was already used for a different request.")
+    logger.debug("Replaying idempotent response for app_id=%s", app_id)
+    return JSONResponse(stored.response, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"})
+
 
 @router.post("/event", status_code=201)
-def log_event(
+async def log_event(
     event_payload: EventPayload, # Use the Pydantic model here instead of Dict
-    current_app: dict = Depends(get_current_app)
+    response: Response,
+    current_app: dict = Depends(get_current_app),
+    permit: IngestPermit = Depends(admit_ingest),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     """
     Logs an event. This endpoint is protected and requires a valid JWT.
     The request body is validated against the EventPayload model.
+    In WAL ingestion mode the event is acknowledged with 202 once it is durable in the
+    local write-ahead log, and linked onto the chain by the background writer.
+    A request repeated with the same Idempotency-Key header gets the first one's response.
+    Requests over the app's rate or concurrency limit get 429.
     """
     app_id = current_app.get("app_id")
 
-    logger.info(f"Logging event for app_id={app_id}, type={event_payload.type}, source={event_payload.source}")
-
-    event_data_string = json.dumps(event_payload.data, sort_keys=True)
-    event_hash = hashlib.sha256(event_data_string.encode()).hexdigest()
+    logger.debug("Logging event for app_id=%s, type=%s, source=%s", app_id, event_payload.type, event_payload.source)
 
-    # Fetch the latest event for this app with a lock for concurrency safety
-    latest_event = event_dao.get_latest_by_app_id(app_id, for_update=True)
-    prev_event_hash = latest_event.event_hash if latest_event else None
+    # Encoded once, for the hash and the insert
+    encoded_data = canonical_json(event_payload.data)
+    event_hash = hash_canonical_json(encoded_data)
 
     new_event = EventRecord(
         app_id=app_id,
@@ -44,50 +116,597 @@ def log_event(
         source=event_payload.source,
         event_data=event_payload.data,
         event_hash=event_hash,
-        prev_event_hash=prev_event_hash
+        stream=event_payload.stream,
+        encoded_data=encoded_data
     )
+
+    if idempotency_key is not None:
+        replayed = await replay_idempotent_request(app_id, idempotency_key, request_fingerprint("event", [new_event]))
+        if replayed is not None:
+            return replayed
+    # Replays above are free; only new work counts against the rate limit
+    await permit.charge(1)
+
+    ingestion_queue = get_ingestion_queue()
+    if ingestion_queue is not None:
+        try:
+            sequence = await ingestion_queue.submit(new_event)
+        except IngestQueueFullError as e:
+            logger.error("Event logging rejected for app_id=%s: %s", app_id, e)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        logger.debug("Event accepted into WAL with hash=%s, sequence=%s", event_hash, sequence)
+        response.status_code = 202
+        result = {"status": "event accepted", "hash": event_hash, "sequence": sequence}
+        if idempotency_key is not None:
+            await idempotency_key_dao.complete(app_id, idempotency_key, 202, result)
+        return result
+
+    try:
+        # Links the event to the app's chain head atomically
+        await event_dao.append(new_event)
+    except ValueError as ve:
+        logger.error("Event logging failed: %s", ve)
+        raise HTTPException(status_code=409, detail=str(ve))
+    except Exception as e:
+        logger.error("Event logging failed: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.debug("Event logged with hash=%s", event_hash)
+
+    result = {"status": "event logged successfully", "hash": event_hash}
+    if idempotency_key is not None:
+        await idempotency_key_dao.complete(app_id, idempotency_key, 201, result)
+    return result
+
+
+@router.post("/events/batch", status_code=201)
+async def log_events_batch(
+    event_payloads: List[EventPayload] = Body(..., min_length=1, max_length=MAX_BATCH_SIZE),
+    current_app: dict = Depends(get_current_app),
+    permit: IngestPermit = Depends(admit_ingest),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+):
+    """
+    Logs a batch of events in one transaction. Hashes are computed in memory and the
+    events of each stream are linked, in request order, onto that stream's chain head
+    with one insert. A request repeated with the same Idempotency-Key header gets the
+    first one's response. Each event counts against the app's rate limit.
+    """
+    app_id = current_app.get("app_id")
+
+    logger.debug("Logging batch of %s events for app_id=%s", len(event_payloads), app_id)
+
+    new_events = []
+    for payload in event_payloads:
+        encoded_data = canonical_json(payload.data)
+        new_events.append(EventRecord(
+            app_id=app_id,
+            type=payload.type,
+            source=payload.source,
+            event_data=payload.data,
+            event_hash=hash_canonical_json(encoded_data),
+            stream=payload.stream,
+            encoded_data=encoded_data
+        ))
+
+    if idempotency_key is not None:
+        replayed = await replay_idempotent_request(app_id, idempotency_key, request_fingerprint("events/batch", new_events))
+        if replayed is not None:
+            return replayed
+    await permit.charge(len(new_events))
+
     try:
-        event_dao.create(new_event)
+        # One append per stream, all in the request's transaction
+        for chain_events in group_by_chain(new_events).values():
+            await event_dao.append_many(chain_events)
     except ValueError as ve:
-        logger.error(f"Event logging failed: {ve}")
+        logger.error("Batch event logging failed: %s", ve)
         raise HTTPException(status_code=409, detail=str(ve))
     except Exception as e:
-        logger.error(f"Event logging failed: {e}")
+        logger.error("Batch event logging failed: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
-    logger.info(f"Event logged with hash={event_hash}")
+    logger.debug("Batch of %s events logged for app_id=%s", len(new_events), app_id)
 
-    return {"status": "event logged successfully", "hash": event_hash}
+    result = {
+        "status": "events logged successfully",
+        "count": len(new_events),
+        "hashes": [event.event_hash for event in new_events]
+    }
+    if idempotency_key is not None:
+        await idempotency_key_dao.complete(app_id, idempotency_key, 201, result)
+    return result
+
+
+def encode_cursor(event: EventRecord) -> str:
+    """Opaque pagination cursor for an event's (timestamp, id) key."""
+    raw = json.dumps([event.timestamp.isoformat(), event.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        moment = datetime.fromisoformat(timestamp)
+        # A timestamp without a zone is UTC, as for the since/until filters
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment, int(event_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+async def get_event(app_id: int, event_id: int) -> Optional[EventRecord]:
+    """An event of the app by id, from the events table or else from its archive segments."""
+    event = await event_dao.get_by_id(event_id)
+    if event is not None:
+        return event if event.app_id == app_id else None
+    segments = await archive_segment_dao.find_by_event_id(app_id, event_id)
+    if not segments:
+        return None
+    return await run_in_threadpool(archive.ArchiveView(segments).find_event, event_id)
+
+async def event_filter_params(
+    type: Optional[str] = Query(None, max_length=64, description="Only events of this type."),
+    source: Optional[str] = Query(None, max_length=128, description="Only events from this source."),
+    stream: Optional[str] = Query(None, pattern=STREAM_NAME_PATTERN, description="Only events of this stream."),
+    since: Optional[datetime] = Query(None, description="Only events at or after this time (ISO 8601)."),
+    until: Optional[datetime] = Query(None, description="Only events before this time (ISO 8601)."),
+    data: Optional[str] = Query(None, description="JSON object the event data must contain, e.g. {\"user\": \"alice\"}."),
+    data_path: Optional[str] = Query(None, max_length=1024, description="SQL/JSON path predicate on the event data, e.g. $.amount > 100.")
+) -> EventFilter:
+    """Query parameters of the server-side event filter; times without a zone are taken as UTC."""
+    since, until = [
+        moment.replace(tzinfo=timezone.utc) if moment is not None and moment.tzinfo is None else moment
+        for moment in (since, until)
+    ]
+    data_contains = None
+    if data is not None:
+        try:
+            data_contains = json.loads(data)
+        except ValueError:
+            data_contains = None
+        if not isinstance(data_contains, dict):
+            raise HTTPException(status_code=400, detail="'data' must be a JSON object.")
+    if data_path is not None and not await event_dao.is_valid_data_path(data_path):
+        raise HTTPException(status_code=400, detail="'data_path' is not a valid SQL/JSON path.")
+    return EventFilter(
+        type=type, source=source, stream=stream, since=since, until=until,
+        data_contains=data_contains, data_path=data_path
+    )
+
+async def stream_events_ndjson(app_id: int, event_filter: EventFilter) -> AsyncIterator[bytes]:
+    # Table rows arrive as (id, stream, timestamp, JSON text), encoded by PostgreSQL
+    live = event_dao.iter_json_by_app_id(app_id, chunk_size=STREAM_CHUNK_SIZE, event_filter=event_filter)
+    # Start the table cursor before listing the segments, as archive.iter_chain does
+    next_live = await anext(live, None)
+    view = archive.ArchiveView(await archive_segment_dao.get_by_app_id(app_id))
+    archived = view.iter_newest_first(STREAM_CHUNK_SIZE, event_filter)
+    next_archived = await run_in_threadpool(next, archived, None)
+    while next_live is not None or next_archived is not None:
+        if next_live is not None and view.contains_id(next_live[1], next_live[0]):
+            next_live = await anext(live, None)
+        elif next_archived is None or (next_live is not None and (next_live[2], next_live[0]) > (next_archived.timestamp, next_archived.id)):
+            yield next_live[3].encode() + b"\n"
+            next_live = await anext(live, None)
+        else:
+            yield encode_json(next_archived) + b"\n"
+            next_archived = await run_in_threadpool(next, archived, None)
 
 
 @router.get("/events")
-def get_events(current_app: dict = Depends(get_current_app)):
+async def get_events(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated responses."),
+    after: Optional[str] = Query(None, description="Cursor: return events older than this one."),
+    before: Optional[str] = Query(None, description="Cursor: return events newer than this one."),
+    format: Literal["json", "ndjson"] = Query("json", description="'ndjson' streams every event, one per line."),
+    current_app: dict = Depends(get_current_app),
+    event_filter: EventFilter = Depends(event_filter_params)
+):
     """
-    Retrieves all stored events for the authenticated application.
+    Retrieves stored events for the authenticated application, newest first.
+    Without paging parameters all events are returned as a list. With `limit`, `after`
+    or `before` a single page is returned together with cursors for the adjacent pages.
+    With `format=ndjson` every event is streamed as newline-delimited JSON. The filter
+    parameters (`type`, `source`, `stream`, `since`, `until`, `data`, `data_path`) apply
+    to every form and are evaluated by the database.
     """
     app_id = current_app.get("app_id")
-    logger.info(f"Retrieving events for app_id={app_id}")
-    events = event_dao.get_by_app_id(app_id=app_id)
-    return events
 
-@router.get("/events/proof")
-def proof_of_integrity(current_app: dict = Depends(get_current_app)):
+    if format == "ndjson":
+        logger.debug("Streaming events as NDJSON for app_id=%s", app_id)
+        return StreamingResponse(stream_events_ndjson(app_id, event_filter), media_type="application/x-ndjson")
+
+    if limit is None and after is None and before is None:
+        logger.debug("Retrieving events for app_id=%s", app_id)
+        events = await event_dao.get_by_app_id(app_id=app_id, event_filter=event_filter)
+        view = archive.ArchiveView(await archive_segment_dao.get_by_app_id(app_id))
+        if view:
+            archived = await run_in_threadpool(view.read_all, event_filter)
+            events = [event for event in events if not view.contains(event)] + archived
+            events.sort(key=lambda event: (event.timestamp, event.id), reverse=True)
+        return FastJSONResponse(events)
+
+    if after is not None and before is not None:
+        raise HTTPException(status_code=400, detail="Use either 'after' or 'before', not both.")
+    limit = limit or DEFAULT_PAGE_SIZE
+    logger.debug("Retrieving page of events for app_id=%s, limit=%s", app_id, limit)
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+    events, has_more = await event_dao.get_page_by_app_id(
+        app_id=app_id, limit=limit, after=after_key, before=before_key, event_filter=event_filter
+    )
+    view = archive.ArchiveView(await archive_segment_dao.get_by_app_id(app_id))
+    if view:
+        archived, archived_has_more = await run_in_threadpool(view.read_page, limit, after_key, before_key, event_filter)
+        events, has_more = archive.merge_page(
+            events, has_more, archived, archived_has_more, limit, view, ascending=before is not None
+        )
+    # The cursor we paged from always has a neighbour on the side we came from
+    has_newer = has_more if before is not None else after is not None
+    has_older = has_more if before is None else True
+    return FastJSONResponse({
+        "events": events,
+        "next_cursor": encode_cursor(events[-1]) if events and has_older else None,
+        "prev_cursor": encode_cursor(events[0]) if events and has_newer else None
+    })
+
+@router.get("/events/tail")
+async def tail_events(
+    after: Optional[int] = Query(None, ge=0, description="Replay the events after this event id first; defaults to the Last-Event-ID header."),
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource clients when they reconnect."),
+    current_app: dict = Depends(get_current_app),
+    event_filter: EventFilter = Depends(event_filter_params)
+):
     """
-    Verifies the integrity of the event chain for the authenticated app.
-    Returns 'valid' if the chain is unbroken, otherwise 'invalid' and the break location.
+    Streams the authenticated app's newly logged events as server-sent events. Each
+    SSE id is a per-stream cursor; reconnecting with Last-Event-ID replays what was
+    missed, and `after` replays every stream from one event id. Accepts the filter
+    parameters of GET /events except `data_path`. Events of one stream arrive in
+    chain order.
     """
     app_id = current_app.get("app_id")
-    logger.info(f"Verifying proof of integrity for app_id={app_id}")
-    events = event_dao.get_by_app_id(app_id=app_id)
-    if not events or len(events) == 1:
-        return {"status": "valid", "message": "Zero or one event; chain is trivially valid."}
-    # Events are returned in DESC order, so reverse to get oldest to newest
-    events = list(reversed(events))
-    for i in range(1, len(events)):
-        if events[i].prev_event_hash != events[i-1].event_hash:
-            return {
-                "status": "invalid",
-                "break_index": i,
-                "event_id": events[i].id,
-                "message": "Chain broken at this event."
+    if event_filter.data_path is not None:
+        raise HTTPException(status_code=400, detail="'data_path' is not supported by the live tail.")
+    if after is not None:
+        cursor = live_tail.TailCursor(default=after)
+    elif last_event_id:
+        try:
+            cursor = live_tail.TailCursor.parse(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID.")
+    else:
+        # Start at every stream's head, read before subscribing so nothing falls in between
+        cursor = live_tail.TailCursor({
+            head.stream: head.event_id for head in await merkle_dao.get_heads(app_id) if head.event_id is not None
+        })
+
+    hub = live_tail.get_tail_hub()
+    try:
+        subscription = await hub.subscribe(app_id, event_filter)
+    except live_tail.TailCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except (OSError, asyncpg.PostgresError) as e:
+        logger.error("Live tail unavailable for app_id=%s: %s", app_id, e)
+        raise HTTPException(status_code=503, detail="Live tail is unavailable.", headers={"Retry-After": "5"})
+    logger.debug("Live tail opened for app_id=%s after %s", app_id, cursor.encode())
+    return StreamingResponse(
+        live_tail.stream_tail(hub, subscription, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(hub.release, subscription)
+    )
+
+@router.get("/events/stats")
+async def get_event_stats(
+    bucket: Literal["minute", "hour", "day"] = Query("hour", description="Bucket size (UTC)."),
+    since: Optional[datetime] = Query(None, description="Start of the range (ISO 8601); its bucket is included whole."),
+    until: Optional[datetime] = Query(None, description="End of the range, exclusive (ISO 8601); defaults to now."),
+    group_by: List[Literal["type", "source", "stream"]] = Query(["type", "source"], description="Columns to count per."),
+    type: Optional[str] = Query(None, max_length=64, description="Only count events of this type."),
+    source: Optional[str] = Query(None, max_length=128, description="Only count events from this source."),
+    stream: Optional[str] = Query(None, pattern=STREAM_NAME_PATTERN, description="Only count events of this stream."),
+    current_app: dict = Depends(get_current_app)
+):
+    """
+    Event counts per time bucket and per type, source and/or stream, read from the
+    rollup counters maintained on insert, so the cost grows with the number of buckets,
+    not of events. Without `since` the last 60 minutes, 24 hours or 30 days are counted.
+    """
+    app_id = current_app.get("app_id")
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DEFAULT_STATS_BUCKETS[bucket] * STATS_BUCKET_LENGTHS[bucket]
+    since, until = [moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment for moment in (since, until)]
+    if since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'.")
+    if (until - since) / STATS_BUCKET_LENGTHS[bucket] > MAX_STATS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"The range spans more than {MAX_STATS_BUCKETS} {bucket} buckets.")
+    group_by = list(dict.fromkeys(group_by))
+
+    logger.debug("Retrieving %s event stats for app_id=%s", bucket, app_id)
+    rows = await rollup_dao.get_stats(
+        app_id, bucket, since, until, group_by, event_type=type, source=source, stream=stream
+    )
+    return {
+        "bucket": bucket,
+        "since": since,
+        "until": until,
+        "group_by": group_by,
+        "total": sum(row.event_count for row in rows),
+        "buckets": [
+            {
+                "bucket_start": row.bucket_start,
+                **{column: getattr(row, column) for column in group_by},
+                "count": row.event_count
             }
-    return {"status": "valid", "message": "Event chain is valid and unbroken."}
+            for row in rows
+        ]
+    }
+
+@router.get("/events/proof")
+async def proof_of_integrity(
+    full: bool = Query(False, description="Ignore the stored checkpoints and re-verify every chain."),
+    current_app: dict = Depends(get_current_app)
+):
+    """
+    Verifies the integrity of every stream's event chain for the authenticated app.
+    Only events after each stream's last signed checkpoint are checked unless `full` is
+    set. Returns 'valid' if every chain is unbroken, otherwise 'invalid' and the first
+    break location, together with a combined root over the streams' head hashes.
+    """
+    app_id = current_app.get("app_id")
+    logger.debug("Verifying proof of integrity for app_id=%s, full=%s", app_id, full)
+
+    signing_key = await get_signing_key(app_id)
+    heads = await merkle_dao.get_heads(app_id)
+    streams = [head.stream for head in heads] or [DEFAULT_STREAM]
+    combined_head = signed_combined_head(app_id, heads, signing_key)
+
+    stream_reports, results = [], []
+    for stream in streams:
+        mode, result, head_hash = await verify_stream(app_id, stream, signing_key, full)
+        results.append(result)
+        stream_reports.append({
+            "stream": stream,
+            "valid": result.valid,
+            "mode": mode,
+            "verified_events": result.checked_count,
+            "chain_length": result.chain_length,
+            "head_hash": head_hash
+        })
+
+    elapsed_seconds = sum(result.elapsed_seconds for result in results)
+    verified_events = sum(result.checked_count for result in results)
+    chain_length = sum(result.chain_length for result in results)
+    report = {
+        "mode": "incremental" if all(r["mode"] == "incremental" for r in stream_reports) else "full",
+        "verified_events": verified_events,
+        "chain_length": chain_length,
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "events_per_second": round(verified_events / elapsed_seconds, 1) if elapsed_seconds > 0 else 0.0,
+        "combined_root": combined_head["root_hash"] if combined_head is not None else None,
+        "combined_head": combined_head,
+        "streams": stream_reports
+    }
+
+    broken = [result for result in results if not result.valid]
+    if broken:
+        first_break = broken[0].breaks[0]
+        return {
+            "status": "invalid",
+            "stream": broken[0].stream,
+            "break_index": first_break.index,
+            "event_id": first_break.event_id,
+            **report,
+            "breaks": [
+                {"stream": result.stream, **asdict(chain_break)}
+                for result in broken for chain_break in result.breaks
+            ],
+            "breaks_truncated": any(result.breaks_truncated for result in broken),
+            "message": "Chain broken at this event."
+        }
+
+    if chain_length <= 1:
+        return {"status": "valid", **report, "message": "Zero or one event; chain is trivially valid."}
+    return {"status": "valid", **report, "message": "Event chains are valid and unbroken."}
+
+
+def signed_combined_head(app_id: int, heads: List[ChainHeadRecord], signing_key: str) -> Optional[dict]:
+    """
+    A signed root over the Merkle tree heads of every stream of the app, signed like a
+    single tree head, or None while any stream's tree is still being backfilled.
+    """
+    if not heads or not all(head.merkle_ready for head in heads):
+        return None
+    trees = {head.stream: (head.tree_size, merkle.root_from_frontier(head.merkle_frontier)) for head in heads}
+    combined_head = {
+        "app_id": app_id,
+        "root_hash": merkle.combined_root(trees),
+        "tree_sizes": {stream: tree_size for stream, (tree_size, _) in trees.items()},
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    combined_head["signature"] = sign_payload(combined_head, signing_key)
+    return combined_head
+
+
+async def verify_stream(
+    app_id: int, stream: str, signing_key: str, full: bool
+) -> Tuple[str, VerificationResult, Optional[str]]:
+    """
+    Verify one stream from its trusted checkpoint, else from its retention anchor, else
+    from the start, and advance the checkpoint. Returns the mode used ('incremental',
+    'anchored' or 'full'), the result and the stream's verified head hash.
+    """
+    anchor = await anchor_dao.get_by_app_id(app_id, stream)
+    if anchor is not None and not verify_payload(anchor.signing_payload(), anchor.signature, signing_key):
+        logger.error("Retention anchor signature mismatch for app_id=%s, stream=%s", app_id, stream)
+        result = VerificationResult(app_id=app_id, stream=stream, start_index=anchor.event_count)
+        result.breaks.append(ChainBreak(anchor.event_count, anchor.event_id, ANCHOR_BREAK, None, anchor.event_hash))
+        return "anchored", result, None
+
+    checkpoint = None if full else await checkpoint_dao.get_by_app_id(app_id, stream)
+    if checkpoint is not None and anchor is not None and checkpoint.event_id <= anchor.event_id:
+        # Retention removed the checkpointed event; the anchor supersedes the checkpoint
+        checkpoint = None
+    if checkpoint is not None and not await is_checkpoint_trusted(checkpoint, signing_key):
+        logger.warning("Ignoring untrusted proof checkpoint for app_id=%s, stream=%s", app_id, stream)
+        checkpoint = None
+
+    if checkpoint is not None:
+        mode, start = "incremental", (checkpoint.event_id, checkpoint.event_hash, checkpoint.verified_count)
+    elif anchor is not None:
+        mode, start = "anchored", (anchor.event_id, anchor.event_hash, anchor.event_count)
+    else:
+        mode, start = "full", None
+
+    if start is not None:
+        after_event_id, prev_event_hash, start_index = start
+        result = await run_in_threadpool(
+            chain_verifier.verify,
+            app_id,
+            stream,
+            after_event_id=after_event_id,
+            prev_event_hash=prev_event_hash,
+            start_index=start_index
+        )
+    else:
+        result = await run_in_threadpool(chain_verifier.verify, app_id, stream)
+    observe_proof(mode, result.chain_length, result.checked_count, result.elapsed_seconds)
+
+    if result.valid and result.checked_count:
+        new_checkpoint = CheckpointRecord(
+            app_id=app_id,
+            stream=stream,
+            event_id=result.last_event_id,
+            event_hash=result.last_event_hash,
+            verified_count=result.chain_length
+        )
+        new_checkpoint.signature = sign_payload(new_checkpoint.signing_payload(), signing_key)
+        await checkpoint_dao.save(new_checkpoint)
+
+    head_hash = result.last_event_hash or (start[1] if start is not None else None)
+    return mode, result, head_hash
+
+
+async def get_signing_key(app_id: int) -> str:
+    api_key = await app_dao.get_api_key(app_id)
+    return signing_key_for(api_key)
+
+
+async def is_checkpoint_trusted(checkpoint: CheckpointRecord, signing_key: str) -> bool:
+    """A checkpoint is trusted if its signature verifies and its event still carries the checkpointed hash."""
+    if not verify_payload(checkpoint.signing_payload(), checkpoint.signature, signing_key):
+        return False
+    event = await get_event(checkpoint.app_id, checkpoint.event_id)
+    return (
+        event is not None
+        and event.stream == checkpoint.stream
+        and event.event_hash == checkpoint.event_hash
+    )
+
+
+async def get_ready_tree_head(app_id: int, stream: str) -> ChainHeadRecord:
+    head = await merkle_dao.get_head(app_id, stream)
+    if head is None or head.tree_size == 0:
+        raise HTTPException(status_code=404, detail="No events have been logged to this stream.")
+    if not head.merkle_ready:
+        raise HTTPException(status_code=503, detail="Merkle tree for this stream is still being backfilled.")
+    return head
+
+
+async def evaluate_merkle(app_id: int, stream: str, *computations) -> list:
+    """Evaluate Merkle computations for an app stream, fetching all the nodes they need in one query."""
+    keys = sorted({key for computation in computations for key in merkle.required_nodes(computation)})
+    nodes = await merkle_dao.get_nodes(app_id, stream, keys) if keys else {}
+    return [merkle.evaluate(computation, nodes) for computation in computations]
+
+
+@router.get("/events/merkle/head")
+async def merkle_tree_head(
+    stream: str = Query(DEFAULT_STREAM, pattern=STREAM_NAME_PATTERN, description="The stream whose tree head to return."),
+    current_app: dict = Depends(get_current_app)
+):
+    """
+    Returns the signed head of one of the authenticated app's Merkle trees: its size and root hash.
+    """
+    app_id = current_app.get("app_id")
+    logger.debug("Fetching signed Merkle tree head for app_id=%s, stream=%s", app_id, stream)
+    head = await get_ready_tree_head(app_id, stream)
+    tree_head = {
+        "app_id": app_id,
+        "stream": stream,
+        "tree_size": head.tree_size,
+        "root_hash": merkle.root_from_frontier(head.merkle_frontier),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    tree_head["signature"] = sign_payload(tree_head, await get_signing_key(app_id))
+    return tree_head
+
+
+@router.get("/events/merkle/inclusion")
+async def merkle_inclusion_proof(
+    event_id: int = Query(..., description="The event to prove inclusion of."),
+    tree_size: Optional[int] = Query(None, ge=1, description="Tree size to prove against; defaults to the current size."),
+    current_app: dict = Depends(get_current_app)
+):
+    """
+    Returns an RFC 6962 inclusion proof (audit path) for an event in its stream's Merkle tree.
+    """
+    app_id = current_app.get("app_id")
+    logger.debug("Building Merkle inclusion proof for app_id=%s, event_id=%s", app_id, event_id)
+    event = await get_event(app_id, event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found.")
+
+    head = await get_ready_tree_head(app_id, event.stream)
+    tree_size = tree_size or head.tree_size
+    if tree_size > head.tree_size:
+        raise HTTPException(status_code=400, detail="tree_size is larger than the current tree.")
+    if event.leaf_index is None or event.leaf_index >= tree_size:
+        raise HTTPException(status_code=400, detail="Event is not included in a tree of this size.")
+
+    audit_path, root_hash = await evaluate_merkle(
+        app_id,
+        event.stream,
+        merkle.inclusion_computation(event.leaf_index, tree_size),
+        merkle.root_computation(tree_size)
+    )
+    return {
+        "event_id": event.id,
+        "stream": event.stream,
+        "leaf_index": event.leaf_index,
+        "tree_size": tree_size,
+        "leaf_hash": merkle.leaf_hash(event.event_hash),
+        "audit_path": audit_path,
+        "root_hash": root_hash
+    }
+
+
+@router.get("/events/merkle/consistency")
+async def merkle_consistency_proof(
+    first: int = Query(..., ge=1, description="The older tree size."),
+    second: Optional[int] = Query(None, ge=1, description="The newer tree size; defaults to the current size."),
+    stream: str = Query(DEFAULT_STREAM, pattern=STREAM_NAME_PATTERN, description="The stream whose tree to prove."),
+    current_app: dict = Depends(get_current_app)
+):
+    """
+    Returns an RFC 6962 consistency proof that a stream's tree of size `second` extends its tree of size `first`.
+    """
+    app_id = current_app.get("app_id")
+    logger.debug("Building Merkle consistency proof for app_id=%s, stream=%s, first=%s, second=%s", app_id, stream, first, second)
+    head = await get_ready_tree_head(app_id, stream)
+    second = second or head.tree_size
+    if not first <= second <= head.tree_size:
+        raise HTTPException(status_code=400, detail="Tree sizes must satisfy first <= second <= current tree size.")
+
+    first_root_hash, second_root_hash, proof = await evaluate_merkle(
+        app_id,
+        stream,
+        merkle.root_computation(first),
+        merkle.root_computation(second),
+        merkle.consistency_computation(first, second)
+    )
+    return {
+        "stream": stream,
+        "first": first,
+        "second": second,
+        "first_root_hash": first_root_hash,
+        "second_root_hash": second_root_hash,
+        "proof": proof
+    }
@@ -1,24 +1,34 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import hashlib
+import time
 import jwt
 
-from .database.db_access_objects.app_dao import AppDAO
+from .database.db_access_objects.async_app_dao import AsyncAppDAO
+from src.auth_cache import token_cache
 from src.logger import get_logger
 
 bearer_scheme = HTTPBearer()
-app_dao = AppDAO()
+app_dao = AsyncAppDAO()
 
 logger = get_logger(__name__)
 
-def get_current_app(auth: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+async def get_current_app(auth: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = auth.credentials
+
+    # Tokens verified recently are trusted without decoding them or touching the DB
+    token_digest = hashlib.sha256(token.encode()).hexdigest()
+    cached_payload = token_cache.get(token_digest)
+    if cached_payload is not None:
+        return dict(cached_payload)
+
     try:
-        token = auth.credentials
-        logger.info("Decoding JWT token for authentication.")
+        logger.debug("Decoding JWT token for authentication.")
         unverified_payload = jwt.decode(token, options={"verify_signature": False})
         app_id = unverified_payload.get("app_id")
         if app_id is None:
@@ -29,29 +39,29 @@ def get_current_app(auth: HTTPAuthorizationCredentials = Depends(bearer_scheme))
         logger.error("JWT decode error.")
         raise credentials_exception
 
-    logger.info(f"Fetching app record for app_id={app_id}")
-    app_record = app_dao.get_by_id(app_id)
-    if app_record is None:
-        logger.error(f"App not found for app_id={app_id}")
-        raise credentials_exception
-
-    api_key = app_record.api_key
+    logger.debug("Fetching API key for app_id=%s", app_id)
+    api_key = await app_dao.get_api_key(app_id)
     if api_key is None:
-        logger.error(f"API key missing for app_id={app_id}")
+        logger.error("App or API key not found for app_id=%s", app_id)
         raise credentials_exception
 
     try:
-        logger.info(f"Verifying JWT signature for app_id={app_id}")
+        logger.debug("Verifying JWT signature for app_id=%s", app_id)
         payload = jwt.decode(token, api_key, algorithms=["HS256"])
-        return payload
 
     except jwt.ExpiredSignatureError:
-        logger.error(f"JWT expired for app_id={app_id}")
+        logger.error("JWT expired for app_id=%s", app_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except jwt.PyJWTError:
-        logger.error(f"JWT verification failed for app_id={app_id}")
+        logger.error("JWT verification failed for app_id=%s", app_id)
         raise credentials_exception
+
+    # Never cache a token past its own expiry
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        token_cache.set(token_digest, dict(payload), ttl=expires_in)
+    return payload
@@ -0,0 +1,54 @@
+"""
+Fast JSON encoding of event responses. FastAPI passes values returned by a route
+through jsonable_encoder, which walks every field of every event in Python; routes that
+return many events return a FastJSONResponse instead, encoded by orjson in one call.
+The output is the same JSON (timestamps in ISO 8601), without the insignificant spaces.
+"""
+import json
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.database.db_access_objects.event_record import EventRecord
+
+# The API representation of an event; EventRecord.encoded_data is internal
+EVENT_FIELDS = ("id", "app_id", "type", "source", "event_data", "timestamp", "event_hash", "prev_event_hash", "leaf_index", "stream")
+_event_values = attrgetter(*EVENT_FIELDS)
+
+
+def event_to_dict(event: EventRecord) -> dict:
+    return dict(zip(EVENT_FIELDS, _event_values(event)))
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, EventRecord):
+        return event_to_dict(value)
+    return jsonable_encoder(value)
+
+
+def _stdlib_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return _default(value)
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    `content` as JSON, with events in their API representation. orjson only handles
+    64-bit integers, so content with larger ones is encoded with the json module.
+    """
+    try:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    except TypeError:
+        return json.dumps(content, default=_stdlib_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """A JSONResponse rendered with encode_json."""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+import json
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Server-side key for signing integrity artefacts (checkpoints, tree heads). When it
+# is not configured, the app's own API key is used instead.
+INTEGRITY_SIGNING_KEY = os.getenv("INTEGRITY_SIGNING_KEY")
+
+
+def signing_key_for(api_key: Optional[str]) -> str:
+    key = INTEGRITY_SIGNING_KEY or api_key
+    if not key:
+        raise ValueError("No signing key available.")
+    return key
+
+
+def sign_payload(payload: dict, key: str) -> str:
+    """HMAC-SHA256 over the canonical (sorted-key) JSON encoding of the payload."""
+    message = json.dumps(payload, sort_keys=True).encode()
+    return hmac.new(key.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_payload(payload: dict, signature: str, key: str) -> bool:
+    return hmac.compare_digest(sign_payload(payload, key), signature or "")
@@ -0,0 +1,223 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import src.archive as archive
+from src.archive import (
+    FOOTER,
+    MAGIC,
+    ArchiveCorruptionError,
+    ArchiveSegment,
+    SegmentWriter,
+    iter_chain,
+    sweep_segment_files
+)
+from src.database.db_access_objects.event_record import EventRecord
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "EVENT_ARCHIVE_DIR", str(tmp_path))
+    archive._open_segments.clear()
+    yield tmp_path
+    archive._open_segments.clear()
+
+
+def make_events(ids, app_id=1, stream="default"):
+    events, prev_hash = [], None
+    for position, event_id in enumerate(ids):
+        event_hash = f"{event_id:064x}"
+        events.append(EventRecord(
+            id=event_id,
+            app_id=app_id,
+            type="login",
+            source="tests",
+            event_data={"n": event_id, "nested": {"ok": True}},
+            timestamp=START + timedelta(minutes=position),
+            event_hash=event_hash,
+            prev_event_hash=prev_hash,
+            leaf_index=position,
+            stream=stream
+        ))
+        prev_hash = event_hash
+    return events
+
+
+def write_segment(relative_path, events, block_events=10):
+    writer = SegmentWriter(archive.segment_path(relative_path), events[0].app_id, events[0].stream, block_events=block_events)
+    for event in events:
+        writer.add(event)
+    segment = writer.finish()
+    segment.path = relative_path
+    return segment
+
+
+class FakeChainStore:
+    """
+    The table and archive_segments rows of one chain. `between_reads` runs once, right
+    after the first of iter_chain's two reads, to play an archiver committing in between.
+    """
+
+    def __init__(self, events, segments=None, between_reads=None):
+        self.events = events
+        self.segments = segments or []
+        self.between_reads = between_reads
+        self.calls = []
+        self.paths = set()
+
+    def _read(self, name):
+        self.calls.append(name)
+        if len(self.calls) == 1 and self.between_reads is not None:
+            self.between_reads(self)
+
+    def iter_chain_by_app_id(self, app_id, stream, after_id=None, chunk_size=1000):
+        # Like a server-side cursor, the snapshot is fixed when the first row is fetched
+        def rows():
+            snapshot = [event for event in self.events if event.id > (after_id or 0)]
+            self._read("table")
+            yield from snapshot
+        return rows()
+
+    def get_by_chain(self, app_id, stream, after_id=None):
+        segments = [segment for segment in self.segments if segment.last_event_id > (after_id or 0)]
+        self._read("segments")
+        return segments
+
+    def get_paths(self):
+        return self.paths
+
+
+def test_segment_round_trip():
+    events = make_events(range(3, 78, 3))
+    segment = write_segment("1/seg.seg", events)
+
+    assert segment.first_event_id == 3 and segment.last_event_id == 75
+    assert segment.event_count == 25
+    assert segment.prev_event_hash is None and segment.last_event_hash == events[-1].event_hash
+    assert segment.min_timestamp == events[0].timestamp and segment.max_timestamp == events[-1].timestamp
+    assert list(ArchiveSegment(archive.segment_path("1/seg.seg")).iter_events()) == events
+
+
+def test_segment_layout():
+    write_segment("1/seg.seg", make_events(range(1, 26)))
+    with open(archive.segment_path("1/seg.seg"), "rb") as f:
+        data = f.read()
+
+    index_offset, index_length, magic = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+    assert data[:len(MAGIC)] == MAGIC and magic == MAGIC
+    assert index_offset + index_length == len(data) - FOOTER.size
+    assert not os.path.exists(archive.segment_path("1/seg.seg") + archive.TMP_SUFFIX)
+
+
+def test_block_index():
+    events = make_events(range(2, 52, 2))
+    write_segment("1/seg.seg", events, block_events=10)
+    segment = ArchiveSegment(archive.segment_path("1/seg.seg"))
+
+    assert [block.count for block in segment.blocks] == [10, 10, 5]
+    assert [(block.first_id, block.last_id) for block in segment.blocks] == [(2, 20), (22, 40), (42, 50)]
+    assert segment.blocks[1].min_timestamp == events[10].timestamp
+    assert segment.blocks[1].max_timestamp == events[19].timestamp
+    assert segment.blocks[0].offset == len(MAGIC)
+    assert segment.blocks[1].offset == segment.blocks[0].offset + segment.blocks[0].length
+
+    assert segment.find(22) == events[10]
+    assert segment.find(50) == events[-1]
+    assert segment.find(21) is None and segment.find(52) is None and segment.find(1) is None
+    assert [event.id for event in segment.iter_events(after_id=39)] == list(range(40, 52, 2))
+    assert list(segment.iter_events(after_id=50)) == []
+
+
+def test_damaged_block_fails_its_checksum():
+    write_segment("1/seg.seg", make_events(range(1, 26)))
+    path = archive.segment_path("1/seg.seg")
+    segment = ArchiveSegment(path)
+    offset = segment.blocks[1].offset
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    segment = ArchiveSegment(path)
+    assert len(segment.read_block(segment.blocks[0])) == 10
+    with pytest.raises(ArchiveCorruptionError):
+        segment.read_block(segment.blocks[1])
+
+
+def test_truncated_segment_is_rejected():
+    write_segment("1/seg.seg", make_events(range(1, 26)))
+    path = archive.segment_path("1/seg.seg")
+    os.truncate(path, os.path.getsize(path) - 4)
+
+    with pytest.raises(ArchiveCorruptionError):
+        ArchiveSegment(path)
+
+
+def test_abort_keeps_a_finished_file():
+    unfinished = SegmentWriter(archive.segment_path("1/a.seg"), 1, "default")
+    unfinished.add(make_events([1])[0])
+    unfinished.abort()
+    assert os.listdir(os.path.join(archive.EVENT_ARCHIVE_DIR, "1")) == []
+
+    finished = SegmentWriter(archive.segment_path("1/b.seg"), 1, "default")
+    finished.add(make_events([2])[0])
+    finished.finish()
+    finished.abort()
+    assert os.listdir(os.path.join(archive.EVENT_ARCHIVE_DIR, "1")) == ["b.seg"]
+
+
+def seal(events):
+    def archiver(store):
+        store.segments.append(write_segment(f"1/{events[0].id:012d}.seg", events))
+        sealed = {event.id for event in events}
+        store.events = [event for event in store.events if event.id not in sealed]
+    return archiver
+
+
+def test_iter_chain_reads_the_table_snapshot_first():
+    events = make_events(range(1, 31))
+    store = FakeChainStore(events)
+
+    chain = iter_chain(1, "default", event_dao=store, segment_dao=store)
+    assert next(chain) == events[0]
+    assert store.calls == ["table", "segments"]
+
+
+def test_iter_chain_skips_a_range_sealed_after_the_snapshot():
+    events = make_events(range(1, 31))
+    store = FakeChainStore(events[10:], [write_segment("1/old.seg", events[:10])], between_reads=seal(events[10:20]))
+
+    chained = list(iter_chain(1, "default", event_dao=store, segment_dao=store))
+
+    assert [event.id for event in chained] == list(range(1, 31))
+    assert len(store.segments) == 2
+
+
+def test_iter_chain_after_id():
+    events = make_events(range(1, 31))
+    store = FakeChainStore(events[10:], [write_segment("1/old.seg", events[:10])])
+
+    chained = list(iter_chain(1, "default", after_id=5, event_dao=store, segment_dao=store))
+    assert [event.id for event in chained] == list(range(6, 31))
+
+
+def test_sweep_removes_only_old_unreferenced_files():
+    events = make_events(range(1, 31))
+    for name, chunk in (("kept", events[:10]), ("orphan", events[10:20]), ("young", events[20:])):
+        write_segment(f"1/{name}.seg", chunk)
+    tmp_path = archive.segment_path("1/crashed.seg") + archive.TMP_SUFFIX
+    open(tmp_path, "wb").close()
+    old = 1_000_000
+    for name in ("kept.seg", "orphan.seg", "crashed.seg" + archive.TMP_SUFFIX):
+        os.utime(os.path.join(archive.EVENT_ARCHIVE_DIR, "1", name), (old, old))
+    store = FakeChainStore([])
+    store.paths = {os.path.join("1", "kept.seg")}
+
+    removed = sweep_segment_files(min_age_seconds=3600, segment_dao=store)
+
+    assert sorted(removed) == [os.path.join("1", "crashed.seg" + archive.TMP_SUFFIX), os.path.join("1", "orphan.seg")]
+    assert sorted(os.listdir(os.path.join(archive.EVENT_ARCHIVE_DIR, "1"))) == ["kept.seg", "young.seg"]
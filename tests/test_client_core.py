@@ -0,0 +1,88 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import audit_logger_client.core as core
+from audit_logger_client.core import Batcher, RetryPolicy, parse_retry_after
+
+
+def event(size):
+    return b"x" * size
+
+
+def test_take_respects_the_count_limit():
+    batcher = Batcher(batch_size=3, max_batch_bytes=10 ** 6, flush_interval=1)
+    for _ in range(7):
+        batcher.add(event(10))
+
+    assert [len(batcher.take()) for _ in range(3)] == [3, 3, 1]
+    assert batcher.events == [] and batcher.size == 0 and batcher.taken == 7
+
+
+def test_take_respects_the_byte_limit():
+    # Each event counts its length plus a separator byte
+    batcher = Batcher(batch_size=100, max_batch_bytes=33, flush_interval=1)
+    for _ in range(5):
+        batcher.add(event(10))
+
+    assert len(batcher.take()) == 3
+    assert batcher.size == 22
+    assert len(batcher.take()) == 2
+
+
+def test_take_sends_an_oversized_event_alone():
+    batcher = Batcher(batch_size=100, max_batch_bytes=50, flush_interval=1)
+    batcher.add(event(200))
+    batcher.add(event(5))
+
+    assert batcher.take() == [event(200)]
+    assert batcher.take() == [event(5)]
+
+
+def test_full_and_due():
+    batcher = Batcher(batch_size=2, max_batch_bytes=10 ** 6, flush_interval=60)
+    assert not batcher.is_due(closing=True)
+    batcher.add(event(1))
+    assert not batcher.is_full() and not batcher.is_due()
+    assert batcher.is_due(closing=True)
+    batcher.add(event(1))
+    assert batcher.is_full() and batcher.is_due()
+
+
+def test_batch_size_is_bounded():
+    with pytest.raises(ValueError):
+        Batcher(batch_size=core.MAX_BATCH_SIZE + 1, max_batch_bytes=1, flush_interval=1)
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert parse_retry_after(format_datetime(when, usegmt=True)) == pytest.approx(120, abs=2)
+    past = datetime.now(timezone.utc) - timedelta(seconds=120)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(max_retries=3, max_delay=30)
+    assert policy.delay(1, 429, {"retry-after": "7"}) == 7.0
+    assert policy.delay(1, 503, {"retry-after": "600"}) == 30
+
+
+def test_retry_policy_backs_off_with_jitter(monkeypatch):
+    monkeypatch.setattr(core.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(max_retries=5, backoff=0.5, max_delay=3)
+    assert [policy.delay(attempts, None, {}) for attempts in range(1, 5)] == [0.5, 1.0, 2.0, 3]
+
+
+def test_retry_policy_gives_up():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.delay(3, 503, {}) is None
+    assert policy.delay(1, 400, {}) is None
+    assert policy.delay(1, 409, {"retry-after": "1"}) is None
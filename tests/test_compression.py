@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+
+import pytest
+
+import src.compression as compression
+from src.compression import BodyTooLargeError, DecompressionMiddleware, decompress
+
+zstandard = compression.zstandard
+
+
+class CountingGzipFile(gzip.GzipFile):
+    """GzipFile that records how many decompressed bytes were read from it."""
+    produced = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        CountingGzipFile.produced += len(chunk)
+        return chunk
+
+
+def test_gzip_round_trip():
+    body = b'{"events": [1, 2, 3]}' * 100
+    assert decompress(gzip.compress(body), "gzip") == body
+    assert decompress(gzip.compress(body), "x-gzip") == body
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_round_trip_across_frames():
+    compressor = zstandard.ZstdCompressor()
+    assert decompress(compressor.compress(b"first ") + compressor.compress(b"second"), "zstd") == b"first second"
+
+
+def test_output_past_max_bytes_stops_decompressing(monkeypatch):
+    monkeypatch.setattr(compression.gzip, "GzipFile", CountingGzipFile)
+    CountingGzipFile.produced = 0
+    bomb = gzip.compress(bytes(64 * 1024 * 1024))
+
+    with pytest.raises(BodyTooLargeError):
+        decompress(bomb, "gzip", max_bytes=1024 * 1024)
+    assert CountingGzipFile.produced == 1024 * 1024 + 1
+
+
+def test_body_of_exactly_max_bytes_is_accepted():
+    assert len(decompress(gzip.compress(bytes(1000)), "gzip", max_bytes=1000)) == 1000
+
+
+@pytest.mark.parametrize("body", [b"not gzip at all", gzip.compress(b"x" * 10000)[:-20]])
+def test_corrupt_body_is_a_value_error(body):
+    with pytest.raises(ValueError):
+        decompress(body, "gzip")
+
+
+class App:
+    """The wrapped application: records what it was called with."""
+
+    def __init__(self):
+        self.body = None
+        self.headers = None
+
+    async def __call__(self, scope, receive, send):
+        self.headers = dict(scope["headers"])
+        message = await receive()
+        self.body = message["body"]
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(middleware, body, encoding, path="/api/events/batch", chunk_bytes=None):
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if encoding is not None:
+        headers.append((b"content-encoding", encoding.encode()))
+    scope = {"type": "http", "path": path, "method": "POST", "headers": headers}
+    chunk_bytes = chunk_bytes or max(len(body), 1)
+    chunks = [body[start:start + chunk_bytes] for start in range(0, len(body), chunk_bytes)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": position < len(chunks) - 1}
+        for position, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    return status, b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+
+
+def test_middleware_passes_the_decompressed_body():
+    app = App()
+    body = b'{"events": []}' * 50
+    status, _ = call(DecompressionMiddleware(app, ["/api/events/batch"]), gzip.compress(body), "gzip", chunk_bytes=16)
+
+    assert status == 200
+    assert app.body == body
+    assert b"content-encoding" not in app.headers
+    assert app.headers[b"content-length"] == str(len(body)).encode()
+
+
+def test_middleware_ignores_other_paths_and_plain_bodies():
+    app = App()
+    middleware = DecompressionMiddleware(app, ["/api/events/batch"])
+    assert call(middleware, b"raw", "gzip", path="/api/other")[0] == 200
+    assert app.body == b"raw"
+    assert call(middleware, b"plain", None)[0] == 200
+    assert app.body == b"plain"
+
+
+def test_middleware_413_past_max_bytes():
+    app = App()
+    status, body = call(DecompressionMiddleware(app, ["/api/events/batch"], max_bytes=1000), gzip.compress(bytes(10000)), "gzip")
+    assert status == 413 and app.body is None
+
+
+def test_middleware_413_for_a_large_compressed_body():
+    app = App()
+    status, _ = call(DecompressionMiddleware(app, ["/api/events/batch"], max_bytes=100), bytes(1000), "gzip", chunk_bytes=64)
+    assert status == 413 and app.body is None
+
+
+def test_middleware_400_for_a_corrupt_body():
+    app = App()
+    status, body = call(DecompressionMiddleware(app, ["/api/events/batch"]), b"definitely not gzip", "gzip")
+    assert status == 400 and app.body is None
+
+
+def test_middleware_415_for_an_unknown_encoding():
+    app = App()
+    status, _ = call(DecompressionMiddleware(app, ["/api/events/batch"]), b"data", "br")
+    assert status == 415 and app.body is None
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from src.database.db_access_objects.event_record import EventRecord
+from src.routes.event_routes import decode_cursor, encode_cursor
+
+
+def cursor_of(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_cursor_round_trip():
+    event = EventRecord(id=42, timestamp=datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc))
+    assert decode_cursor(encode_cursor(event)) == (event.timestamp, 42)
+
+
+def test_naive_cursor_timestamp_is_utc():
+    timestamp, event_id = decode_cursor(cursor_of(["2024-05-01T12:30:00", 7]))
+    assert timestamp == datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert event_id == 7
+    # Comparable with the tz-aware timestamps of stored and archived events
+    assert timestamp < datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", cursor_of(["yesterday", 1]), cursor_of(["2024-05-01T12:30:00", "x"]), cursor_of(5)])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as rejected:
+        decode_cursor(cursor)
+    assert rejected.value.status_code == 400
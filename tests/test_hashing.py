@@ -0,0 +1,55 @@
+import hashlib
+import json
+
+from src.hashing import canonical_json, compute_event_hash, jsonb_normalized, matches_event_hash
+
+
+def legacy_hash(data):
+    """How event hashes were computed before floats were normalized."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def test_canonical_json_sorts_keys_and_escapes_non_ascii():
+    assert canonical_json({"b": 1, "a": {"d": [1, 2], "c": "é"}}) == '{"a": {"c": "\\u00e9", "d": [1, 2]}, "b": 1}'
+
+
+def test_canonical_json_encodes_floats_as_jsonb_returns_them():
+    assert canonical_json({"big": 1e16, "zero": -0.0, "small": 1.5e-7, "plain": 2.5}) == (
+        '{"big": 10000000000000000, "plain": 2.5, "small": 1.5e-07, "zero": 0.0}'
+    )
+    assert canonical_json({"zero": 0}) == '{"zero": 0}'
+
+
+def test_canonical_json_matches_the_data_read_back():
+    data = {"values": [1e20, -0.0, {"x": -1e17}], "n": 3}
+    assert canonical_json(jsonb_normalized(data)) == canonical_json(data)
+
+
+def test_matches_current_hash():
+    data = {"user": "alice", "amount": 12.5}
+    assert matches_event_hash(data, compute_event_hash(data))
+    assert not matches_event_hash({"user": "alice", "amount": 12.6}, compute_event_hash(data))
+
+
+def test_matches_legacy_exponent_floats():
+    assert matches_event_hash(jsonb_normalized({"a": 1e16}), legacy_hash({"a": 1e16}))
+    assert matches_event_hash({"a": [10 ** 17]}, legacy_hash({"a": [1e17]}))
+
+
+def test_matches_legacy_negative_zero():
+    assert matches_event_hash({"a": 0.0}, legacy_hash({"a": -0.0}))
+    assert matches_event_hash({"a": 0.0, "b": [0.0, 0.0]}, legacy_hash({"a": 0.0, "b": [-0.0, 0.0]}))
+
+
+def test_matches_legacy_negative_zero_with_exponent_floats():
+    assert matches_event_hash({"a": 0.0, "b": 10 ** 16}, legacy_hash({"a": -0.0, "b": 1e16}))
+
+
+def test_legacy_fallback_does_not_hide_changes():
+    assert not matches_event_hash({"a": 0.0}, legacy_hash({"a": 1.0}))
+    assert not matches_event_hash({"a": 0.0, "b": 10 ** 16}, legacy_hash({"a": -0.0, "b": 2e16}))
+
+
+def test_many_zeros_match_when_all_were_negative():
+    stored = {f"k{i}": 0.0 for i in range(20)}
+    assert matches_event_hash(stored, legacy_hash({key: -0.0 for key in stored}))
@@ -0,0 +1,243 @@
+import asyncio
+import contextlib
+import os
+from datetime import datetime, timezone
+
+import asyncpg
+import pytest
+
+import src.ingestion as ingestion
+from src.database.db_access_objects.event_record import EventRecord
+from src.ingestion import IngestionQueue, WalCorruptionError, WriteAheadLog, _record_from_event
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_event(event_hash, app_id=1, stream="default"):
+    return EventRecord(
+        app_id=app_id, stream=stream, type="login", source="tests",
+        event_data={"hash": event_hash}, event_hash=event_hash, timestamp=START
+    )
+
+
+class FakeDatabase:
+    """
+    The events, WAL offsets and dead letters of a database. A scope is one transaction
+    and conn.transaction() a savepoint: either rolls back everything written inside it.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.offsets = {}
+        self.dead_letters = []
+
+    def _state(self):
+        return list(self.events), dict(self.offsets), list(self.dead_letters)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        saved = self._state()
+        try:
+            yield
+        except BaseException:
+            self.events, self.offsets, self.dead_letters = saved
+            raise
+
+    @contextlib.asynccontextmanager
+    async def scope(self):
+        async with self.transaction():
+            yield self
+
+    # AsyncEventDAO
+    async def append_many(self, events):
+        for event in events:
+            if event.event_hash in {stored.event_hash for stored in self.events}:
+                raise asyncpg.UniqueViolationError("duplicate event")
+            self.events.append(event)
+        return events
+
+    async def append(self, event):
+        return (await self.append_many([event]))[0]
+
+    # AsyncWalOffsetDAO
+    async def get_applied_sequence(self, wal_id):
+        return self.offsets.get(wal_id, 0)
+
+    async def advance(self, wal_id, applied_sequence):
+        self.offsets[wal_id] = max(self.offsets.get(wal_id, 0), applied_sequence)
+
+    # AsyncDeadLetterDAO
+    async def add(self, wal_id, sequence, record, error):
+        self.dead_letters.append((wal_id, sequence, record["hash"], error))
+
+    def hashes(self):
+        return [event.event_hash for event in self.events]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(ingestion, "async_db_scope", database.scope)
+    return database
+
+
+@pytest.fixture
+def wal_dir(tmp_path):
+    return str(tmp_path / "wal")
+
+
+def make_queue(db, wal_dir, **kwargs):
+    wal = WriteAheadLog(wal_dir, fsync=kwargs.pop("fsync", False), segment_bytes=kwargs.pop("segment_bytes", 1 << 20))
+    return IngestionQueue(wal, db, db, db, flush_interval=0.001, **kwargs)
+
+
+async def run_queue(queue, hashes=(), settle=0.05):
+    await queue.start()
+    for event_hash in hashes:
+        await queue.submit(make_event(event_hash))
+    await asyncio.sleep(settle)
+    await queue.stop()
+    return queue
+
+
+def segment_files(wal_dir, slot="0"):
+    return sorted(name for name in os.listdir(os.path.join(wal_dir, slot)) if name.endswith(".wal"))
+
+
+def test_torn_tail_is_cut_off(wal_dir):
+    wal = WriteAheadLog(wal_dir, fsync=False)
+    wal.open()
+    wal.write([{"n": n} for n in range(3)])
+    wal.close()
+    path = os.path.join(wal_dir, "0", segment_files(wal_dir)[0])
+    intact_size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'0badc0de {"n": 3, "se')
+
+    wal = WriteAheadLog(wal_dir, fsync=False)
+    wal.open()
+    assert os.path.getsize(path) == intact_size
+    assert [record["n"] for record in wal.records()] == [0, 1, 2]
+    assert wal.write([{"n": 3}]) == 4
+    wal.close()
+
+
+def test_corrupt_tail_record_is_cut_off(wal_dir):
+    wal = WriteAheadLog(wal_dir, fsync=False)
+    wal.open()
+    wal.write([{"n": n} for n in range(3)])
+    wal.close()
+    path = os.path.join(wal_dir, "0", segment_files(wal_dir)[0])
+    with open(path, "rb") as f:
+        data = f.read()
+    # Flip a byte inside the last record's JSON, so its crc32 no longer matches
+    with open(path, "wb") as f:
+        f.write(data[:-3] + bytes([data[-3] ^ 0x01]) + data[-2:])
+
+    wal = WriteAheadLog(wal_dir, fsync=False)
+    wal.open()
+    assert [record["seq"] for record in wal.records()] == [1, 2]
+    assert wal.last_sequence == 2
+    wal.close()
+
+
+def test_damage_before_the_last_segment_is_an_error(wal_dir):
+    wal = WriteAheadLog(wal_dir, fsync=False, segment_bytes=1)
+    wal.open()
+    for n in range(3):
+        wal.write([{"n": n}])
+    wal.close()
+    first = os.path.join(wal_dir, "0", segment_files(wal_dir)[0])
+    os.truncate(first, os.path.getsize(first) - 2)
+
+    with pytest.raises(WalCorruptionError):
+        WriteAheadLog(wal_dir, fsync=False).open()
+
+
+def test_segment_rollover_and_truncate(wal_dir):
+    wal = WriteAheadLog(wal_dir, fsync=False, segment_bytes=1)
+    wal.open()
+    for n in range(5):
+        wal.write([{"n": n}])
+    # One record per segment, plus the fresh segment the last write rolled over to
+    assert len(segment_files(wal_dir)) == 6
+    assert [record["seq"] for record in wal.records(after_sequence=2)] == [3, 4, 5]
+
+    wal.truncate(3)
+    assert [int(name[:-4]) for name in segment_files(wal_dir)] == [4, 5, 6]
+    assert [record["seq"] for record in wal.records()] == [4, 5]
+    wal.close()
+
+
+def test_events_are_applied_once_across_restarts(db, wal_dir):
+    asyncio.run(run_queue(make_queue(db, wal_dir), ["a", "b", "c"]))
+    assert db.hashes() == ["a", "b", "c"]
+
+    # The segment still holds a, b and c; the stored offset keeps them from replaying
+    queue = asyncio.run(run_queue(make_queue(db, wal_dir), ["d"]))
+    assert db.hashes() == ["a", "b", "c", "d"]
+    assert queue.applied_sequence == 4
+
+
+def test_acknowledged_events_replay_after_a_crash(db, wal_dir):
+    asyncio.run(run_queue(make_queue(db, wal_dir), ["a"]))
+    crashed = WriteAheadLog(wal_dir, fsync=False)
+    crashed.open()
+    crashed.write([_record_from_event(make_event(event_hash)) for event_hash in ("b", "c")])
+    crashed.close()
+
+    queue = asyncio.run(run_queue(make_queue(db, wal_dir)))
+    assert db.hashes() == ["a", "b", "c"]
+    assert queue.flushed_events == 2
+
+
+def test_rejected_events_are_dead_lettered(db, wal_dir):
+    db.events.append(make_event("dup"))
+
+    queue = asyncio.run(run_queue(make_queue(db, wal_dir), ["a", "dup", "b"]))
+
+    # The group append rolled back to its savepoint; the others went in one by one
+    assert db.hashes() == ["dup", "a", "b"]
+    assert [(sequence, event_hash) for _, sequence, event_hash, _ in db.dead_letters] == [(2, "dup")]
+    assert queue.dead_lettered_events == 1
+    assert db.offsets[queue.wal.wal_id] == 3
+
+
+def test_orphaned_slots_are_drained(db, wal_dir):
+    # Two workers ran; the one in slot 1 crashed with acknowledged events
+    first, second = WriteAheadLog(wal_dir, fsync=False), WriteAheadLog(wal_dir, fsync=False)
+    first.open()
+    second.open()
+    second.write([_record_from_event(make_event(event_hash)) for event_hash in ("x", "y")])
+    orphan_id = second.wal_id
+    first.close()
+    second.close()
+
+    # Only one worker comes back; it takes slot 0 and drains slot 1
+    queue = asyncio.run(run_queue(make_queue(db, wal_dir), ["a"]))
+
+    assert sorted(db.hashes()) == ["a", "x", "y"]
+    assert db.offsets[orphan_id] == 2
+    assert queue.adopted_events == 2
+    assert os.path.getsize(os.path.join(wal_dir, "1", segment_files(wal_dir, "1")[0])) == 0
+
+    # The drained slot holds nothing any more, so the next start does not replay it
+    asyncio.run(run_queue(make_queue(db, wal_dir)))
+    assert sorted(db.hashes()) == ["a", "x", "y"]
+
+
+def test_a_locked_slot_is_not_adopted(db, wal_dir):
+    busy = WriteAheadLog(wal_dir, fsync=False)
+    busy.open()
+    owner = WriteAheadLog(wal_dir, fsync=False)
+    owner.open()
+    owner.write([_record_from_event(make_event("x"))])
+    owner.close()
+    # Another process holds slot 1 again
+    holder = WriteAheadLog(wal_dir, fsync=False)
+    assert holder.adopt(os.path.join(wal_dir, "1"))
+    busy.close()
+
+    queue = asyncio.run(run_queue(make_queue(db, wal_dir)))
+    assert db.hashes() == [] and queue.adopted_events == 0
+    holder.close()
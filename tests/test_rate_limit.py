@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import src.rate_limit as rate_limit
+from src.rate_limit import RateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class FakeAppDAO:
+    def __init__(self, limits):
+        self.limits = limits
+
+    async def get_ingest_limits(self, app_id):
+        return self.limits
+
+
+class FakeRateBucketDAO:
+    def __init__(self, granted=None, error=None):
+        self.granted = granted
+        self.error = error
+        self.leases = []
+
+    async def lease(self, app_id, wanted, rate, burst):
+        self.leases.append(wanted)
+        if self.error is not None:
+            raise self.error
+        return wanted if self.granted is None else self.granted
+
+
+def limiter_for(monkeypatch, limits, shared=False, bucket_dao=None):
+    monkeypatch.setattr(rate_limit, "app_dao", FakeAppDAO(limits))
+    if bucket_dao is not None:
+        monkeypatch.setattr(rate_limit, "rate_bucket_dao", bucket_dao)
+    return RateLimiter(shared=shared, lease_seconds=1.0)
+
+
+def charge(limiter, app_id, events):
+    async def run():
+        permit = await limiter.admit(app_id)
+        try:
+            await permit.charge(events)
+        finally:
+            permit.release()
+    asyncio.run(run())
+
+
+def test_bucket_refills_up_to_its_burst(clock):
+    bucket = TokenBucket(rate=10, burst=20)
+    bucket.take(20)
+    clock.now += 1
+    assert bucket.shortfall(15) == pytest.approx(5)
+    clock.now += 10
+    assert bucket.shortfall(20) == 0
+    assert bucket.tokens == 20
+
+
+def test_batch_above_the_burst_goes_into_debt(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (10.0, 20, None))
+
+    charge(limiter, 1, 50)
+    assert limiter._apps[1].bucket.tokens == pytest.approx(-30)
+
+    # Paying the debt back takes 3.1 seconds before a single event fits again
+    with pytest.raises(HTTPException) as refused:
+        charge(limiter, 1, 1)
+    assert refused.value.status_code == 429
+    assert refused.value.headers["Retry-After"] == "4"
+
+    clock.now += 3.1
+    charge(limiter, 1, 1)
+
+
+def test_batch_above_the_burst_needs_a_full_bucket(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (10.0, 20, None))
+    charge(limiter, 1, 5)
+
+    with pytest.raises(HTTPException) as refused:
+        charge(limiter, 1, 50)
+    assert refused.value.headers["Retry-After"] == "1"
+    assert limiter.rejected_rate == 1
+
+
+def test_retry_after_is_at_least_one_second(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (100.0, 100, None))
+    charge(limiter, 1, 100)
+
+    with pytest.raises(HTTPException) as refused:
+        charge(limiter, 1, 10)
+    # 10 events at 100 per second are 0.1 seconds away
+    assert refused.value.headers["Retry-After"] == "1"
+
+
+def test_concurrency_cap(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (None, None, 1))
+
+    async def run():
+        first = await limiter.admit(1)
+        with pytest.raises(HTTPException) as refused:
+            await limiter.admit(1)
+        assert refused.value.status_code == 429
+        first.release()
+        first.release()
+        (await limiter.admit(1)).release()
+        assert limiter._apps[1].in_flight == 0
+
+    asyncio.run(run())
+    assert limiter.rejected_concurrency == 1
+
+
+def test_no_limits_admit_everything(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, None)
+    for _ in range(3):
+        charge(limiter, 1, 10 ** 6)
+    assert limiter.admitted == 3
+
+
+def test_shared_bucket_leases_tokens(monkeypatch, clock):
+    bucket_dao = FakeRateBucketDAO()
+    limiter = limiter_for(monkeypatch, (10.0, 20, None), shared=True, bucket_dao=bucket_dao)
+
+    charge(limiter, 1, 5)
+    charge(limiter, 1, 5)
+    # One lease of a second's worth of rate covered both requests
+    assert bucket_dao.leases == [10.0]
+
+
+def test_shared_bucket_refuses_when_the_lease_comes_back_short(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (10.0, 20, None), shared=True, bucket_dao=FakeRateBucketDAO(granted=2))
+
+    with pytest.raises(HTTPException) as refused:
+        charge(limiter, 1, 5)
+    assert refused.value.status_code == 429
+
+
+def test_failed_lease_admits_the_request(monkeypatch, clock):
+    limiter = limiter_for(monkeypatch, (10.0, 20, None), shared=True, bucket_dao=FakeRateBucketDAO(error=OSError("down")))
+
+    charge(limiter, 1, 5)
+    assert limiter.lease_errors == 1
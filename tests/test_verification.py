@@ -0,0 +1,65 @@
+import pytest
+
+import src.verification as verification
+from src.hashing import compute_event_hash
+from src.verification import CONTENT_BREAK, LINK_BREAK, ChainVerifier
+from src.database.db_access_objects.event_record import EventRecord
+
+
+def make_chain(count, first_prev_hash=None):
+    events, prev_hash = [], first_prev_hash
+    for event_id in range(1, count + 1):
+        data = {"n": event_id}
+        event_hash = compute_event_hash(data)
+        events.append(EventRecord(id=event_id, app_id=1, event_data=data, event_hash=event_hash, prev_event_hash=prev_hash))
+        prev_hash = event_hash
+    return events
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    events = []
+
+    def fake_iter_chain(app_id, stream, after_id=None, chunk_size=1000, event_dao=None):
+        return iter([event for event in events if event.id > (after_id or 0)])
+
+    monkeypatch.setattr(verification, "iter_chain", fake_iter_chain)
+    return events
+
+
+def verifier():
+    return ChainVerifier(event_dao=object())
+
+
+def test_valid_chain(chain):
+    chain.extend(make_chain(5))
+    result = verifier().verify(1)
+    assert result.valid and result.checked_count == 5
+    assert result.last_event_hash == chain[-1].event_hash
+
+
+def test_genesis_must_not_link_to_anything(chain):
+    chain.extend(make_chain(3, first_prev_hash="f" * 64))
+    result = verifier().verify(1)
+    assert [(b.index, b.kind, b.expected_hash) for b in result.breaks] == [(0, LINK_BREAK, None)]
+
+
+def test_genesis_link_ignores_a_passed_prev_hash(chain):
+    chain.extend(make_chain(3))
+    result = verifier().verify(1, prev_event_hash="f" * 64)
+    assert result.valid
+
+
+def test_resume_checks_the_link_to_the_trusted_event(chain):
+    chain.extend(make_chain(4))
+    assert verifier().verify(1, after_event_id=2, prev_event_hash=chain[1].event_hash, start_index=2).valid
+
+    result = verifier().verify(1, after_event_id=2, prev_event_hash="0" * 64, start_index=2)
+    assert [(b.index, b.event_id, b.kind) for b in result.breaks] == [(2, 3, LINK_BREAK)]
+
+
+def test_content_break(chain):
+    chain.extend(make_chain(3))
+    chain[1].event_data = {"n": 99}
+    result = verifier().verify(1)
+    assert [(b.index, b.kind) for b in result.breaks] == [(1, CONTENT_BREAK)]